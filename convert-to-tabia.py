@@ -1,20 +1,9 @@
 import os
-from typing import List
-import random
+import pathlib
 
 import chess.pgn
 
-
-def get_words() -> List[str]:
-    with open("/Users/joshuablinkhorn/Training/Zugzwang/words.txt") as f:
-        words = f.readlines()
-    return [word[:-1] for word in words if len(word) > 3]
-
-
-def three_random_words(words: List[str]) -> str:
-    random.shuffle(words)
-    three = words[:3]
-    return "".join([word[0].upper() + word[1:] for word in three])
+from zugzwang.names import NameGenerator
 
 
 def clean_node(node: chess.pgn.GameNode) -> None:
@@ -29,17 +18,15 @@ mapper = {
     "3-a-bishop-pawn.pgn": "BishopsPawn",
 }
 
-filenames = os.listdir()
-words = get_words()
-
 for filename in mapper:
     dir_name = mapper[filename]
     if not os.path.isdir(dir_name):
         os.mkdir(dir_name)
-    pgn = open(filename)
-    game = chess.pgn.read_game(pgn)
-    while game:
-        clean_node(game)
-        game_filename = f"{three_random_words(words)}.pgn"
-        print(game, file=open(f"{dir_name}/{game_filename}", "w"))
+    names = NameGenerator.for_directory(pathlib.Path(dir_name))
+    with open(filename) as pgn:
         game = chess.pgn.read_game(pgn)
+        while game:
+            clean_node(game)
+            with open(f"{dir_name}/{names.random()}.pgn", "w") as fp:
+                print(game, file=fp)
+            game = chess.pgn.read_game(pgn)
@@ -4,8 +4,8 @@ import pathlib
 
 import chess
 from zugzwang.config import config
-from zugzwang.group import Group, Tabia, Item, DefaultIOManager
-from zugzwang.zugzwang import initialise_group
+from zugzwang.group import ROOT_NAME, Group, Tabia, Item, DefaultIOManager
+from zugzwang.loader import initialise_group
 
 
 def search_node(node: chess.pgn.GameNode, fen: str) -> bool:
@@ -18,7 +18,7 @@ def search_node(node: chess.pgn.GameNode, fen: str) -> bool:
 if __name__ == "__main__":
     io_manager = DefaultIOManager()
     data_path = pathlib.Path(config["user_data"])
-    user_data = initialise_group("UserData", data_path, io_manager)
+    user_data = initialise_group(ROOT_NAME, data_path, io_manager)
     fen = sys.argv[1]
 
     print(f"Searching for fen {fen}..")
@@ -1,48 +1,31 @@
-# ad hoc script to prepare a stub .pgn as a zugzwang pgn
-# this means adding the default comment to the root node
+# ad hoc script to prepare stub .pgns as zugzwang tabias
+# this means writing each game's default metadata beside it
 # run it from Zugzwang root dir, passing the target dir absolute path as a parameter.
 # the script will find any PGN with -STUB in its name
-# and generate and save a zugzwang PGN with -STUB removed from the name
+# and save each of its games as a tabia named with -STUB removed from the name
 
 # a stub PGN should indicate the perspective with a 'p' as one of the player names
-# if no perspective is indicate, I believe it defaults to white
+# if no perspective is indicated, it is the side not to move at the root
 
+import pathlib
 import sys
-import os
-import chess
 
-from zugzwang.constants import ZugColours
-from zugzwang.chapter import ZugChapter
-from zugzwang.game import ZugRoot, ZugRootData, ZugSolutionData
-from zugzwang.tools import ZugChessTools
+import chess.pgn
 
-target_dir = sys.argv[1]
+from zugzwang.expand import write_tabia
 
-# range over the filenames in the current directory
-pgn_files = sorted(os.listdir(target_dir))
-for filename in pgn_files:
+target_dir = pathlib.Path(sys.argv[1])
 
-    if "-STUB" not in filename:
+# range over the filenames in the target directory
+for path in sorted(target_dir.iterdir()):
+
+    if "-STUB" not in path.name or path.suffix != ".pgn":
         continue
 
-    input_filename = os.path.join(target_dir, filename)
-    output_filename = os.path.join(target_dir, filename.replace("-STUB", ""))
-    with open(input_filename) as pgn_file, open(output_filename, "w") as output_file:
-
-        game = chess.pgn.read_game(pgn_file)
-        while game is not None:
-            # look to set the perspective from the game header
-            # override perspective if found
-            if game.headers["White"] == "p":
-                perspective = ZugColours.WHITE
-                print("Set perspective = WHITE based on game header")
-            if game.headers["Black"] == "p":
-                perspective = ZugColours.BLACK
-                print("Set perspective = BLACK based on game header")
-
-            # set the root data on the root comment
-            root_data = ZugRootData(perspective=perspective)
-            game.comment = root_data.as_string()
-
-            print(game, "\n", file=output_file)
-            game = chess.pgn.read_game(pgn_file)
+    name = path.stem.replace("-STUB", "")
+    with open(path) as pgn_file:
+        count = 0
+        while (game := chess.pgn.read_game(pgn_file)) is not None:
+            count += 1
+            tabia_name = name if count == 1 else f"{name}-{count}"
+            print(f"Prepared {write_tabia(game, target_dir, tabia_name)}")
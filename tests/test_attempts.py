@@ -0,0 +1,200 @@
+import pathlib
+import time
+
+import chess
+import chess.polyglot
+import mock
+import numpy as np
+import pytest
+
+from test_schedule import make_tabias
+from zugzwang import analytics, inputs
+from zugzwang.attempts import (
+    RECORD,
+    Attempt,
+    AttemptKind,
+    AttemptLog,
+    ProblemAttempts,
+    tabia_id,
+)
+from zugzwang.group import Result
+from zugzwang.problem import Problem
+from zugzwang.queue import QueueResult
+
+PGN = '[White "p"]\n\n1. e4 e5 2. Nf3 Nc6 *'
+
+
+def attempt(node, success=True, think_time=1.0, time_=0):
+    return Attempt(node, 7, AttemptKind.PROBLEM, success, think_time, time_)
+
+
+@pytest.fixture
+def log(tmp_path):
+    return AttemptLog(tmp_path / ".attempts")
+
+
+class TestAttemptLog:
+    def test_round_trip(self, log):
+        log.append(attempt(1, think_time=2.5, time_=123))
+        log.append(attempt(2, success=False))
+        attempts = analytics.load(log)
+        assert attempts.node.tolist() == [1, 2]
+        assert attempts.result.tolist() == [1, 0]
+        assert attempts.think_time.tolist() == [2.5, 1.0]
+        assert attempts.time.tolist() == [123, 0]
+
+    def test_rotation(self, log):
+        with mock.patch.dict(
+            "zugzwang.attempts.config", {"attempt_log_segment_bytes": 3 * RECORD.size}
+        ):
+            for node in range(7):
+                log.append(attempt(node))
+        assert len(log.segments()) == 2
+        assert analytics.load(log).node.tolist() == list(range(7))
+
+    def test_compaction(self, log):
+        for node in range(3):
+            log.append(attempt(node))
+        log.rotate()
+        analytics.compact(log)
+        log.append(attempt(3))
+        log.rotate()
+        generation = analytics.compact(log)
+
+        assert log.segments() == []
+        assert generation.name == "columns-000001"
+        assert analytics.load(log).node.tolist() == [0, 1, 2, 3]
+
+    def test_interrupted_compaction(self, log):
+        """Segments already compacted are not counted twice."""
+        log.append(attempt(1))
+        segment = log.rotate()
+        data = segment.read_bytes()
+        analytics.compact(log)
+        # as if the compaction stopped before deleting the segment
+        segment.write_bytes(data)
+        assert analytics.load(log).node.tolist() == [1]
+        assert analytics.compact(log) is None
+
+    def test_crash_after_publishing(self, log):
+        """Compactions stopped before deleting their segments count each once."""
+        for node in (1, 2):
+            log.append(attempt(node))
+            log.rotate()
+            with mock.patch.object(pathlib.Path, "unlink", side_effect=OSError):
+                with pytest.raises(OSError):
+                    analytics.compact(log)
+        assert analytics.load(log).node.tolist() == [1, 2]
+        analytics.compact(log)
+        assert log.segments() == []
+        assert analytics.load(log).node.tolist() == [1, 2]
+
+    def test_partial_record(self, log):
+        """A record cut short by a crash is dropped, not misaligned."""
+        log.append(attempt(1))
+        with open(log.directory / "current.log", "ab") as fp:
+            fp.write(b"\x00" * 5)
+        assert analytics.load(log).node.tolist() == [1]
+        log.append(attempt(2))
+        assert analytics.load(log).node.tolist() == [1, 2]
+
+
+class TestQueries:
+    def test_slowest(self, log):
+        for node, think_time in [(1, 1.0), (2, 5.0), (2, 3.0), (3, 2.0)]:
+            log.append(attempt(node, think_time=think_time))
+        # tabia attempts and unmeasured attempts are left out
+        log.append(Attempt(4, 7, AttemptKind.TABIA, True, 60.0))
+        log.append(attempt(5, think_time=float("nan")))
+
+        ranked = analytics.slowest(analytics.load(log), 2)
+        assert [(row.node, row.attempts, row.score) for row in ranked] == [
+            (2, 2, 4.0),
+            (3, 1, 2.0),
+        ]
+
+    def test_hardest(self, log):
+        for node, success in [(1, True), (1, False), (2, False), (3, True)]:
+            log.append(attempt(node, success=success))
+        ranked = analytics.hardest(analytics.load(log))
+        assert [(row.node, row.score) for row in ranked] == [
+            (2, 1.0),
+            (1, 0.5),
+            (3, 0.0),
+        ]
+
+    def test_same_node_in_tabias(self, log):
+        """A node id shared by two tabias ranks as two problems."""
+        log.append(Attempt(1, 7, AttemptKind.PROBLEM, False, 1.0))
+        log.append(Attempt(1, 8, AttemptKind.PROBLEM, True, 1.0))
+        ranked = analytics.hardest(analytics.load(log))
+        assert [(row.tabia, row.node, row.score) for row in ranked] == [
+            (7, 1, 1.0),
+            (8, 1, 0.0),
+        ]
+
+    def test_empty(self, log):
+        assert analytics.slowest(analytics.load(log)) == []
+
+    def test_scale(self):
+        """A query over millions of attempts runs well under a second."""
+        size = 2_000_000
+        rng = np.random.default_rng(0)
+        attempts = analytics.Attempts(
+            time=rng.integers(0, 10**12, size),
+            node=rng.integers(0, 200_000, size, dtype=np.uint64),
+            tabia=np.zeros(size, dtype=np.uint64),
+            kind=np.zeros(size, dtype=np.uint8),
+            result=rng.integers(0, 2, size, dtype=np.uint8),
+            think_time=rng.random(size, dtype=np.float32) * 30,
+        )
+        start = time.perf_counter()
+        ranked = analytics.slowest(attempts.select(attempts.time >= 10**11), 100)
+        assert time.perf_counter() - start < 1
+        assert len(ranked) == 100
+
+
+class TestRecording:
+    def test_tabia(self, log):
+        (tabia,) = make_tabias({"Open": PGN})
+        tabia.record_attempt(Result.SUCCESS, log=log)
+        attempts = analytics.load(log)
+        assert attempts.kind.tolist() == [AttemptKind.TABIA]
+        assert attempts.tabia.tolist() == [tabia_id(tabia)]
+
+    def test_tabia_root(self, log):
+        """Tabia attempts are keyed by their root position."""
+        fen = "4k3/8/8/8/8/8/8/3QK3 w - - 0 1"
+        tabias = make_tabias({"Open": PGN, "Queen": f'[FEN "{fen}"]\n\n*'})
+        for tabia in tabias:
+            tabia.record_attempt(Result.SUCCESS, log=log)
+        assert analytics.load(log).node.tolist() == [
+            chess.polyglot.zobrist_hash(chess.Board()),
+            chess.polyglot.zobrist_hash(chess.Board(fen)),
+        ]
+
+    def test_problem(self, log):
+        """A problem is logged once, with its final result."""
+        (tabia,) = make_tabias({"Open": PGN})
+        solution = tabia.solutions()[0]
+        wrong = chess.Move.from_uci("a2a3")
+        gui = mock.MagicMock()
+        gui.get_timed_input.side_effect = [
+            inputs.TimedInput(wrong, 2.0),
+            inputs.TimedInput(solution.move, 3.0),
+        ]
+        with mock.patch("zugzwang.problem.time.sleep"):
+            result = Problem(solution, tabia, ProblemAttempts(log, tabia)).play(gui)
+
+        assert result == QueueResult.FAILURE
+        attempts = analytics.load(log)
+        assert attempts.result.tolist() == [0]
+        assert attempts.think_time.tolist() == [5.0]
+        assert attempts.tabia.tolist() == [tabia_id(tabia)]
+
+    def test_quit(self, log):
+        (tabia,) = make_tabias({"Open": PGN})
+        gui = mock.MagicMock()
+        gui.get_timed_input.return_value = inputs.TimedInput(inputs.QUIT, 1.0)
+        Problem(tabia.solutions()[0], tabia, ProblemAttempts(log, tabia)).play(gui)
+        assert len(analytics.load(log)) == 0
@@ -0,0 +1,83 @@
+import datetime
+import random
+
+import pytest
+
+from zugzwang import dates
+from zugzwang.balance import DueDateIndex
+from zugzwang.group import Metadata, Status
+
+DAY = datetime.date(2000, 1, 10)
+
+
+def shift(days: int) -> datetime.date:
+    return DAY + datetime.timedelta(days=days)
+
+
+def learned(due_date: datetime.date) -> Metadata:
+    return Metadata(status=Status.LEARNED, due_date=due_date)
+
+
+def index_with(loads: dict, target: int) -> DueDateIndex:
+    return DueDateIndex.from_metadata(
+        [learned(shift(offset)) for offset, load in loads.items() for _ in range(load)],
+        target,
+    )
+
+
+class TestDueDateIndex:
+    def test_counts(self):
+        index = DueDateIndex.from_metadata(
+            [learned(DAY), learned(DAY), Metadata(due_date=DAY)], target=10
+        )
+        assert index.count(DAY) == 2
+        index.remove(learned(DAY))
+        assert index.count(DAY) == 1
+
+    def test_ideal_below_target(self):
+        index = index_with({0: 4, 1: 0}, target=5)
+        assert index.choose(shift(-2), shift(2), DAY, random.Random(0)) == DAY
+
+    def test_nearest_below_target(self):
+        """A full ideal day gives way to the nearest day with capacity."""
+        index = index_with({-1: 5, 0: 5, 1: 5, 2: 3, -2: 4}, target=5)
+        choices = {
+            index.choose(shift(-3), shift(3), DAY, random.Random(seed))
+            for seed in range(50)
+        }
+        assert choices == {shift(-2), shift(2)}
+
+    def test_least_loaded(self):
+        """When every day is over target, the least-loaded day is chosen."""
+        index = index_with({-1: 9, 0: 8, 1: 7}, target=5)
+        assert index.choose(shift(-1), shift(1), DAY, random.Random(0)) == shift(1)
+
+    def test_flattens_peaks(self):
+        """Scheduling a large import keeps each day at or below target."""
+        index = DueDateIndex(target=10)
+        rng = random.Random(0)
+        for _ in range(70):
+            metadata = learned(index.choose(shift(-3), shift(3), DAY, rng))
+            index.add(metadata)
+        assert max(index.count(shift(n)) for n in range(-3, 4)) == 10
+
+
+class TestMetadataDueDate:
+    @pytest.mark.parametrize("load", [0, 100])
+    def test_within_radius(self, load):
+        today = dates.today()
+        index = DueDateIndex(target=5)
+        for _ in range(load):
+            index.add(learned(today + datetime.timedelta(days=20)))
+        metadata = Metadata(
+            status=Status.LEARNED,
+            last_study_date=today - datetime.timedelta(days=10),
+            due_date=today,
+            recall_radius=3,
+        )
+        due_date = metadata._due_date(random.Random(0), index)
+        assert 17 <= (due_date - today).days <= 23
+        if load:
+            assert due_date != today + datetime.timedelta(days=20)
+        else:
+            assert due_date == today + datetime.timedelta(days=20)
@@ -0,0 +1,153 @@
+import random
+
+import chess
+import chess.polyglot
+import pytest
+
+from test_schedule import make_tabias
+from zugzwang.book import (
+    ENTRY,
+    BookError,
+    RepertoireBook,
+    book_entries,
+    decode_move,
+    encode_move,
+    export_book,
+)
+from zugzwang.cli import main
+
+WHITE = '[White "p"]\n\n'
+PGNS = {
+    "Italian": WHITE + "1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5 4. O-O *\n",
+    # transposes to the Italian after 2... Nc6, and disagrees
+    "Spanish": WHITE + "1. Nf3 Nc6 2. e4 e5 3. Bb5 *\n",
+    "Sicilian": '[Black "p"]\n\n1. e4 c5 2. Nf3 (2. c3 d5) d6 *\n',
+}
+
+
+def board(*sans):
+    board = chess.Board()
+    for san in sans:
+        board.push_san(san)
+    return board
+
+
+@pytest.fixture
+def book_path(tmp_path):
+    path = tmp_path / "repertoire.bin"
+    export_book(make_tabias(PGNS), path)
+    return path
+
+
+class TestMoves:
+    @pytest.mark.parametrize(
+        "fen",
+        [
+            "r3k2r/1P6/8/3pP3/8/8/8/R3K2R w KQkq d6 0 1",
+            "r3k2r/8/8/8/3pP3/8/1p6/R3K2R b KQkq e3 0 1",
+        ],
+    )
+    def test_round_trip(self, fen):
+        board = chess.Board(fen)
+        for move in board.legal_moves:
+            assert decode_move(board, encode_move(board, move)) == move
+
+    def test_castling(self):
+        board = chess.Board("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+        # the king takes its own rook
+        assert encode_move(board, chess.Move.from_uci("e1g1")) == 4 << 6 | 7
+        assert encode_move(board, chess.Move.from_uci("e1c1")) == 4 << 6 | 0
+
+
+class TestExport:
+    def test_entries(self):
+        entries = book_entries(make_tabias(PGNS))
+        # White's four problems in the Italian and three in the Spanish, and
+        # Black's three in the Sicilian; where the Italian and the Spanish share
+        # a position, each gives its own move
+        assert len(entries) == 10
+        assert [key for key, _, _ in entries] == sorted(key for key, _, _ in entries)
+        start = chess.polyglot.zobrist_hash(chess.Board())
+        assert sorted(
+            (move, weight) for key, move, weight in entries if key == start
+        ) == sorted(
+            [
+                (encode_move(chess.Board(), chess.Move.from_uci("e2e4")), 1),
+                (encode_move(chess.Board(), chess.Move.from_uci("g1f3")), 1),
+            ]
+        )
+
+    def test_weight(self):
+        pgns = {name: PGNS["Italian"] for name in ("First", "Second")}
+        entries = book_entries(make_tabias(pgns))
+        assert {weight for _, _, weight in entries} == {2}
+
+    def test_python_chess_reader(self, book_path):
+        # any Polyglot reader can use the book
+        with chess.polyglot.open_reader(book_path) as reader:
+            after = board("e4", "e5", "Nf3", "Nc6")
+            assert {entry.move for entry in reader.find_all(after)} == {
+                chess.Move.from_uci("f1c4"),
+                chess.Move.from_uci("f1b5"),
+            }
+            castling = board("e4", "e5", "Nf3", "Nc6", "Bc4", "Bc5")
+            assert reader.find(castling).move == chess.Move.from_uci("e1g1")
+
+
+class TestRepertoireBook:
+    def test_moves(self, book_path):
+        with RepertoireBook(book_path) as book:
+            assert len(book) == 10
+            assert book.moves(board("e4", "c5", "Nf3")) == [
+                (chess.Move.from_uci("d7d6"), 1)
+            ]
+            assert book.moves(board("d4")) == []
+            castling = board("e4", "e5", "Nf3", "Nc6", "Bc4", "Bc5")
+            assert book.moves(castling) == [(chess.Move.from_uci("e1g1"), 1)]
+
+    def test_contains(self, book_path):
+        with RepertoireBook(book_path) as book:
+            sicilian = board("e4", "c5", "c3")
+            assert book.contains(sicilian, chess.Move.from_uci("d7d5"))
+            assert not book.contains(sicilian, chess.Move.from_uci("d7d6"))
+            # transposed from the Spanish
+            spanish = board("Nf3", "Nc6", "e4", "e5")
+            assert book.contains(spanish, chess.Move.from_uci("f1c4"))
+
+    def test_agrees_with_linear_search(self, tmp_path):
+        rng = random.Random(0)
+        entries = sorted(
+            (rng.getrandbits(64), rng.getrandbits(12), 1) for _ in range(1000)
+        )
+        path = tmp_path / "random.bin"
+        path.write_bytes(b"".join(ENTRY.pack(*entry, 0) for entry in entries))
+        with RepertoireBook(path) as book:
+            for key, _, _ in rng.sample(entries, 100):
+                expected = [(m, w) for k, m, w in entries if k == key]
+                assert book.entries(key) == expected
+            assert book.entries(0) == []
+
+    def test_empty(self, tmp_path):
+        path = tmp_path / "empty.bin"
+        assert export_book([], path) == 0
+        with RepertoireBook(path) as book:
+            assert len(book) == 0
+            assert book.moves(chess.Board()) == []
+
+    def test_invalid(self, tmp_path):
+        path = tmp_path / "invalid.bin"
+        path.write_bytes(b"\0" * 17)
+        with pytest.raises(BookError):
+            RepertoireBook(path)
+
+
+class TestCLI:
+    def test_book(self, tmp_path, capsys):
+        collection = tmp_path / "Tabias"
+        collection.mkdir()
+        for name, pgn in PGNS.items():
+            (collection / f"{name}.pgn").write_text(pgn)
+        assert main(["book", str(collection), str(tmp_path / "book.bin")]) == 0
+        assert capsys.readouterr().out.strip().startswith("10 moves written")
+        with RepertoireBook(tmp_path / "book.bin") as book:
+            assert len(book) == 10
@@ -0,0 +1,155 @@
+import random
+
+import mock
+import pytest
+
+from test_schedule import MemoryIOManager, make_tabias
+from zugzwang import inputs
+from zugzwang.checkpoint import (
+    Checkpoint,
+    CheckpointError,
+    CheckpointWriter,
+    read_checkpoint,
+)
+from zugzwang.training import (
+    TrainingMode,
+    TrainingOptions,
+    TrainingSpec,
+    train,
+)
+
+PGNS = {
+    "Open": '[White "p"]\n\n1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. Ba4 *',
+    # played from the other side, so that no two problems share a position
+    "Closed": '[Black "p"]\n\n1. d4 d5 2. c4 e6 3. Nc3 Nf6 *',
+}
+
+
+class CheckpointIOManager(MemoryIOManager):
+    def __init__(self, pgns, path):
+        super().__init__(pgns)
+        self._path = path
+
+    def checkpoint_path(self, item):
+        return self._path
+
+
+class ScriptedGUI:
+    """Answers every problem correctly, quitting after the given number."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.played = []
+        self._board = None
+
+    def set_perspective(self, perspective):
+        pass
+
+    def setup_position(self, board):
+        self._board = board
+
+    def get_timed_input(self):
+        if len(self.played) == self.answers:
+            return inputs.TimedInput(inputs.QUIT, 0.0)
+        self.played.append(self._board.fen())
+        return inputs.TimedInput(self._solutions[self._board.fen()], 1.0)
+
+    def expect(self, tabias):
+        self._solutions = {
+            solution.parent.board().fen(): solution.move
+            for tabia in tabias
+            for solution in tabia.solutions()
+        }
+        return self
+
+
+@pytest.fixture(autouse=True)
+def no_sleep():
+    with mock.patch("zugzwang.problem.time.sleep"):
+        yield
+
+
+@pytest.fixture
+def session(tmp_path):
+    path = tmp_path / ".session.json"
+    io_manager = CheckpointIOManager(PGNS, path)
+    tabias = make_tabias(PGNS)
+    group = tabias[0].parent
+    return path, io_manager, group, tabias
+
+
+def problems_spec(group):
+    return TrainingSpec(group, TrainingOptions(mode=TrainingMode.PROBLEMS))
+
+
+class TestCheckpoint:
+    def test_round_trip(self):
+        rng = random.Random(5)
+        checkpoint = Checkpoint("PROBLEMS", [["a", "b"]], [(0, "ff")], rng.getstate())
+        restored = Checkpoint.from_json(checkpoint.as_json())
+        assert restored == checkpoint
+
+        other = random.Random()
+        restored.restore_rng(other)
+        assert other.random() == rng.random()
+
+    @pytest.mark.parametrize("json_str", ["", "[]", '{"mode": "LINES"}'])
+    def test_invalid(self, json_str):
+        with pytest.raises(CheckpointError):
+            Checkpoint.from_json(json_str)
+
+    def test_writer(self, tmp_path):
+        path = tmp_path / "session.json"
+        writer = CheckpointWriter(path)
+        for n in range(3):
+            writer.submit(lambda n=n: Checkpoint("LINES", [], [(0, str(n))]))
+        writer.close()
+        assert read_checkpoint(path).items == [(0, "2")]
+
+        writer = CheckpointWriter(path)
+        writer.discard()
+        assert not path.exists()
+
+
+class TestResume:
+    def test_quit_leaves_checkpoint(self, session):
+        path, io_manager, group, tabias = session
+        gui = ScriptedGUI(answers=2).expect(tabias)
+        train(problems_spec(group), gui, io_manager, random.Random(0))
+
+        checkpoint = read_checkpoint(path)
+        assert checkpoint.mode == "PROBLEMS"
+        assert len(checkpoint.items) == 7 - 2
+
+    def test_resume(self, session):
+        """A resumed session plays exactly what the interrupted one had left."""
+        path, io_manager, group, tabias = session
+        uninterrupted = ScriptedGUI(answers=100).expect(tabias)
+        train(problems_spec(group), uninterrupted, io_manager, random.Random(0))
+        assert not path.exists()
+
+        interrupted = ScriptedGUI(answers=3).expect(tabias)
+        train(problems_spec(group), interrupted, io_manager, random.Random(0))
+        # the collection is loaded afresh, as it would be after a restart
+        tabias = make_tabias(PGNS)
+        resumed = ScriptedGUI(answers=100).expect(tabias)
+        spec = TrainingSpec(tabias[1], TrainingOptions(mode=TrainingMode.RESUME))
+        train(spec, resumed, io_manager, random.Random(1))
+
+        assert interrupted.played + resumed.played == uninterrupted.played
+        assert not path.exists()
+
+    def test_no_checkpoint(self, session):
+        path, io_manager, group, tabias = session
+        gui = ScriptedGUI(answers=100).expect(tabias)
+        spec = TrainingSpec(group, TrainingOptions(mode=TrainingMode.RESUME))
+        train(spec, gui, io_manager)
+        assert gui.played == []
+
+    def test_lines(self, session):
+        path, io_manager, group, tabias = session
+        spec = TrainingSpec(group, TrainingOptions(mode=TrainingMode.LINES))
+        train(spec, ScriptedGUI(answers=1).expect(tabias), io_manager)
+        # quitting part way through a line keeps the whole line
+        saved = {key for _, key in read_checkpoint(path).items}
+        assert saved == {key for tabia in tabias for key, _ in tabia.identified_lines()}
@@ -0,0 +1,193 @@
+import chess
+import chess.pgn
+import pytest
+
+from test_schedule import make_tabias
+from zugzwang.book import BookError, EPDBook, MoveSource, RepertoireBook, export_book
+from zugzwang.cli import main
+from zugzwang.expand import (
+    ExpandError,
+    ExpandOptions,
+    expand,
+    write_tabia,
+)
+from zugzwang.group import DefaultIOManager, Group, Metadata, Tabia
+from zugzwang.lint import lint_game
+
+
+class DictSource(MoveSource):
+    """Moves by the SAN moves from the starting position."""
+
+    def __init__(self, moves):
+        self._moves = {}
+        for line, replies in moves.items():
+            board = chess.Board()
+            for san in line.split():
+                board.push_san(san)
+            self._moves[board.epd()] = [
+                (board.parse_san(san), weight) for san, weight in replies
+            ]
+        self.lookups = 0
+
+    def moves(self, board, key=None):
+        self.lookups += 1
+        return list(self._moves.get(board.epd(), ()))
+
+
+def lines(game):
+    found = []
+    stack = [(game, [])]
+    while stack:
+        node, moves = stack.pop()
+        if node.is_end():
+            found.append(" ".join(moves))
+        for child in reversed(node.variations):
+            stack.append((child, [*moves, child.san()]))
+    return found
+
+
+SICILIAN = DictSource(
+    {
+        "": [("e4", 10), ("d4", 5)],
+        "e4": [("c5", 50), ("e5", 30), ("e6", 15), ("a6", 1)],
+        "e4 c5": [("Nf3", 8), ("c3", 2)],
+        "e4 e5": [("Nf3", 3)],
+        "e4 c5 Nf3": [("d6", 4), ("Nc6", 3)],
+        "e4 c5 c3": [("d5", 1)],
+    }
+)
+
+
+class TestExpand:
+    def test_player_takes_heaviest(self):
+        game = expand(SICILIAN, chess.Board(), chess.WHITE).game
+        assert [child.san() for child in game.variations] == ["e4"]
+
+    def test_pruning(self):
+        options = ExpandOptions(max_replies=None, min_weight=2)
+        game = expand(SICILIAN, chess.Board(), chess.WHITE, options).game
+        assert lines(game) == [
+            "e4 c5 Nf3 d6",
+            "e4 c5 Nf3 Nc6",
+            "e4 e5 Nf3",
+            "e4 e6",
+        ]
+        options = ExpandOptions(max_replies=2)
+        game = expand(SICILIAN, chess.Board(), chess.WHITE, options).game
+        assert lines(game) == ["e4 c5 Nf3 d6", "e4 c5 Nf3 Nc6", "e4 e5 Nf3"]
+        options = ExpandOptions(max_replies=None, min_share=0.2, depth=2)
+        game = expand(SICILIAN, chess.Board(), chess.WHITE, options).game
+        assert lines(game) == ["e4 c5 Nf3", "e4 e5 Nf3"]
+
+    def test_depth(self):
+        # the player's move is added past the depth, so lines end on it, but
+        # for 1. d4, which the source has no reply to
+        options = ExpandOptions(depth=1)
+        game = expand(SICILIAN, chess.Board(), chess.BLACK, options).game
+        assert lines(game) == ["e4 c5", "d4"]
+        assert [node.san() for _, node, _ in lint_game(game, chess.BLACK)] == ["d4"]
+        options = ExpandOptions(depth=3)
+        game = expand(SICILIAN, chess.Board(), chess.BLACK, options).game
+        assert lines(game) == ["e4 c5 Nf3 d6", "e4 c5 c3 d5", "d4"]
+
+    def test_root(self):
+        root = chess.Board()
+        root.push_san("e4")
+        game = expand(SICILIAN, root, chess.BLACK).game
+        assert game.board() == root
+        assert game.headers["FEN"] == root.fen()
+        assert game.headers["Black"] == "p"
+        assert [child.san() for child in game.variations] == ["c5"]
+
+    def test_transpositions(self):
+        source = DictSource(
+            {
+                "": [("e4", 2), ("Nf3", 1)],
+                "e4": [("c5", 1)],
+                "e4 c5": [("Nf3", 1)],
+                "e4 c5 Nf3": [("d6", 1)],
+                "Nf3": [("c5", 1)],
+                "Nf3 c5": [("e4", 1)],
+            }
+        )
+        result = expand(source, chess.Board(), chess.BLACK)
+        # 1. Nf3 c5 2. e4 keeps its solution but is not grown again
+        assert lines(result.game) == ["e4 c5 Nf3 d6", "Nf3 c5 e4 d6"]
+        assert result.transpositions == 1
+        # every position is looked up once, the transposition for its solution
+        assert result.positions == 7
+        assert source.lookups == 8
+        assert list(lint_game(result.game, chess.BLACK)) == []
+
+    def test_from_book(self, tmp_path):
+        # a book of both sides' moves
+        pgns = {
+            "White": '[White "p"]\n\n1. e4 e5 2. Nf3 Nc6 3. Bc4 *\n',
+            "Black": '[Black "p"]\n\n1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5 *\n',
+        }
+        path = tmp_path / "book.bin"
+        export_book(make_tabias(pgns), path)
+        with RepertoireBook(path) as book:
+            game = expand(book, chess.Board(), chess.WHITE).game
+        assert lines(game) == ["e4 e5 Nf3 Nc6 Bc4 Bc5"]
+
+
+class TestEPDBook:
+    def test_moves(self, tmp_path):
+        path = tmp_path / "moves.epd"
+        path.write_text(
+            "# the starting position\n"
+            "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - bm e4 d4;\n"
+            "\n"
+            "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - bm d4;\n"
+            'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - id "no moves";\n'
+        )
+        book = EPDBook(path)
+        assert len(book) == 1
+        assert book.moves(chess.Board()) == [
+            (chess.Move.from_uci("d2d4"), 2),
+            (chess.Move.from_uci("e2e4"), 1),
+        ]
+        assert book.moves(chess.Board("8/8/8/8/8/8/8/K6k w - - 0 1")) == []
+
+    def test_invalid(self, tmp_path):
+        path = tmp_path / "invalid.epd"
+        path.write_text("not a position\n")
+        with pytest.raises(BookError, match="invalid.epd:1"):
+            EPDBook(path)
+
+
+class TestWriteTabia:
+    def test_loads(self, tmp_path):
+        game = expand(SICILIAN, chess.Board(), chess.BLACK).game
+        path = write_tabia(game, tmp_path, "Sicilian")
+        assert path == tmp_path / "Sicilian.pgn"
+        group = Group("Group")
+        io_manager = DefaultIOManager()
+        io_manager.register_group(group, tmp_path)
+        tabia = Tabia("Sicilian", group, io_manager)
+        assert tabia.metadata == Metadata(perspective=chess.BLACK)
+        assert len(tabia.solutions()) == 3
+
+    def test_names(self, tmp_path):
+        game = expand(SICILIAN, chess.Board(), chess.WHITE).game
+        write_tabia(game, tmp_path, "Open")
+        with pytest.raises(ExpandError):
+            write_tabia(game, tmp_path, "Open")
+        path = write_tabia(game, tmp_path)
+        assert path.stem != "Open" and path.with_suffix(".json").exists()
+
+
+class TestCLI:
+    def test_expand(self, tmp_path, capsys):
+        source = tmp_path / "moves.epd"
+        source.write_text(
+            "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - bm Nf3;\n"
+            "rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - bm Nc6 d6;\n"
+        )
+        args = ["expand", str(source), str(tmp_path / "Group"), "--moves", "e4 e5"]
+        assert main([*args, "--name", "Open", "--max-replies", "0"]) == 0
+        assert capsys.readouterr().out.startswith(str(tmp_path / "Group" / "Open"))
+        with open(tmp_path / "Group" / "Open.pgn") as fp:
+            game = chess.pgn.read_game(fp)
+        assert lines(game) == ["Nf3 Nc6", "Nf3 d6"]
@@ -0,0 +1,135 @@
+import random
+import time
+
+import mock
+import numpy as np
+import pytest
+
+from conftest import EPOCH, epoch_shift
+from zugzwang.forecast import ForecastOptions, ScheduleArrays, simulate
+from zugzwang.group import Metadata, Status
+
+
+def learned(last_study_offset: int, due_offset: int, **kwargs) -> Metadata:
+    return Metadata(
+        status=Status.LEARNED,
+        last_study_date=epoch_shift(last_study_offset),
+        due_date=epoch_shift(due_offset),
+        **kwargs,
+    )
+
+
+def review_days(forecast) -> list:
+    return np.flatnonzero(forecast.due).tolist()
+
+
+class TestSimulate:
+    def test_doubling(self):
+        """Successful reviews double the interval, as the multiplicative scheduler does."""
+        arrays = ScheduleArrays.from_metadata([learned(-1, 0, recall_radius=0)], EPOCH)
+        options = ForecastOptions(days=40, success_probability=1.0, new_per_day=0)
+        assert review_days(simulate(arrays, options)) == [0, 2, 6, 14, 30]
+
+    def test_recall_max(self):
+        arrays = ScheduleArrays.from_metadata(
+            [learned(-1, 0, recall_radius=0, recall_max=3)], EPOCH
+        )
+        options = ForecastOptions(days=12, success_probability=1.0, new_per_day=0)
+        assert review_days(simulate(arrays, options)) == [0, 2, 5, 8, 11]
+
+    def test_failures(self):
+        """A failed review is due again the next day."""
+        arrays = ScheduleArrays.from_metadata([learned(-10, 0)], EPOCH)
+        options = ForecastOptions(days=5, success_probability=0.0, new_per_day=0)
+        assert simulate(arrays, options).due.tolist() == [1] * 5
+
+    def test_overdue(self):
+        """Overdue tabias are all reviewed on the first day."""
+        arrays = ScheduleArrays.from_metadata(
+            [learned(-20, -10), learned(-5, -1), learned(-1, 3)], EPOCH
+        )
+        options = ForecastOptions(days=1, new_per_day=0)
+        assert simulate(arrays, options).due.tolist() == [2]
+
+    def test_new(self):
+        """New tabias are learned in order, then due the following day."""
+        arrays = ScheduleArrays.from_metadata([Metadata(recall_radius=0)] * 3, EPOCH)
+        options = ForecastOptions(days=4, success_probability=1.0, new_per_day=1)
+        forecast = simulate(arrays, options)
+        assert forecast.new.tolist() == [1, 1, 1, 0]
+        # the first tabia's second review coincides with the third's first
+        assert forecast.due.tolist() == [0, 1, 1, 2]
+
+    def test_override(self):
+        arrays = ScheduleArrays.from_metadata([learned(-1, 0, recall_radius=0)], EPOCH)
+        options = ForecastOptions(
+            days=30, success_probability=1.0, new_per_day=0, recall_factor=3.0
+        )
+        assert review_days(simulate(arrays, options)) == [0, 3, 12]
+        # the arrays themselves are untouched
+        assert arrays.recall_factor.tolist() == [2.0]
+
+    def test_sm2(self):
+        """Intervals of 1 and 6 days, then growing by the ease factor."""
+        arrays = ScheduleArrays.from_metadata(
+            [learned(-1, 0, recall_radius=0)], EPOCH, schedulers=["sm2"]
+        )
+        options = ForecastOptions(days=60, success_probability=1.0, new_per_day=0)
+        assert review_days(simulate(arrays, options)) == [0, 1, 7, 22]
+
+    def test_scheduler_override(self):
+        arrays = ScheduleArrays.from_metadata([learned(-1, 0, recall_radius=0)], EPOCH)
+        options = ForecastOptions(
+            days=10, success_probability=1.0, new_per_day=0, scheduler="sm2"
+        )
+        assert review_days(simulate(arrays, options)) == [0, 1, 7]
+
+    def test_seeded(self):
+        arrays = ScheduleArrays.from_metadata(
+            [learned(-n, n % 7) for n in range(1, 500)], EPOCH
+        )
+        options = ForecastOptions(days=60, seed=3)
+        first, second = simulate(arrays, options), simulate(arrays, options)
+        assert first.due.tolist() == second.due.tolist()
+
+    def test_scale(self):
+        """A year over 100k tabias runs in seconds."""
+        size = 100_000
+        rng = np.random.default_rng(0)
+        arrays = ScheduleArrays(
+            learned=rng.random(size) < 0.8,
+            last_study_date=-rng.integers(1, 100, size),
+            due_date=rng.integers(0, 100, size),
+            recall_factor=np.full(size, 2.0),
+            recall_radius=np.full(size, 3),
+            recall_max=np.full(size, 365),
+            ease=np.full(size, 2.5),
+            repetitions=rng.integers(0, 5, size),
+            # both registered schedulers, half each
+            scheduler=rng.integers(0, 2, size).astype(np.int8),
+        )
+        start = time.perf_counter()
+        forecast = simulate(arrays, ForecastOptions(days=365, seed=0))
+        assert time.perf_counter() - start < 10
+        assert len(forecast.due) == 365
+
+
+class TestMetadata:
+    def test_matches_forecast(self):
+        """Reviews on the due date fall on the days the forecast gives."""
+        metadata = learned(-1, 0, recall_radius=0)
+        days = []
+        with mock.patch("zugzwang.dates._today") as today:
+            for _ in range(5):
+                days.append((metadata.due_date - EPOCH).days)
+                today.return_value = metadata.due_date
+                metadata.success(random.Random(0))
+        assert days == [0, 2, 6, 14, 30]
+
+    def test_without_study_date(self):
+        """A success without a previous study date is due the next day."""
+        metadata = Metadata(due_date=epoch_shift(5))
+        with mock.patch("zugzwang.dates._today", return_value=EPOCH):
+            metadata.success(random.Random(0))
+        assert metadata.last_study_date == EPOCH
+        assert metadata.due_date == epoch_shift(1)
@@ -0,0 +1,89 @@
+import io
+import json
+
+import chess.pgn
+import pytest
+
+from zugzwang.cli import main
+from zugzwang.importer import ImportOptions, clean_games, import_pgn, read_games
+from zugzwang.multi import GameIndex
+
+GAMES = [
+    '[Event "A"]\n[White "p"]\n\n1. e4 { a comment\n[not a tag] } e5 2. Nf3 *\n',
+    '[Event "B"]\n\n1. d4 d5 (1... Nf6 $2 2. c4) 2. c4 *\n',
+    '[Event "C"]\n\n1. e4 e4 *\n',
+    '[Event "D"]\n\n1. c4 e5 *\n',
+]
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "db.pgn"
+    path.write_text("\n".join(GAMES * 10))
+    return path
+
+
+class TestStages:
+    def test_read_games(self):
+        texts = list(read_games(io.StringIO("\n".join(GAMES))))
+        assert [text.strip() for text in texts] == [game.strip() for game in GAMES]
+
+    @pytest.mark.parametrize("validate", [False, True])
+    def test_clean(self, validate):
+        cleaned = clean_games(GAMES, validate=validate)
+        assert "comment" not in cleaned[0]
+        for text, game in zip(cleaned, GAMES):
+            if text is None:
+                continue
+            expected = chess.pgn.read_game(io.StringIO(game))
+            actual = chess.pgn.read_game(io.StringIO(text))
+            assert actual.headers == expected.headers
+            assert actual.end().board() == expected.end().board()
+        game = chess.pgn.read_game(io.StringIO(cleaned[1]))
+        assert game.next().variations[1].nags == {2}
+
+    def test_validate(self):
+        cleaned = clean_games(GAMES, validate=True)
+        # the third game has an illegal move
+        assert cleaned[2] is None
+        assert "comment" in clean_games(GAMES[:1], comments=True, validate=True)[0]
+        assert "comment" in clean_games(GAMES[:1], comments=True)[0]
+
+
+class TestImport:
+    @pytest.mark.parametrize("workers", [0, 2])
+    def test_files(self, source, tmp_path, workers):
+        destination = tmp_path / "Imported"
+        options = ImportOptions(
+            workers=workers, chunk_games=3, max_pending=1, validate=True
+        )
+        report = import_pgn([source], destination, options)
+
+        assert (report.games, report.written, report.errors) == (40, 30, 10)
+        names = sorted(path.name for path in destination.iterdir())
+        assert len(names) == 30
+        # games keep their order in the source
+        assert names[:3] == ["db-000001.pgn", "db-000002.pgn", "db-000004.pgn"]
+        text = (destination / "db-000004.pgn").read_text()
+        assert chess.pgn.read_game(io.StringIO(text)).headers["Event"] == "D"
+
+    def test_again(self, source, tmp_path):
+        """A second import never overwrites the first."""
+        destination = tmp_path / "Imported"
+        options = ImportOptions(workers=0)
+        import_pgn([source], destination, options)
+        import_pgn([source], destination, options)
+        assert len(list(destination.iterdir())) == 80
+
+    def test_multi(self, source, tmp_path):
+        options = ImportOptions(workers=0, chunk_games=7, multi="Database")
+        import_pgn([source], tmp_path / "Imported", options)
+        path = tmp_path / "Imported" / "Database.multi.pgn"
+        # unvalidated, the game with an illegal move is kept
+        assert GameIndex.scan(path).names[:4] == ["A", "B", "C", "D"]
+        assert len(GameIndex.scan(path).games) == 40
+
+    def test_cli(self, source, tmp_path, capsys):
+        destination = tmp_path / "Imported"
+        assert main(["import", str(source), str(destination), "--json"]) == 0
+        assert json.loads(capsys.readouterr().out)["written"] == 40
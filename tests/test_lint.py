@@ -0,0 +1,159 @@
+import io
+import json
+import pathlib
+import shutil
+
+import chess
+import chess.pgn
+import pytest
+
+from zugzwang.cli import main
+from zugzwang.lint import LintCache, Rule, lint_collection, lint_file, lint_game
+
+TEST_PGNS = pathlib.Path(__file__).parent / "TestPGNs"
+
+
+def read(pgn):
+    return chess.pgn.read_game(io.StringIO(pgn))
+
+
+def issues(pgn, perspective=chess.BLACK):
+    return [
+        (rule, node.san() if node.parent else "", message)
+        for rule, node, message in lint_game(read(pgn), perspective)
+    ]
+
+
+class TestLintGame:
+    def test_clean(self):
+        assert issues("1. e4 e5 2. Nf3 Nc6 *") == []
+
+    def test_multiple_candidates(self):
+        found = issues("1. e4 e5 (1... c5 2. Nf3 d6) 2. Nf3 Nc6 *")
+        assert found == [
+            (Rule.MULTIPLE_CANDIDATES, "e4", "2 candidates; only e5 is used"),
+            (Rule.UNREACHABLE, "c5", "3 moves never trained"),
+        ]
+
+    def test_unknown_nag(self):
+        found = issues("1. e4 e5 (1... c5 $4 2. Nf3 d6) 2. Nf3 Nc6 *")
+        assert found == [
+            (Rule.UNKNOWN_NAG, "c5", "$4 is not a candidate, alternative or blunder"),
+            (Rule.UNREACHABLE, "c5", "3 moves never trained"),
+        ]
+
+    def test_hanging(self):
+        # after the blunder 1... c5, the problem is White's
+        found = issues("1. e4 e5 (1... c5 $2) 2. Nf3 *")
+        assert found == [
+            (Rule.HANGING_PROBLEM, "Nf3", "no reply"),
+            (Rule.HANGING_PROBLEM, "c5", "no reply"),
+        ]
+        found = issues("1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 $5 *")
+        assert found == [(Rule.HANGING_PROBLEM, "Bb5", "no candidate reply")]
+
+    def test_blunder_turns_perspective(self):
+        # after the blunder 1... f6, the replies to White's moves are problems
+        assert issues("1. e4 e5 (1... f6 $2 2. d4 e5 3. d5) *") == []
+        found = issues("1. e4 e5 (1... f6 $2 2. d4 (2. c4) e5 3. d5) *")
+        assert found == [
+            (Rule.MULTIPLE_CANDIDATES, "f6", "2 candidates; only d4 is used"),
+            (Rule.UNREACHABLE, "c4", "1 move never trained"),
+        ]
+
+    def test_parse_error(self):
+        found = issues("1. e4 e5 2. Ke3 *")
+        assert found[0][0] == Rule.PARSE_ERROR
+
+
+class TestLintFile:
+    def test_move_paths(self):
+        path = TEST_PGNS / "unreachable.pgn"
+        found = lint_file(path, {}, "unreachable.pgn")
+        assert [str(issue) for issue in found] == [
+            "unreachable.pgn: multiple-candidates: 1. e4: 2 candidates; "
+            "only e5 is used",
+            "unreachable.pgn: unreachable: 1. e4 c5: 3 moves never trained",
+            "unreachable.pgn: multiple-candidates: 1. e4 e5 2. Nf3: 2 candidates; "
+            "only Nc6 is used",
+            "unreachable.pgn: unreachable: 1. e4 e5 2. Nf3 Nf6: 3 moves never trained",
+        ]
+
+    def test_perspective(self):
+        path = TEST_PGNS / "unreachable.pgn"
+        found = lint_file(path, {None: chess.WHITE}, "unreachable.pgn")
+        assert {issue.rule for issue in found} == {Rule.HANGING_PROBLEM}
+
+    def test_multi(self, tmp_path):
+        path = tmp_path / "Openings.multi.pgn"
+        path.write_text(
+            '[Event "Clean"]\n\n1. e4 e5 *\n\n' '[Event "Hanging"]\n\n1. d4 d5 *\n'
+        )
+        (tmp_path / "Openings.multi").mkdir()
+        (tmp_path / "Openings.multi" / "Hanging.json").write_text(
+            '{"perspective": true}'
+        )
+        found = lint_file(path, {"Hanging": True}, "Openings.multi.pgn")
+        assert [(issue.game, issue.rule, issue.moves) for issue in found] == [
+            ("Hanging", Rule.HANGING_PROBLEM, "1. d4 d5")
+        ]
+
+
+class TestLintCollection:
+    @pytest.fixture
+    def collection(self, tmp_path):
+        shutil.copytree(TEST_PGNS, tmp_path / "Tabias")
+        return tmp_path / "Tabias"
+
+    @pytest.mark.parametrize("workers", [0, 2])
+    def test_workers(self, collection, workers):
+        report = lint_collection(collection, workers, use_cache=False)
+        expected = [
+            issue
+            for path in sorted(collection.iterdir())
+            for issue in lint_file(path, {}, path.name)
+        ]
+        assert report.files == 11
+        assert report.issues == expected
+
+    def test_cache(self, collection):
+        first = lint_collection(collection, 0)
+        assert (first.files, first.cached) == (11, 0)
+        again = lint_collection(collection, 0)
+        assert (again.files, again.cached) == (11, 11)
+        assert again.issues == first.issues
+
+        # a changed file, a changed perspective and a deleted file
+        (collection / "linear.pgn").write_text("1. e4 e5 (1... c5) *\n")
+        (collection / "branching.json").write_text('{"perspective": true}')
+        (collection / "blunder.pgn").unlink()
+        changed = lint_collection(collection, 0)
+        assert (changed.files, changed.cached) == (10, 8)
+        assert "blunder.pgn" not in LintCache(collection)._entries
+        assert any(issue.file == "linear.pgn" for issue in changed.issues)
+
+    def test_corrupt_cache(self, collection):
+        (collection / LintCache.FILENAME).write_text("{")
+        assert lint_collection(collection, 0).cached == 0
+
+
+class TestCLI:
+    def test_lint(self, tmp_path, capsys):
+        (tmp_path / "Clean.pgn").write_text("1. e4 e5 2. Nf3 Nc6 *\n")
+        assert main(["lint", str(tmp_path), "--workers", "0"]) == 0
+        (tmp_path / "Hanging.pgn").write_text("1. e4 e5 2. Nf3 *\n")
+        assert main(["lint", str(tmp_path), "--workers", "0", "--json"]) == 1
+        output = json.loads(capsys.readouterr().out.splitlines()[-1])
+        assert (output["files"], output["cached"]) == (2, 1)
+        assert output["issues"] == [
+            {
+                "file": "Hanging.pgn",
+                "game": None,
+                "rule": "hanging-problem",
+                "moves": "1. e4 e5 2. Nf3",
+                "message": "no reply",
+            }
+        ]
+        args = ["lint", str(tmp_path), "--workers", "0", "--ignore", "hanging-problem"]
+        assert main(args) == 0
+        assert main([*args, "--ignore", "nonsense"]) == 2
@@ -0,0 +1,89 @@
+import chess
+import pytest
+
+from zugzwang.group import DefaultIOManager, Group, Tabia
+from zugzwang.loader import initialise_group
+from zugzwang.multi import GameIndex, MultiGameFile, sidecar
+from zugzwang.summary import collect_metadata, summarise
+
+GAMES = [
+    '[Event "Open"]\n[White "p"]\n\n1. e4 e5 2. Nf3 Nc6 *\n',
+    '[Event "?"]\n[Black "p"]\n\n1. d4 d5 2. c4 e6 *\n',
+    '[Event "Open"]\n\n1. e4 c5 2. Nf3 d6 *\n',
+]
+
+
+@pytest.fixture
+def pgn_path(tmp_path):
+    path = tmp_path / "Repertoire.multi.pgn"
+    path.write_text("\n".join(GAMES))
+    return path
+
+
+class TestGameIndex:
+    def test_scan(self, pgn_path):
+        index = GameIndex.scan(pgn_path)
+        assert index.names == ["Open", "Game 2", "Open (2)"]
+        data = pgn_path.read_bytes()
+        assert all(
+            data[offset:].lstrip().startswith(b"[Event") for _, offset in index.games
+        )
+
+    def test_load(self, pgn_path):
+        index = GameIndex.load(pgn_path)
+        assert (sidecar(pgn_path) / GameIndex.FILENAME).exists()
+        assert GameIndex.load(pgn_path) == index
+
+        # an edited file is scanned afresh
+        with open(pgn_path, "a") as fp:
+            fp.write('\n[Event "Closed"]\n\n1. d4 Nf6 *\n')
+        assert GameIndex.load(pgn_path).names[-1] == "Closed"
+
+    def test_text(self, pgn_path):
+        multi_file = MultiGameFile(pgn_path, GameIndex.load(pgn_path))
+        assert multi_file.text("Game 2").strip() == GAMES[1].strip()
+        multi_file.close()
+
+
+class TestLoading:
+    def test_group(self, pgn_path):
+        io_manager = DefaultIOManager()
+        root = initialise_group("UserData", pgn_path.parent, io_manager)
+        (group,) = root.children
+        assert isinstance(group, Group)
+        assert group.name == "Repertoire"
+        assert [tabia.name for tabia in group.children] == [
+            "Open",
+            "Game 2",
+            "Open (2)",
+        ]
+        assert all(isinstance(tabia, Tabia) for tabia in group.children)
+        second = group.children[1]
+        assert second.game.next().move == chess.Move.from_uci("d2d4")
+        assert second.metadata.perspective == chess.BLACK
+
+    def test_metadata(self, pgn_path):
+        io_manager = DefaultIOManager()
+        root = initialise_group("UserData", pgn_path.parent, io_manager)
+        tabia = root.find(["Repertoire", "Open (2)"])
+        tabia.flip_perspective()
+        io_manager.write_meta(tabia)
+        assert (sidecar(pgn_path) / "Open (2).json").exists()
+
+        root = initialise_group("UserData", pgn_path.parent, DefaultIOManager())
+        reloaded = root.find(["Repertoire", "Open (2)"])
+        assert reloaded.metadata == tabia.metadata
+        perspectives = [m.perspective for m in collect_metadata(pgn_path.parent)]
+        assert perspectives[-1] == tabia.metadata.perspective
+
+    def test_summarise(self, pgn_path):
+        summary = summarise(pgn_path.parent)
+        (group,) = summary.children
+        assert group.name == "Repertoire"
+        assert [child.name for child in group.children] == [
+            "Open",
+            "Game 2",
+            "Open (2)",
+        ]
+        assert summarise(pgn_path.parent) == summary
+        assert summary.stats.total > 0
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from zugzwang.importer import ImportOptions, import_pgn
+from zugzwang.names import NameGenerator, NamingError, load_words, taken_names
+
+WORDS = ["alpha", "bravo", "charlie", "delta", "echo"]
+
+
+class TestNameGenerator:
+    def test_words(self):
+        words = load_words()
+        assert len(words) > 1000
+        assert all(len(word) > 3 for word in words)
+        assert load_words() is words
+
+    def test_random(self):
+        names = NameGenerator(WORDS, rng=random.Random(0))
+        generated = [names.random() for _ in range(20)]
+        assert len(set(generated)) == 20
+        assert all(name[0].isupper() for name in generated)
+
+    def test_taken(self, tmp_path):
+        (tmp_path / "AlphaBravoCharlie.pgn").write_text("")
+        (tmp_path / "Group").mkdir()
+        (tmp_path / "Other.multi.pgn").write_text("")
+        assert taken_names(tmp_path) == {"AlphaBravoCharlie", "Group", "Other"}
+
+        names = NameGenerator.for_directory(tmp_path, ["alpha", "bravo", "charlie"])
+        # every ordering of the three words but the one on disk
+        generated = {names.random() for _ in range(5)}
+        assert len(generated) == 5
+        assert "AlphaBravoCharlie" not in generated
+        with pytest.raises(NamingError):
+            names.random()
+
+    def test_content(self):
+        first = NameGenerator(WORDS).from_content("1. e4 *")
+        assert NameGenerator(WORDS).from_content("1. e4 *") == first
+
+        names = NameGenerator(WORDS, taken=[first])
+        second = names.from_content("1. e4 *")
+        assert second != first
+        assert NameGenerator(WORDS, taken=[first]).from_content("1. e4 *") == second
+
+    def test_too_few_words(self):
+        with pytest.raises(NamingError):
+            NameGenerator(WORDS[:2]).random()
+
+
+class TestImportNames:
+    def test_content(self, tmp_path):
+        """Content names make an import reproducible."""
+        source = tmp_path / "db.pgn"
+        source.write_text('[Event "a"]\n\n1. e4 e5 *\n\n[Event "b"]\n\n1. d4 d5 *\n')
+        options = ImportOptions(workers=0, names="content")
+        import_pgn([source], tmp_path / "A", options)
+        import_pgn([source], tmp_path / "B", options)
+        names = sorted(path.name for path in (tmp_path / "A").iterdir())
+        assert len(names) == 2
+        assert names == sorted(path.name for path in (tmp_path / "B").iterdir())
+
+    def test_words(self, tmp_path):
+        source = tmp_path / "db.pgn"
+        source.write_text('[Event "a"]\n\n1. e4 e5 *\n\n[Event "b"]\n\n1. d4 d5 *\n')
+        import_pgn([source], tmp_path / "A", ImportOptions(workers=0, names="words"))
+        assert len(list((tmp_path / "A").iterdir())) == 2
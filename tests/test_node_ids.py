@@ -0,0 +1,82 @@
+import io
+import pathlib
+
+import chess
+import chess.pgn
+import pytest
+
+from zugzwang.tools import ZugChessTools
+
+TEST_PGNS = pathlib.Path(__file__).parent / "TestPGNs"
+
+
+def read_game(name: str) -> chess.pgn.Game:
+    with open(TEST_PGNS / name) as fp:
+        return chess.pgn.read_game(fp)
+
+
+@pytest.fixture(params=sorted(path.name for path in TEST_PGNS.glob("*.pgn")))
+def game(request):
+    return read_game(request.param)
+
+
+class TestIdentifiedSolutionNodes:
+    @pytest.mark.parametrize("perspective", [chess.WHITE, chess.BLACK])
+    def test_same_solutions(self, game, perspective):
+        """The identified search finds exactly the solutions of the plain search."""
+        identified = ZugChessTools.get_identified_solution_nodes(game, perspective)
+        solutions = ZugChessTools.get_solution_nodes(game, perspective)
+        assert [node for _, node in identified] == solutions
+
+    @pytest.mark.parametrize("perspective", [chess.WHITE, chess.BLACK])
+    def test_ids_match_node_id(self, game, perspective):
+        """Ids found in one pass agree with ids computed from a single node."""
+        identified = ZugChessTools.get_identified_solution_nodes(game, perspective)
+        for id_, node in identified:
+            assert id_ == ZugChessTools.node_id(node)
+        assert len({id_ for id_, _ in identified}) == len(identified)
+
+    def test_stable_across_unrelated_edits(self):
+        """Adding and removing variations elsewhere leaves ids unchanged."""
+        game = read_game("branching.pgn")
+        before = dict(ZugChessTools.get_identified_solution_nodes(game, chess.WHITE))
+        game.add_variation(chess.Move.from_uci("g1f3")).add_variation(
+            chess.Move.from_uci("d7d5")
+        )
+        after = dict(ZugChessTools.get_identified_solution_nodes(game, chess.WHITE))
+        assert set(before) <= set(after)
+        for id_, node in before.items():
+            assert after[id_] is node
+
+    def test_reparse(self):
+        """Ids survive a round trip through PGN."""
+        game = read_game("branching.pgn")
+        reparsed = chess.pgn.read_game(io.StringIO(str(game)))
+        ids = [
+            id_
+            for id_, _ in ZugChessTools.get_identified_solution_nodes(game, chess.WHITE)
+        ]
+        reparsed_ids = [
+            id_
+            for id_, _ in ZugChessTools.get_identified_solution_nodes(
+                reparsed, chess.WHITE
+            )
+        ]
+        assert ids == reparsed_ids
+
+
+class TestIdentifiedLines:
+    @pytest.mark.parametrize("perspective", [chess.WHITE, chess.BLACK])
+    def test_same_lines(self, game, perspective):
+        identified = ZugChessTools.get_identified_lines(game, perspective)
+        lines = ZugChessTools.get_lines(game, perspective)
+        assert [line for _, line in identified] == lines
+
+    @pytest.mark.parametrize("perspective", [chess.WHITE, chess.BLACK])
+    def test_ids(self, game, perspective):
+        """A line's id is the hash of its end points' node ids."""
+        identified = ZugChessTools.get_identified_lines(game, perspective)
+        for id_, line in identified:
+            start = bytes.fromhex(ZugChessTools.node_id(line[0]))
+            end = bytes.fromhex(ZugChessTools.node_id(line[-1]))
+            assert id_ == ZugChessTools.line_id(start, end).hex()
@@ -0,0 +1,72 @@
+import chess
+import mock
+import pytest
+
+from conftest import epoch_shift
+from test_schedule import make_tabias
+from zugzwang import inputs
+from zugzwang.config import config
+from zugzwang.problem import Line, Problem, ScheduledProblem
+from zugzwang.queue import QueueResult
+from zugzwang.tools import ZugChessTools
+
+PGN = '[White "p"]\n\n1. e4 e5 2. Nf3 Nc6 *'
+WRONG = chess.Move.from_uci("a2a3")
+
+
+@pytest.fixture(autouse=True)
+def no_sleep():
+    with mock.patch("zugzwang.problem.time.sleep"):
+        yield
+
+
+def timed_gui(*inputs_):
+    gui = mock.MagicMock()
+    gui.get_timed_input.side_effect = [inputs.TimedInput(*input_) for input_ in inputs_]
+    return gui
+
+
+class TestThinkTime:
+    def test_problem(self):
+        """A problem's think time sums all tries at it."""
+        (tabia,) = make_tabias({"Open": PGN})
+        solution = tabia.solutions()[0]
+        problem = Problem(solution)
+        gui = timed_gui((WRONG, 4.0), (solution.move, 1.5))
+        assert problem.play(gui) == QueueResult.FAILURE
+        assert problem.think_time == 5.5
+
+    def test_line(self):
+        (tabia,) = make_tabias({"Open": PGN})
+        (line,) = tabia.lines()
+        gui = timed_gui(*[(node.move, 2.0) for node in line[1::2]])
+        item = Line(line)
+        assert item.play(gui) == QueueResult.SUCCESS
+        assert item.think_time == 2.0 * len(line[1::2])
+
+    @pytest.mark.parametrize("think_time, interval", [(5.0, 8), (60.0, 4)])
+    def test_slow_answer_holds_interval(self, think_time, interval):
+        """A correct answer slower than the configured limit doesn't grow."""
+        (tabia,) = make_tabias({"Open": PGN})
+        tabia.metadata.recall_radius = 0
+        solution = tabia.solutions()[0]
+        node_id = ZugChessTools.node_id(solution)
+        record = tabia.problems.setdefault(node_id)
+        record.last_study_date, record.due_date = epoch_shift(-4), epoch_shift(0)
+        problem = ScheduledProblem(solution, tabia, node_id)
+        problem.play(timed_gui((solution.move, think_time)))
+        assert record.due_date == epoch_shift(interval)
+
+    def test_tabia_scheduler(self):
+        """A problem is scheduled by its tabia's scheduler."""
+        (tabia,) = make_tabias({"Open": PGN})
+        tabia.metadata.recall_radius = 0
+        solution = tabia.solutions()[0]
+        node_id = ZugChessTools.node_id(solution)
+        record = tabia.problems.setdefault(node_id)
+        record.last_study_date, record.due_date = epoch_shift(-4), epoch_shift(0)
+        problem = ScheduledProblem(solution, tabia, node_id)
+        with mock.patch.dict(config, {"scheduler": "sm2"}):
+            problem.play(timed_gui((solution.move, 1.0)))
+        # the first SM-2 interval, where the multiplicative one is 8 days
+        assert (record.due_date, record.repetitions) == (epoch_shift(1), 1)
@@ -0,0 +1,165 @@
+import pathlib
+import shutil
+
+import chess
+import pytest
+
+from zugzwang import dates
+from zugzwang.cli import main
+from zugzwang.group import Metadata, Result, Status
+from zugzwang.loader import initialise_group
+from zugzwang.profiles import (
+    JOURNAL,
+    METADATA,
+    PROBLEMS,
+    ProfileError,
+    ProfileIOManager,
+    ProfileStore,
+    profile_names,
+)
+from zugzwang.summary import collect_metadata, summarise
+
+TEST_PGNS = pathlib.Path(__file__).parent / "TestPGNs"
+
+
+@pytest.fixture
+def collection(tmp_path):
+    """A tabia at the top level, and one in a group and one in a multi file."""
+    root = tmp_path / "Tabias"
+    root.mkdir()
+    shutil.copy(TEST_PGNS / "branching.pgn", root / "Branching.pgn")
+    (root / "Group").mkdir()
+    shutil.copy(TEST_PGNS / "linear.pgn", root / "Group" / "Linear.pgn")
+    (root / "Openings.multi.pgn").write_text('[Event "Open"]\n\n1. e4 e5 2. Nf3 *\n')
+    return root
+
+
+def load(collection, profile):
+    io_manager = ProfileIOManager(ProfileStore.open(collection, profile))
+    return initialise_group(collection.name, collection, io_manager), io_manager
+
+
+def learned():
+    return Metadata(
+        perspective=chess.BLACK,
+        status=Status.LEARNED,
+        last_study_date=dates.yesterday(),
+        due_date=dates.today(),
+    )
+
+
+class TestProfileStore:
+    def test_round_trip(self, tmp_path):
+        store = ProfileStore(tmp_path)
+        store.set(METADATA, "Group/Linear", "first")
+        store.set(METADATA, "Group/Linear", "second")
+        store.set(PROBLEMS, "Group/Linear", "problems")
+        store.close()
+        store = ProfileStore(tmp_path)
+        assert store.get(METADATA, "Group/Linear") == "second"
+        assert store.get(PROBLEMS, "Group/Linear") == "problems"
+        assert store.get(METADATA, "Branching") is None
+        assert (len(store), store.stale) == (2, 1)
+
+    def test_unchanged_not_appended(self, tmp_path):
+        store = ProfileStore(tmp_path)
+        store.set(METADATA, "Branching", "data")
+        store.set(METADATA, "Branching", "data")
+        store.close()
+        assert len((tmp_path / JOURNAL).read_text().splitlines()) == 1
+
+    def test_compact(self, tmp_path):
+        store = ProfileStore(tmp_path)
+        for day in range(2):
+            store.set(METADATA, "Branching", str(day))
+        # as many stale lines as live ones
+        assert not ProfileStore(tmp_path).compact()
+        store.set(METADATA, "Branching", "2")
+        store = ProfileStore(tmp_path)
+        assert store.compact()
+        assert store.stale == 0
+        store.set(METADATA, "Group/Linear", "data")
+        store.close()
+        lines = (tmp_path / JOURNAL).read_text().splitlines()
+        assert len(lines) == 2
+        assert ProfileStore(tmp_path).get(METADATA, "Branching") == "2"
+
+    def test_cut_line(self, tmp_path):
+        store = ProfileStore(tmp_path)
+        store.set(METADATA, "Branching", "data")
+        store.close()
+        with open(tmp_path / JOURNAL, "a") as fp:
+            fp.write('["meta","Group/Li')
+        store = ProfileStore(tmp_path)
+        assert len(store) == 1
+        store.set(METADATA, "Group/Linear", "data")
+        store.close()
+        assert len(ProfileStore(tmp_path)) == 2
+
+    def test_bad_line(self, tmp_path):
+        (tmp_path / JOURNAL).write_text('["meta"\n["meta","Branching","data",1]\n')
+        with pytest.raises(ProfileError, match=":1:"):
+            ProfileStore(tmp_path)
+
+    @pytest.mark.parametrize("name", ["", ".hidden", "a/b"])
+    def test_invalid_name(self, tmp_path, name):
+        with pytest.raises(ProfileError):
+            ProfileStore.open(tmp_path, name)
+
+    def test_missing(self, tmp_path):
+        with pytest.raises(ProfileError):
+            ProfileStore.open(tmp_path, "alice", create=False)
+        ProfileStore.open(tmp_path, "alice")
+        assert profile_names(tmp_path) == ["alice"]
+
+
+class TestProfileIOManager:
+    def test_profiles_apart(self, collection):
+        root, io_manager = load(collection, "alice")
+        linear = root.find(["Group", "Linear"])
+        linear.record_attempt(Result.SUCCESS)
+        io_manager.write_meta(linear)
+        io_manager.write_problems(linear)
+        opening = root.find(["Openings", "Open"])
+        opening.flip_perspective()
+        io_manager.write_meta(opening)
+        io_manager.store.close()
+
+        # nothing is written beside the PGNs
+        assert not list(collection.glob("**/Linear*.json"))
+        assert not list((collection / "Openings.multi").glob("Open*.json"))
+
+        root, io_manager = load(collection, "alice")
+        assert root.find(["Group", "Linear"]).metadata == linear.metadata
+        assert root.find(["Openings", "Open"]).metadata.perspective == chess.WHITE
+        root, io_manager = load(collection, "bob")
+        assert root.find(["Group", "Linear"]).metadata.status == Status.UNLEARNED
+        assert root.find(["Openings", "Open"]).metadata.perspective == chess.BLACK
+
+    def test_session_files(self, collection):
+        root, io_manager = load(collection, "alice")
+        directory = collection / ".profiles" / "alice"
+        assert io_manager.attempt_log(root).directory == directory / "attempts"
+        assert io_manager.checkpoint_path(root) == directory / "session.json"
+
+
+class TestSummary:
+    def test_profile_metadata(self, collection):
+        store = ProfileStore.open(collection, "alice")
+        store.set(METADATA, "Group/Linear", learned().as_json())
+        summary = summarise(collection, store=store)
+        group = next(child for child in summary.children if child.name == "Group")
+        # the problems of the learned tabia are due for its profile alone
+        assert group.stats.due == group.stats.total > 0
+        assert summarise(collection).stats.due == 0
+
+        store.set(METADATA, "Openings/Open", Metadata(perspective=True).as_json())
+        perspectives = [m.perspective for m in collect_metadata(collection, store)]
+        # Branching, Group/Linear and Openings/Open, in loading order
+        assert perspectives == [chess.WHITE, chess.BLACK, chess.WHITE]
+
+    def test_cli(self, collection, capsys):
+        ProfileStore.open(collection, "alice")
+        assert main(["stats", str(collection), "--profile", "alice"]) == 0
+        assert main(["stats", str(collection), "--profile", "bob"]) == 2
+        assert "no profile bob" in capsys.readouterr().err
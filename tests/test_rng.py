@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from conftest import epoch_shift
+from zugzwang import rng
+from zugzwang.config import config
+from zugzwang.dates import ZugDates
+from zugzwang.group import Metadata
+from zugzwang.queue import Queue, QueueItem
+from zugzwang.training import LineTrainer, TrainingOptions
+
+
+class Item(QueueItem):
+    def __init__(self, name):
+        self.name = name
+
+    def play(self, gui):
+        pass
+
+
+def due_dates(generator):
+    return [
+        ZugDates.due_date(epoch_shift(-10), epoch_shift(0), 2.0, 5, 365, generator)
+        for _ in range(20)
+    ]
+
+
+def queue_order(generator):
+    queue = Queue(insertion_index=5, insertion_radius=3, rng=generator)
+    queue.extend([Item(n) for n in range(10)])
+    for n in range(10, 30):
+        queue._insert(Item(n))
+    return [item.name for item in queue._queue]
+
+
+class TestInjectedRng:
+    @pytest.mark.parametrize("draw", [due_dates, queue_order])
+    def test_reproducible(self, draw):
+        """Equal seeds give equal results, whatever the global state."""
+        first = draw(random.Random(7))
+        random.seed(1)
+        random.random()
+        second = draw(random.Random(7))
+        assert first == second
+
+    def test_metadata(self):
+        def due_date(generator):
+            metadata = Metadata(
+                last_study_date=epoch_shift(-10),
+                due_date=epoch_shift(0),
+                recall_radius=10,
+            )
+            return [metadata._due_date(generator) for _ in range(10)]
+
+        assert due_date(random.Random(3)) == due_date(random.Random(3))
+
+    def test_trainer_shuffle(self):
+        """The trainer shuffles with its own generator."""
+
+        class Tabia:
+            def lines(self):
+                return [[n] for n in range(20)]
+
+        def order(generator):
+            trainer = LineTrainer(TrainingOptions(), rng=generator)
+            trainer._fill_queue(Tabia())
+            return [item._line for item in trainer._queue._queue]
+
+        assert order(random.Random(5)) == order(random.Random(5))
+        assert order(random.Random(5)) != order(random.Random(6))
+
+
+class TestDefaultRng:
+    def test_seeded_from_config(self, monkeypatch):
+        monkeypatch.setitem(config, "seed", 11)
+        monkeypatch.setattr(rng, "_rng", None)
+        first = due_dates(None)
+        monkeypatch.setattr(rng, "_rng", None)
+        assert due_dates(None) == first
+
+    def test_reseed(self, monkeypatch):
+        monkeypatch.setattr(rng, "_rng", None)
+        rng.reseed(4)
+        first = queue_order(None)
+        rng.reseed(4)
+        assert queue_order(None) == first
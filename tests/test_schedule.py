@@ -0,0 +1,162 @@
+import io
+
+import chess
+import chess.pgn
+import pytest
+
+from conftest import epoch_shift
+from zugzwang.group import Group, IOManager, Metadata, Status, Tabia
+from zugzwang.schedule import (
+    ProblemRecord,
+    ProblemStore,
+    ProblemStoreError,
+    due_problems,
+)
+from zugzwang.schedulers import get_scheduler
+from zugzwang.tools import ZugChessTools
+
+TODAY = epoch_shift(0)
+TOMORROW = epoch_shift(1)
+
+
+class MemoryIOManager(IOManager):
+    """Serves tabias from PGN strings, keeping metadata and problems in memory."""
+
+    def __init__(self, pgns, metadata=None):
+        self._pgns = pgns
+        self._metadata = metadata or {}
+
+    def read(self, tabia):
+        return chess.pgn.read_game(io.StringIO(self._pgns[tabia.name]))
+
+    def read_meta(self, tabia):
+        return self._metadata.get(tabia.name)
+
+    def write_meta(self, tabia):
+        self._metadata[tabia.name] = tabia.metadata
+
+    def read_problems(self, tabia):
+        return None
+
+    def write_problems(self, tabia):
+        pass
+
+
+def make_tabias(pgns, metadata=None):
+    group = Group("Group")
+    io_manager = MemoryIOManager(pgns, metadata)
+    for name in pgns:
+        group.add_child(Tabia(name, group, io_manager))
+    return group.children
+
+
+class TestProblemRecord:
+    def test_first_success(self):
+        """A first success makes the problem due tomorrow."""
+        record = ProblemRecord()
+        record.success(Metadata())
+        assert record == ProblemRecord(TODAY, TOMORROW, 1, 0)
+
+    def test_success(self):
+        """Later successes multiply the interval by the tabia's recall factor."""
+        record = ProblemRecord(epoch_shift(-4), TODAY, 1, 0)
+        record.success(Metadata(recall_radius=0, recall_factor=2.0))
+        assert record == ProblemRecord(TODAY, epoch_shift(8), 2, 0)
+
+    def test_failure(self):
+        record = ProblemRecord(epoch_shift(-4), TODAY, 1, 0)
+        record.failure(Metadata())
+        assert record == ProblemRecord(TODAY, TOMORROW, 1, 1)
+
+    def test_scheduler(self):
+        """A record is scheduled by the given scheduler, keeping its own state."""
+        metadata = Metadata(recall_radius=0)
+        scheduler = get_scheduler("sm2")
+        record = ProblemRecord(epoch_shift(-4), TODAY, 1, 0, repetitions=1)
+        record.success(metadata, scheduler=scheduler)
+        assert (record.due_date, record.repetitions) == (epoch_shift(6), 2)
+        record.failure(metadata, scheduler)
+        assert (record.repetitions, record.ease) == (0, 2.5 - 0.32)
+        # the tabia's own state is untouched
+        assert (metadata.repetitions, metadata.ease) == (0, 2.5)
+
+
+class TestProblemStore:
+    def test_round_trip(self):
+        store = ProblemStore()
+        store.setdefault("a").success(Metadata())
+        store.setdefault("b")
+        assert ProblemStore.from_json(store.as_json()).as_json() == store.as_json()
+        assert ProblemStore.from_json(store.as_json()).get("a") == store.get("a")
+
+    def test_scheduler_state(self):
+        """The SM-2 state is stored once it leaves its defaults."""
+        store = ProblemStore()
+        store.setdefault("a").success(Metadata())
+        assert store.as_json() == '{"a":[730120,730121,1,0]}\n'
+        store.setdefault("a").failure(Metadata(), get_scheduler("sm2"))
+        reloaded = ProblemStore.from_json(store.as_json()).get("a")
+        assert reloaded == store.get("a")
+        assert reloaded.ease == 2.5 - 0.32
+
+    @pytest.mark.parametrize("json_str", ["[]", "{", '{"a": [1, 2]}'])
+    def test_invalid(self, json_str):
+        with pytest.raises(ProblemStoreError):
+            ProblemStore.from_json(json_str)
+
+
+class TestDueProblems:
+    PGNS = {
+        "Open": '[White "p"]\n\n1. e4 e5 2. Nf3 Nc6 3. Bb5 *',
+        "Closed": '[White "p"]\n\n1. d4 d5 2. c4 e6 3. Nc3 *',
+    }
+
+    def test_new(self):
+        """Problems of unlearned tabias are new, limited by tabia."""
+        tabias = make_tabias(self.PGNS)
+        problems = due_problems(tabias, learning_limit=1, today=TODAY)
+        assert {problem.tabia.name for problem in problems} == {"Open"}
+        assert len(problems) == 3
+
+    def test_inherits_tabia_schedule(self):
+        """Problems without records follow their learned tabia's due date."""
+        metadata = {
+            "Open": Metadata(status=Status.LEARNED, due_date=TOMORROW),
+            "Closed": Metadata(status=Status.LEARNED, due_date=TODAY),
+        }
+        tabias = make_tabias(self.PGNS, metadata)
+        problems = due_problems(tabias, learning_limit=0, today=TODAY)
+        assert {problem.tabia.name for problem in problems} == {"Closed"}
+
+    def test_only_due_problems(self):
+        """Recorded problems are due by their own schedule, most overdue first."""
+        metadata = {"Open": Metadata(status=Status.LEARNED, due_date=TODAY)}
+        (tabia,) = make_tabias({"Open": self.PGNS["Open"]}, metadata)
+        first, second, third = [
+            ZugChessTools.node_id(solution) for solution in tabia.solutions()
+        ]
+        tabia.problems.setdefault(first).due_date = TOMORROW
+        tabia.problems.setdefault(second).due_date = epoch_shift(-1)
+        tabia.problems.setdefault(third).due_date = epoch_shift(-2)
+
+        problems = due_problems([tabia], learning_limit=0, today=TODAY)
+        assert [problem.node_id for problem in problems] == [third, second]
+
+
+class TestNodeId:
+    def test_depends_only_on_path(self):
+        """Editing elsewhere in the tree leaves a node's id unchanged."""
+        game = chess.pgn.read_game(io.StringIO("1. e4 e5 2. Nf3 *"))
+        node = game.next().next().next()
+        node_id = ZugChessTools.node_id(node)
+        game.add_variation(chess.Move.from_uci("d2d4"))
+        node.add_variation(chess.Move.from_uci("b8c6"))
+        assert ZugChessTools.node_id(node) == node_id
+
+    def test_distinct(self):
+        game = chess.pgn.read_game(io.StringIO("1. e4 (1. d4) 1... e5 *"))
+        ids = {
+            ZugChessTools.node_id(node)
+            for node in [game, *game.variations, game.next().next()]
+        }
+        assert len(ids) == 4
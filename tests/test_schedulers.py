@@ -0,0 +1,158 @@
+import datetime
+import random
+
+import mock
+import numpy as np
+import pytest
+
+from zugzwang import dates
+from zugzwang.forecast import ScheduleArrays
+from zugzwang.group import ROOT_NAME, DefaultIOManager, Metadata, Status
+from zugzwang.loader import initialise_group
+from zugzwang.schedulers import (
+    MultiplicativeScheduler,
+    SchedulerError,
+    SM2Scheduler,
+    get_scheduler,
+    scheduler_for,
+)
+from zugzwang.summary import collect_scheduled
+
+
+def days(date: datetime.date) -> int:
+    return (date - dates.today()).days
+
+
+def learned(previous_interval: int, **kwargs) -> Metadata:
+    today = dates.today()
+    return Metadata(
+        status=Status.LEARNED,
+        last_study_date=today - datetime.timedelta(days=previous_interval),
+        due_date=today,
+        recall_radius=0,
+        **kwargs,
+    )
+
+
+class TestRegistry:
+    def test_default(self):
+        assert isinstance(get_scheduler(), MultiplicativeScheduler)
+
+    def test_by_name(self):
+        assert isinstance(get_scheduler("sm2"), SM2Scheduler)
+
+    def test_unknown(self):
+        with pytest.raises(SchedulerError):
+            get_scheduler("leitner")
+
+    @pytest.mark.parametrize(
+        "group_names, expected",
+        [
+            (["Tabias", "Openings"], "multiplicative"),
+            (["Tabias", "Endgames"], "sm2"),
+            (["Tabias", "Endgames", "Rooks"], "sm2"),
+            (["Tabias", "Endgames", "Pawns"], "multiplicative"),
+        ],
+    )
+    def test_scheduler_for(self, group_names, expected):
+        """The innermost configured group decides."""
+        group_schedulers = {"Endgames": "sm2", "Pawns": "multiplicative"}
+        with mock.patch.dict(
+            "zugzwang.schedulers.config", {"group_schedulers": group_schedulers}
+        ):
+            assert scheduler_for(group_names).name == expected
+
+    @pytest.mark.parametrize("group", [ROOT_NAME, "Openings"])
+    def test_training_and_summary_agree(self, tmp_path, group):
+        """The trainer and the summaries name the groups alike."""
+        collection = tmp_path / "Tabias"
+        (collection / "Openings").mkdir(parents=True)
+        (collection / "Openings" / "Italian.pgn").write_text("1. e4 e5 2. Nf3 *\n")
+        with mock.patch.dict(
+            "zugzwang.schedulers.config", {"group_schedulers": {group: "sm2"}}
+        ):
+            root = initialise_group(ROOT_NAME, collection, DefaultIOManager())
+            assert [tabia.scheduler.name for tabia in root.tabias()] == ["sm2"]
+            assert [name for _, name in collect_scheduled(collection)] == ["sm2"]
+
+
+class TestMultiplicative:
+    def test_success(self):
+        """Reviewed on its due date, the interval doubles."""
+        metadata = learned(10)
+        metadata.success(random.Random(0))
+        assert days(metadata.due_date) == 20
+        assert metadata.last_study_date == dates.today()
+
+    def test_first_success(self):
+        metadata = Metadata()
+        metadata.success(random.Random(0))
+        assert days(metadata.due_date) == 1
+
+
+class TestSM2:
+    def test_intervals(self):
+        scheduler = get_scheduler("sm2")
+        metadata = Metadata(recall_radius=0)
+        intervals = []
+        with mock.patch("zugzwang.dates._today") as today:
+            today.return_value = datetime.date(2000, 1, 1)
+            for _ in range(5):
+                metadata.success(random.Random(0), scheduler=scheduler)
+                intervals.append(days(metadata.due_date))
+                today.return_value = metadata.due_date
+        assert intervals == [1, 6, 15, 38, 95]
+
+    def test_failure(self):
+        scheduler = get_scheduler("sm2")
+        metadata = learned(15, repetitions=3)
+        metadata.failure(scheduler)
+        assert metadata.repetitions == 0
+        assert metadata.ease == pytest.approx(2.18)
+
+    def test_minimum_ease(self):
+        scheduler = get_scheduler("sm2")
+        metadata = learned(1, ease=1.4)
+        metadata.failure(scheduler)
+        assert metadata.ease == SM2Scheduler.MIN_EASE
+
+    def test_json(self):
+        metadata = learned(6, ease=1.9, repetitions=4)
+        assert Metadata.from_json(metadata.as_json()) == metadata
+
+
+class TestBatch:
+    @pytest.mark.parametrize("name", ["multiplicative", "sm2"])
+    def test_matches_scalar(self, name):
+        """The batch API agrees with the scalar one, tabia by tabia."""
+        scheduler = get_scheduler(name)
+        metadata = [
+            learned(interval, ease=ease, repetitions=repetitions, recall_factor=1.5)
+            for interval in (1, 6, 17)
+            for ease in (1.3, 2.5)
+            for repetitions in (0, 1, 2, 5)
+        ]
+        arrays = ScheduleArrays.from_metadata(metadata, dates.today())
+        index = np.arange(len(metadata))
+        previous = arrays.due_date - arrays.last_study_date
+
+        scheduler.batch_success(arrays, index)
+        batch = scheduler.batch_interval(previous, arrays, index).tolist()
+
+        expected = []
+        for meta in metadata:
+            scheduler.success(meta)
+            expected.append(
+                scheduler.interval((meta.due_date - meta.last_study_date).days, meta)
+            )
+        assert batch == expected
+
+    def test_failure_matches_scalar(self):
+        scheduler = get_scheduler("sm2")
+        metadata = [learned(6, ease=ease, repetitions=3) for ease in (1.3, 1.5, 2.5)]
+        arrays = ScheduleArrays.from_metadata(metadata, dates.today())
+        scheduler.batch_failure(arrays, np.arange(len(metadata)))
+        for meta in metadata:
+            scheduler.failure(meta)
+        assert arrays.ease.tolist() == pytest.approx([meta.ease for meta in metadata])
+        assert arrays.repetitions.tolist() == [0, 0, 0]
@@ -0,0 +1,55 @@
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+REPO_ROOT = pathlib.Path(__file__).parent.parent
+
+# Generous enough for a slow CI machine; importing pygame alone blows through it
+# on most machines once the piece images are loaded.
+IMPORT_BUDGET_US = 1_000_000
+
+
+def _import_times(module: str) -> dict:
+    """
+    Import the module in a fresh interpreter with -X importtime, and return a
+    dict mapping each imported module to its cumulative import time in us.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestStartup:
+    @pytest.mark.parametrize(
+        "module",
+        [
+            "zugzwang.zugzwang",
+            "zugzwang.training",
+            "zugzwang.problem",
+            "zugzwang.queue",
+            "zugzwang.menus",
+        ],
+    )
+    def test_pygame_not_imported(self, module):
+        """Importing the package never imports pygame."""
+        times = _import_times(module)
+        assert module in times
+        assert not any(name.startswith("pygame") for name in times)
+
+    def test_import_budget(self):
+        """The entry point imports within budget."""
+        times = _import_times("zugzwang.zugzwang")
+        assert times["zugzwang.zugzwang"] < IMPORT_BUDGET_US
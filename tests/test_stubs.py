@@ -0,0 +1,117 @@
+import io
+import random
+import time
+
+import chess
+import chess.pgn
+import pytest
+
+from zugzwang.cli import main
+from zugzwang.group import default_metadata
+from zugzwang.stubs import enforce_stub, enforce_stub_files, leaves
+
+STUB = '[White "p"]\n\n1. e4 e5 (1... c5 2. Nf3) 2. Nf3 (2. Bc4) *\n'
+SOURCES = [
+    # reaches 1. e4 c5 2. Nf3 by transposition
+    "1. Nf3 c5 2. e4 d6 3. d4 *\n",
+    "1. e4 e5 2. Nf3 Nc6 (2... d6 3. d4) 3. Bb5 *\n",
+    "1. e4 e5 2. Nf3 Nf6 *\n",
+]
+
+
+def read(pgn):
+    return chess.pgn.read_game(io.StringIO(pgn))
+
+
+def random_lines(rng, count, plies):
+    lines = set()
+    while len(lines) < count:
+        board = chess.Board()
+        for _ in range(plies):
+            board.push(rng.choice(list(board.legal_moves)))
+        lines.add(tuple(board.move_stack))
+    return sorted(lines, key=lambda line: [move.uci() for move in line])
+
+
+def tree(lines, white="?"):
+    game = chess.pgn.Game(headers={"White": white})
+    for line in lines:
+        node = game
+        for move in line:
+            node = (
+                node.variation(move)
+                if node.has_variation(move)
+                else (node.add_variation(move))
+            )
+    return game
+
+
+class TestEnforceStub:
+    def test_leaves(self):
+        boards = leaves(read(STUB), chess.WHITE)
+        assert [board.move_stack for board in boards] == [[]] * 3
+        assert all(board.turn == chess.BLACK for board in boards)
+
+    def test_enforce(self):
+        result = enforce_stub(read(STUB), [read(pgn) for pgn in SOURCES])
+        assert result.unresolved == [
+            read("1. e4 e5 2. Bc4 *").end().board().fen(),
+        ]
+        first, second = result.games
+        # the first source to reach a leaf wins
+        assert [node.move.uci() for node in first.variations] == ["b8c6", "d7d6"]
+        assert [node.move.uci() for node in first.mainline()] == ["b8c6", "f1b5"]
+        assert first.headers["White"] == "p"
+        assert (
+            second.board().epd() == read(SOURCES[0]).next().next().next().board().epd()
+        )
+        assert [node.move.uci() for node in second.mainline()] == ["d7d6", "d2d4"]
+
+    def test_default_metadata(self):
+        stub = read('[Black "p"]\n\n1. e4 e5 2. Nf3 Nc6 (2... d6) *\n')
+        result = enforce_stub(stub, [read(pgn) for pgn in SOURCES])
+        # the games keep the full header roster, with the perspective marked
+        assert [default_metadata(game).perspective for game in result.games] == [
+            chess.BLACK,
+            chess.BLACK,
+        ]
+
+    def test_files(self, tmp_path):
+        stub = tmp_path / "stub.pgn"
+        stub.write_text(STUB)
+        sources = tmp_path / "sources"
+        sources.mkdir()
+        for index, pgn in enumerate(SOURCES):
+            (sources / f"{index}.pgn").write_text(pgn)
+        paths, unresolved = enforce_stub_files(stub, sources, tmp_path / "target")
+        assert len(paths) == 2 and len(unresolved) == 1
+        assert all(read(path.read_text()).headers["White"] == "p" for path in paths)
+
+        assert main(["stub", str(stub), str(sources), str(tmp_path / "t2")]) == 1
+
+    def test_scale(self):
+        """Thousands of leaves against hundreds of sources take seconds."""
+        rng = random.Random(0)
+        lines = random_lines(rng, 3000, 3)
+        stub = tree(lines, white="p")
+        sources = []
+        for index in range(300):
+            # each source continues ten of the leaves, with a few more moves
+            continued = []
+            for line in lines[index * 10 : index * 10 + 10]:
+                board = chess.Board()
+                for move in line:
+                    board.push(move)
+                for _ in range(6):
+                    if board.is_game_over():
+                        break
+                    board.push(rng.choice(list(board.legal_moves)))
+                continued.append(board.move_stack)
+            sources.append(tree(continued))
+
+        start = time.perf_counter()
+        result = enforce_stub(stub, sources)
+        elapsed = time.perf_counter() - start
+        assert len(result.games) + len(result.unresolved) == len(lines)
+        assert len(result.unresolved) == 0
+        assert elapsed < 5
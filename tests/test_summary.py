@@ -0,0 +1,101 @@
+import json
+import pathlib
+import shutil
+
+import chess
+import mock
+import pytest
+
+from zugzwang.cli import main
+from zugzwang.group import Metadata, Status
+from zugzwang.summary import _read_game, summarise
+from zugzwang import dates
+
+TEST_PGNS = pathlib.Path(__file__).parent / "TestPGNs"
+
+
+@pytest.fixture
+def collection(tmp_path):
+    """
+    A two-level collection: an unlearned tabia at the top level and a group
+    holding a due tabia.
+    """
+    shutil.copy(TEST_PGNS / "branching.pgn", tmp_path / "Branching.pgn")
+    group_path = tmp_path / "Group"
+    group_path.mkdir()
+    shutil.copy(TEST_PGNS / "linear.pgn", group_path / "Linear.pgn")
+    metadata = Metadata(
+        perspective=chess.BLACK,
+        status=Status.LEARNED,
+        last_study_date=dates.yesterday(),
+        due_date=dates.today(),
+    )
+    (group_path / "Linear.json").write_text(metadata.as_json())
+    return tmp_path
+
+
+class TestSummarise:
+    def test_counts_missing(self, collection):
+        """Without a cache, the solutions are counted and the cache filled."""
+        summary = summarise(collection)
+        assert (collection / ".solutions.json").exists()
+        assert (collection / "Group" / ".solutions.json").exists()
+        assert [child.name for child in summary.children] == ["Branching", "Group"]
+
+        branching, group = summary.children
+        assert branching.stats.new == branching.stats.total > 0
+        assert group.stats.due == group.stats.learned == group.stats.total > 0
+        assert summary.stats.total == branching.stats.total + group.stats.total
+
+    def test_cached(self, collection):
+        """A filled cache spares parsing the PGNs again."""
+        counted = summarise(collection)
+        with mock.patch("zugzwang.summary._read_game") as read_game:
+            assert summarise(collection) == counted
+        read_game.assert_not_called()
+
+    def test_refresh(self, collection):
+        """Refreshing parses every PGN, cached or not."""
+        counted = summarise(collection)
+        with mock.patch("zugzwang.summary._read_game", wraps=_read_game) as read_game:
+            assert summarise(collection, refresh=True) == counted
+        assert read_game.call_count == 2
+
+    def test_stale_entry(self, collection):
+        """Editing a PGN invalidates its cache entry."""
+        summarise(collection)
+        with open(collection / "Branching.pgn", "a") as fp:
+            fp.write("\n")
+        with mock.patch("zugzwang.summary._read_game", wraps=_read_game) as read_game:
+            summarise(collection)
+        read_game.assert_called_once_with(str(collection / "Branching.pgn"))
+
+    def test_perspective_change(self, collection):
+        """A flipped perspective invalidates the cache entry."""
+        summarise(collection)
+        meta_path = collection / "Group" / "Linear.json"
+        metadata = Metadata.from_json(meta_path.read_text())
+        metadata.perspective = chess.WHITE
+        meta_path.write_text(metadata.as_json())
+        with mock.patch("zugzwang.summary._read_game", wraps=_read_game) as read_game:
+            summarise(collection)
+        read_game.assert_called_once_with(str(collection / "Group" / "Linear.pgn"))
+
+
+class TestStatsCommand:
+    def test_json(self, collection, capsys):
+        assert main(["stats", str(collection), "--json"]) == 0
+        output = json.loads(capsys.readouterr().out)
+        assert output["name"] == collection.name
+        assert output["total"] > 0
+        assert [child["name"] for child in output["children"]] == [
+            "Branching",
+            "Group",
+        ]
+
+    def test_table(self, collection, capsys):
+        assert main(["stats", str(collection), "--refresh"]) == 0
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0].startswith("ID")
+        assert "Branching" in lines[1]
+        assert len(lines) == 4
@@ -0,0 +1,254 @@
+import datetime
+import json
+import random
+
+import chess
+import pytest
+
+from zugzwang.cli import main
+from zugzwang.group import Metadata, Status
+from zugzwang.profiles import (
+    JOURNAL,
+    METADATA,
+    PROBLEMS,
+    Journal,
+    ProfileStore,
+    merge_data,
+    profile_directory,
+)
+from zugzwang.schedule import ProblemRecord, ProblemStore
+from zugzwang.sync import (
+    ArchiveExchange,
+    DirectoryExchange,
+    SyncError,
+    open_exchange,
+    sync,
+)
+
+DAY = datetime.date(2026, 3, 1)
+
+
+def metadata(days=0, successes=0, perspective=chess.WHITE):
+    return Metadata(
+        perspective=perspective,
+        status=Status.LEARNED,
+        last_study_date=DAY + datetime.timedelta(days=days),
+        due_date=DAY + datetime.timedelta(days=days + 1),
+        successes=successes,
+    ).as_json()
+
+
+def problems(**records):
+    return ProblemStore(
+        {
+            node_id: ProblemRecord(
+                last_study_date=DAY + datetime.timedelta(days=days),
+                successes=successes,
+            )
+            for node_id, (days, successes) in records.items()
+        }
+    ).as_json()
+
+
+def store(collection):
+    return ProfileStore.open(collection, "alice")
+
+
+def journal_path(collection):
+    return profile_directory(collection, "alice") / JOURNAL
+
+
+@pytest.fixture
+def copies(tmp_path):
+    return tmp_path / "Laptop", tmp_path / "Desktop", tmp_path / "Exchange"
+
+
+class TestMerge:
+    def test_metadata(self):
+        older, newer = metadata(0, 5), metadata(1, 1)
+        assert merge_data(METADATA, older, newer) == newer
+        assert merge_data(METADATA, newer, older) == newer
+        # on the same day, more attempts win
+        assert merge_data(METADATA, metadata(0, 2), metadata(0, 3)) == metadata(0, 3)
+
+    def test_symmetric(self):
+        white = metadata(0, 1, chess.WHITE)
+        black = metadata(0, 1, chess.BLACK)
+        assert merge_data(METADATA, white, black) == merge_data(METADATA, black, white)
+
+    def test_problems(self):
+        local = problems(a=(0, 1), b=(2, 1))
+        remote = problems(a=(1, 1), c=(0, 1))
+        merged = problems(a=(1, 1), b=(2, 1), c=(0, 1))
+        assert merge_data(PROBLEMS, local, remote) == merged
+        assert merge_data(PROBLEMS, remote, local) == merged
+
+    def test_resolved_on_load(self, tmp_path):
+        with ProfileStore(tmp_path) as profile:
+            profile.set(METADATA, "Open", metadata(1))
+        journal = Journal(tmp_path / JOURNAL)
+        journal.append(METADATA, "Open", metadata(0), merge=True)
+        journal.append(METADATA, "Closed", metadata(0), merge=True)
+        journal.close()
+        with ProfileStore(tmp_path) as profile:
+            assert profile.get(METADATA, "Open") == metadata(1)
+            assert profile.get(METADATA, "Closed") == metadata(0)
+            # a later local write replaces the merge
+            profile.set(METADATA, "Open", metadata(0, perspective=chess.BLACK))
+        reloaded = ProfileStore(tmp_path)
+        assert reloaded.metadata("Open").perspective == chess.BLACK
+
+
+class TestJournal:
+    def test_since(self, tmp_path):
+        rng = random.Random(0)
+        journal = Journal(tmp_path / JOURNAL)
+        for number in range(500):
+            journal.append(METADATA, f"Tabia{number}", "x" * rng.randrange(300))
+        journal.close()
+        lines = (tmp_path / JOURNAL).read_bytes().splitlines(True)
+        for sequence in [0, 1, 137, 499, 500, 600]:
+            assert journal.since(sequence) == lines[sequence:]
+        assert Journal(tmp_path / JOURNAL).sequence == 500
+
+    def test_concurrent_writers(self, tmp_path):
+        """Each append numbers its lines after those of other writers."""
+        with ProfileStore(tmp_path) as profile:
+            profile.set(METADATA, "Open", metadata(0))
+            other = Journal(tmp_path / JOURNAL)
+            other.append(METADATA, "Closed", metadata(0), merge=True)
+            other.close()
+            profile.set(METADATA, "Open", metadata(1))
+            # a compaction elsewhere replaces the file under the open store
+            assert ProfileStore(tmp_path).compact(force=True)
+            profile.set(METADATA, "Open", metadata(2))
+            # and the lines appended elsewhere are kept by its own compaction
+            assert profile.compact(force=True)
+        lines = (tmp_path / JOURNAL).read_bytes().splitlines()
+        assert [json.loads(line)[3] for line in lines] == [2, 4]
+        reloaded = ProfileStore(tmp_path)
+        assert reloaded.get(METADATA, "Closed") == metadata(0)
+        assert reloaded.get(METADATA, "Open") == metadata(2)
+
+    def test_since_compacted(self, tmp_path):
+        with ProfileStore(tmp_path) as profile:
+            for day in range(4):
+                profile.set(METADATA, "Open", metadata(day))
+            profile.set(METADATA, "Closed", metadata(0))
+        profile = ProfileStore(tmp_path)
+        assert profile.compact()
+        # the lines keep their numbers, so a sync finds its place again
+        since = [json.loads(line)[1] for line in Journal(tmp_path / JOURNAL).since(3)]
+        assert since == ["Open", "Closed"]
+
+
+class TestSync:
+    def test_round_trip(self, copies):
+        laptop, desktop, exchange_path = copies
+        exchange = DirectoryExchange(exchange_path)
+        with store(laptop) as profile:
+            profile.set(METADATA, "Open", metadata(0))
+            profile.set(METADATA, "Closed", metadata(0))
+        with store(desktop) as profile:
+            profile.set(METADATA, "Open", metadata(1))
+            profile.set(PROBLEMS, "Open", problems(a=(1, 1)))
+
+        report = sync(laptop, "alice", exchange)
+        assert (report.sent, report.taken) == (2, 0)
+        report = sync(desktop, "alice", exchange)
+        assert (report.sent, report.taken, report.batches) == (2, 2, 1)
+        report = sync(laptop, "alice", exchange)
+        assert (report.sent, report.taken, report.batches) == (0, 2, 1)
+
+        for collection in (laptop, desktop):
+            profile = store(collection)
+            assert profile.get(METADATA, "Open") == metadata(1)
+            assert profile.get(METADATA, "Closed") == metadata(0)
+            assert profile.get(PROBLEMS, "Open") == problems(a=(1, 1))
+
+        # nothing new either way
+        assert sync(desktop, "alice", exchange).sent == 0
+        assert sync(laptop, "alice", exchange).taken == 0
+
+    def test_deltas(self, copies):
+        laptop, desktop, exchange_path = copies
+        exchange = DirectoryExchange(exchange_path)
+        with store(laptop) as profile:
+            for number in range(100):
+                profile.set(METADATA, f"Tabia{number}", metadata(0))
+        sync(laptop, "alice", exchange)
+        sync(desktop, "alice", exchange)
+        with store(laptop) as profile:
+            profile.set(METADATA, "Tabia7", metadata(1))
+        assert sync(laptop, "alice", exchange).sent == 1
+        report = sync(desktop, "alice", exchange)
+        assert (report.taken, report.batches) == (1, 1)
+        assert store(desktop).get(METADATA, "Tabia7") == metadata(1)
+
+    def test_new_exchange(self, copies, tmp_path):
+        """Batches keep their numbers rising across exchanges."""
+        laptop, desktop, exchange_path = copies
+        with store(laptop) as profile:
+            profile.set(METADATA, "Open", metadata(0))
+        sync(laptop, "alice", DirectoryExchange(exchange_path))
+        sync(desktop, "alice", DirectoryExchange(exchange_path))
+
+        replaced = DirectoryExchange(tmp_path / "Replaced")
+        with store(laptop) as profile:
+            profile.set(METADATA, "Closed", metadata(0))
+        assert sync(laptop, "alice", replaced).batch == 2
+        assert sync(desktop, "alice", replaced).taken == 1
+        assert store(desktop).get(METADATA, "Closed") == metadata(0)
+
+    def test_trainer_open(self, copies):
+        """Lines the trainer appends around a sync are sent by the next."""
+        laptop, desktop, exchange_path = copies
+        exchange = DirectoryExchange(exchange_path)
+        with store(desktop) as profile:
+            profile.set(METADATA, "Closed", metadata(0))
+        sync(desktop, "alice", exchange)
+        with store(laptop) as trainer:
+            trainer.set(METADATA, "Open", metadata(0))
+            assert sync(laptop, "alice", exchange).taken == 1
+            trainer.set(METADATA, "Open", metadata(1))
+            assert sync(laptop, "alice", exchange).sent == 1
+        sequences = [
+            json.loads(line)[3] for line in Journal(journal_path(laptop)).since(0)
+        ]
+        assert sequences == [1, 2, 3]
+        sync(desktop, "alice", exchange)
+        assert store(desktop).get(METADATA, "Open") == metadata(1)
+
+    def test_archive(self, copies):
+        laptop, desktop, exchange_path = copies
+        exchange = open_exchange(exchange_path.with_suffix(".zip"))
+        assert isinstance(exchange, ArchiveExchange)
+        with store(laptop) as profile:
+            profile.set(METADATA, "Open", metadata(0))
+        sync(laptop, "alice", exchange)
+        sync(desktop, "alice", exchange)
+        assert store(desktop).get(METADATA, "Open") == metadata(0)
+        exchange_path.with_suffix(".zip").write_text("not an archive")
+        with pytest.raises(SyncError):
+            sync(desktop, "alice", exchange)
+
+    def test_other_profiles(self, copies):
+        laptop, desktop, exchange_path = copies
+        exchange = DirectoryExchange(exchange_path)
+        with ProfileStore.open(laptop, "bob") as profile:
+            profile.set(METADATA, "Open", metadata(0))
+        sync(laptop, "bob", exchange)
+        assert sync(desktop, "alice", exchange).taken == 0
+
+
+class TestCLI:
+    def test_sync(self, copies, capsys):
+        laptop, desktop, exchange_path = copies
+        with store(laptop) as profile:
+            profile.set(METADATA, "Open", metadata(0))
+        options = ["--json", "--profile", "alice"]
+        assert main(["sync", str(exchange_path), str(laptop), "--json"]) == 2
+        assert main(["sync", str(exchange_path), str(laptop), *options]) == 0
+        assert main(["sync", str(exchange_path), str(desktop), *options]) == 0
+        output = json.loads(capsys.readouterr().out.splitlines()[-1])
+        assert (output["taken"], output["batches"]) == (1, 1)
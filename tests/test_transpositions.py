@@ -0,0 +1,135 @@
+import random
+
+import chess
+import chess.pgn
+import chess.polyglot
+import pytest
+
+from test_schedule import make_tabias
+from zugzwang.cli import main
+from zugzwang.config import config
+from zugzwang.tools import ZugChessTools
+from zugzwang.training import ProblemTrainer
+from zugzwang.transpositions import ZobristBoard, analyse, keyed_nodes
+
+WHITE = '[White "p"]\n\n'
+PGNS = {
+    "Italian": WHITE + "1. e4 e5 2. Nf3 Nc6 3. Bc4 *\n",
+    # reaches the Italian's third problem by another move order, and disagrees
+    "Spanish": WHITE + "1. Nf3 Nc6 2. e4 e5 3. Bb5 *\n",
+    # agrees with the Italian, and transposes within itself
+    "Knight": WHITE + "1. e4 e5 (1... Nc6 2. Nf3 e5 3. Bc4) 2. Nf3 Nc6 3. Bc4 *\n",
+}
+
+
+def tabias(*names):
+    return make_tabias({name: PGNS[name] for name in names})
+
+
+class TestZobristBoard:
+    # castling both ways, en passant and promotions are all legal here
+    @pytest.mark.parametrize(
+        "fen",
+        [
+            "r3k2r/1P6/8/3pP3/8/8/8/R3K2R w KQkq d6 0 1",
+            "r3k2r/8/8/8/3pP3/8/1p6/R3K2R b KQkq e3 0 1",
+        ],
+    )
+    def test_every_move(self, fen):
+        board = ZobristBoard(chess.Board(fen))
+        key = board.key
+        for move in list(board.board.legal_moves):
+            board.push(move)
+            assert board.key == chess.polyglot.zobrist_hash(board.board)
+            board.pop()
+            assert board.key == key
+
+    def test_random_games(self):
+        rng = random.Random(0)
+        for _ in range(20):
+            board = ZobristBoard(chess.Board())
+            while not board.board.is_game_over() and len(board.board.move_stack) < 200:
+                board.push(rng.choice(list(board.board.legal_moves)))
+                assert board.key == chess.polyglot.zobrist_hash(board.board)
+
+    def test_keyed_nodes(self):
+        game = tabias("Knight")[0].game
+        keyed = list(keyed_nodes(game))
+        assert len(keyed) == 10
+        for node, key in keyed:
+            assert key == chess.polyglot.zobrist_hash(node.board())
+
+
+class TestAnalyse:
+    def test_conflicts(self):
+        italian, spanish = tabias("Italian", "Spanish")
+        analysis = analyse([italian, spanish])
+        # the starting position, and that after 1. e4 e5 2. Nf3 Nc6
+        assert len(analysis.transpositions) == 2
+        assert analysis.conflicts == analysis.transpositions
+        transposition = analysis.transpositions[1]
+        assert transposition.epd == (
+            "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq -"
+        )
+        assert [occurrence.tabia for occurrence in transposition.occurrences] == [
+            italian,
+            spanish,
+        ]
+        assert transposition.moves == {
+            chess.Move.from_uci("f1c4"),
+            chess.Move.from_uci("f1b5"),
+        }
+        assert transposition.is_across
+        assert analysis.redundant() == set()
+
+    def test_within_tabia(self):
+        (knight,) = tabias("Knight")
+        analysis = analyse([knight])
+        (transposition,) = analysis.transpositions
+        assert not transposition.is_conflict
+        assert not transposition.is_across
+        # the later occurrence in preorder is the redundant one
+        first, second = transposition.occurrences
+        assert analysis.redundant() == {(id(knight), second.node_id)}
+
+    def test_redundant(self):
+        italian, spanish, knight = tabias("Italian", "Spanish", "Knight")
+        analysis = analyse([italian, spanish, knight])
+        problems = {
+            (id(tabia), node_id)
+            for tabia in (italian, spanish, knight)
+            for node_id, _ in tabia.identified_solutions()
+        }
+        # of the Knight's problems, only 2. Nf3 after 1. e4 e5 repeats the
+        # Italian's in a position without conflicts; its 1. e4 and both of its
+        # 3. Bc4 are asked again, as the Spanish disagrees there
+        repeated = ZugChessTools.node_id(knight.game.next().next().next())
+        assert analysis.redundant() == {(id(knight), repeated)}
+        assert analysis.redundant() < problems
+
+
+class TestDedupe:
+    def items(self, monkeypatch, dedupe):
+        monkeypatch.setitem(config, "dedupe_transpositions", dedupe)
+        trainer = ProblemTrainer()
+        return trainer._coalesced_items(tabias("Italian", "Spanish", "Knight"))
+
+    def test_off(self, monkeypatch):
+        assert len(self.items(monkeypatch, False)) == 11
+
+    def test_on(self, monkeypatch):
+        items = self.items(monkeypatch, True)
+        assert len(items) == 10
+        assert [item.tabia.name for item in items].count("Knight") == 4
+
+
+class TestCLI:
+    def test_transpositions(self, tmp_path, capsys):
+        for name, pgn in PGNS.items():
+            (tmp_path / f"{name}.pgn").write_text(pgn)
+        assert main(["transpositions", str(tmp_path), "--conflicts"]) == 1
+        output = capsys.readouterr().out.splitlines()
+        assert output[-1] == "3 transposed positions, 2 with conflicting solutions"
+
+        (tmp_path / "Spanish.pgn").unlink()
+        assert main(["transpositions", str(tmp_path)]) == 0
@@ -0,0 +1,236 @@
+import io
+import random
+import tracemalloc
+
+import chess
+import chess.pgn
+import mock
+import pytest
+
+from zugzwang.group import DefaultIOManager
+from zugzwang.loader import initialise_group
+from zugzwang.problem import Line, Problem
+from zugzwang.tools import ZugChessTools
+from zugzwang.tree import (
+    CompactNode,
+    CompactTree,
+    decode_move,
+    encode_move,
+    nag_mask,
+    nags_from_mask,
+)
+
+PGN = """[White "p"]
+
+1. e4 e5 (1... c5 $2 2. Nf3 d6 (2... Nc6 $5 3. d4) 3. d4) 2. Nf3 Nc6 $14
+3. Bb5 (3. Bc4 $5 Bc5) a6 (3... Nf6 $2 4. O-O) 4. Ba4 $1 *
+"""
+
+
+def read_both(pgn):
+    game = chess.pgn.read_game(io.StringIO(pgn))
+    tree = CompactTree.read(io.StringIO(pgn))
+    return game, tree.root
+
+
+def path(node):
+    return [move.uci() for move in node.board().move_stack]
+
+
+def random_pgn(size, seed=0):
+    """A PGN of a tree of about size nodes, grown by random walks."""
+    rng = random.Random(seed)
+    game = chess.pgn.Game()
+    count = 0
+    while count < size:
+        node, board = game, chess.Board()
+        for _ in range(20):
+            moves = [variation.move for variation in node.variations]
+            if not moves or rng.random() < 0.2:
+                legal = list(board.legal_moves)
+                if not legal:
+                    break
+                move = rng.choice(legal)
+                if move not in moves:
+                    node.add_variation(move, nags=rng.choice([(), (), (2,), (5,)]))
+                    count += 1
+            else:
+                move = rng.choice(moves)
+            node = node.variation(move)
+            board.push(move)
+    return str(game)
+
+
+class TestEncoding:
+    @pytest.mark.parametrize("uci", ["e2e4", "g1f3", "h7h8q", "a2a1n", "e1g1"])
+    def test_move(self, uci):
+        move = chess.Move.from_uci(uci)
+        assert encode_move(move) < 1 << 16
+        assert decode_move(encode_move(move)) == move
+
+    @pytest.mark.parametrize("nags", [set(), {2}, {5}, {1, 2}, {7}])
+    def test_nags(self, nags):
+        assert nags_from_mask(nag_mask(nags)) == nags
+
+    def test_other_nags(self):
+        """NAGs beyond the mask keep the node from passing for a candidate."""
+        nags = nags_from_mask(nag_mask({14}))
+        assert nags not in (set(), {2}, {5})
+
+
+class TestCompactTree:
+    def test_structure(self):
+        game, root = read_both(PGN)
+        assert root.headers["White"] == "p"
+        games = [game]
+        roots = [root]
+        while games:
+            node, compact = games.pop(), roots.pop()
+            assert compact.move == node.move
+            assert compact.nags == nags_from_mask(nag_mask(node.nags))
+            assert compact.board() == node.board()
+            assert len(compact.variations) == len(node.variations)
+            games.extend(node.variations)
+            roots.extend(compact.variations)
+
+    def test_from_game(self):
+        game, root = read_both(PGN)
+        tree = CompactTree.from_game(game)
+        assert tree.moves == root.tree.moves
+        assert tree.nags == root.tree.nags
+
+    def test_setup(self):
+        fen = "4k3/P7/8/8/8/8/8/4K3 w - - 0 1"
+        pgn = f'[FEN "{fen}"]\n[SetUp "1"]\n\n1. a8=Q+ Kd7 *'
+        root = CompactTree.read(io.StringIO(pgn)).root
+        assert root.board().fen() == fen
+        assert root.variations[0].move.promotion == chess.QUEEN
+
+    def test_end(self):
+        assert CompactTree.read(io.StringIO("")) is None
+
+    def test_headers(self):
+        """Like a Game, a tree has the Seven Tag Roster unless told otherwise."""
+        root = CompactTree.read(io.StringIO("1. e4 *")).root
+        assert root.headers == chess.pgn.Game().headers
+        assert dict(CompactTree({"White": "p"}).headers) == {"White": "p"}
+
+    def test_error(self):
+        """An illegal move is recorded, as on a Game, and ends the tree there."""
+        pgn = "1. e4 e5 2. Ke3 Nc6 *"
+        game, root = read_both(pgn)
+        assert [type(error) for error in root.errors] == [
+            type(error) for error in game.errors
+        ]
+        assert path(root.variations[0].next()) == path(game.next().next())
+        assert root.variations[0].next().is_end()
+
+    def test_next_and_san(self):
+        game, root = read_both(PGN)
+        node, compact = game, root
+        while node is not None:
+            assert path(compact) == path(node)
+            if node.parent is not None:
+                assert compact.san() == node.san()
+            node, compact = node.next(), compact.next()
+        assert compact is None
+
+
+class TestAdapters:
+    @pytest.mark.parametrize("perspective", [chess.WHITE, chess.BLACK])
+    def test_solutions(self, perspective):
+        game, root = read_both(PGN)
+        expected = ZugChessTools.get_identified_solution_nodes(game, perspective)
+        actual = ZugChessTools.get_identified_solution_nodes(root, perspective)
+        assert [(id_, path(node)) for id_, node in actual] == [
+            (id_, path(node)) for id_, node in expected
+        ]
+        assert all(ZugChessTools.node_id(node) == id_ for id_, node in actual)
+
+    @pytest.mark.parametrize("perspective", [chess.WHITE, chess.BLACK])
+    def test_lines(self, perspective):
+        game, root = read_both(PGN)
+        expected = ZugChessTools.get_identified_lines(game, perspective)
+        actual = ZugChessTools.get_identified_lines(root, perspective)
+        assert [(id_, [path(node) for node in line]) for id_, line in actual] == [
+            (id_, [path(node) for node in line]) for id_, line in expected
+        ]
+
+    def test_problem_and_line(self):
+        _, root = read_both(PGN)
+        solution = ZugChessTools.get_solution_nodes(root, chess.WHITE)[0]
+        assert Problem(solution).key == ZugChessTools.node_id(solution)
+        id_, line = ZugChessTools.get_identified_lines(root, chess.WHITE)[0]
+        assert Line(line).key == id_
+
+
+class TestSearch:
+    def test_alternative_and_blunder(self):
+        """Blunders are found beside alternatives to the same problem."""
+        pgn = '[White "p"]\n\n1. e4 e5 2. Nf3 (2. Bc4 $5 Nf6 3. d3) (2. f3 $2 Qh4+) *'
+        game = chess.pgn.read_game(io.StringIO(pgn))
+        lines = ZugChessTools.get_lines(game, chess.WHITE)
+        assert [move.uci() for move in lines[-1][-1].board().move_stack] == [
+            "e2e4",
+            "e7e5",
+            "f2f3",
+            "d8h4",
+        ]
+
+    def test_classify(self):
+        game = chess.pgn.read_game(io.StringIO(PGN))
+        replies = game.next().next().variations
+        candidate, alternatives, blunders = ZugChessTools.classify(replies)
+        assert candidate.move == chess.Move.from_uci("g1f3")
+        assert alternatives == blunders == []
+        candidate, alternatives, blunders = ZugChessTools.classify(
+            game.next().variations
+        )
+        assert [candidate.move.uci(), [node.move.uci() for node in blunders]] == [
+            "e7e5",
+            ["c7c5"],
+        ]
+
+
+class TestMemory:
+    def test_saving(self):
+        """A compact tree takes a small fraction of the memory of a GameNode tree."""
+        pgn = random_pgn(5000)
+
+        def retained(read):
+            tracemalloc.start()
+            result = read(io.StringIO(pgn))
+            size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return result, size
+
+        game, game_size = retained(chess.pgn.read_game)
+        tree, tree_size = retained(CompactTree.read)
+        assert len(tree) > 5000
+        assert tree_size * 10 < game_size
+
+
+class TestCollection:
+    def test_bad_game(self, tmp_path):
+        """A game with an illegal move loads up to the move, as a Game does."""
+        (tmp_path / "Bad.pgn").write_text("1. e4 e5 2. Ke3 Nc6 *\n")
+        (tmp_path / "Open.pgn").write_text("1. e4 e5 2. Nf3 Nc6 *\n")
+        with mock.patch.dict("zugzwang.group.config", {"compact_trees": True}):
+            root = initialise_group("UserData", tmp_path, DefaultIOManager())
+            assert [tabia.name for tabia in root.tabias()] == ["Bad", "Open"]
+            assert root.find(["Bad"]).game.errors
+
+    def test_load(self, tmp_path):
+        """A collection loads and trains from compact trees, headers or not."""
+        (tmp_path / "Open.pgn").write_text("1. e4 e5 2. Nf3 Nc6 3. Bb5 *\n")
+        (tmp_path / "Sicilian.pgn").write_text('[Black "p"]\n\n1. e4 c5 2. Nf3 d6 *\n')
+        with mock.patch.dict("zugzwang.group.config", {"compact_trees": True}):
+            root = initialise_group("UserData", tmp_path, DefaultIOManager())
+            tabias = {tabia.name: tabia for tabia in root.tabias()}
+            assert all(isinstance(tabia.game, CompactNode) for tabia in tabias.values())
+            assert tabias["Open"].metadata.perspective == chess.BLACK
+            assert tabias["Sicilian"].metadata.perspective == chess.BLACK
+            assert [path(node) for node in tabias["Open"].solutions()] == [
+                ["e2e4", "e7e5"],
+                ["e2e4", "e7e5", "g1f3", "b8c6"],
+            ]
@@ -0,0 +1,119 @@
+import json
+import pathlib
+import shlex
+import sys
+
+import pytest
+
+from test_schedule import make_tabias
+from zugzwang.cli import main
+from zugzwang.verify import (
+    EvaluationCache,
+    Mistake,
+    VerifyError,
+    VerifyOptions,
+    verify,
+)
+
+ENGINE = pathlib.Path(__file__).parent / "uci_engine.py"
+
+WHITE = '[White "p"]\n\n'
+PGNS = {
+    # 2. e5 leaves the pawn the engine takes with 2. exd5
+    "Advance": WHITE + "1. e4 d5 2. e5 *\n",
+    "Exchange": WHITE + "1. e4 d5 2. exd5 *\n",
+    # mate loses nothing
+    "Fool": '[Black "p"]\n\n1. f3 e5 2. g4 Qh4# *\n',
+}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """The stand-in engine's command, and a function counting its searches."""
+    log = tmp_path / "searches.log"
+
+    def searches():
+        if not log.exists():
+            return []
+        return [int(line) for line in log.read_text().split()]
+
+    return [sys.executable, str(ENGINE), str(log)], searches
+
+
+class TestVerify:
+    def test_mistakes(self, engine):
+        command, searches = engine
+        report = verify(make_tabias(PGNS), command, VerifyOptions(threshold=50))
+        assert report.solutions == 6
+        assert report.mistakes == [
+            Mistake("Advance", "1. e4 d5 2. e5", "e5", "exd5", 100)
+        ]
+        # four problems, and the positions after three solutions the engine
+        # differs from: 2. exd5 is its move, and after 2... Qh4# there is
+        # nothing to search
+        assert report.positions == 8
+        assert sum(searches()) == 7
+
+    def test_threshold(self, engine):
+        command, _ = engine
+        report = verify(make_tabias(PGNS), command, VerifyOptions(threshold=100))
+        assert report.mistakes == []
+
+    def test_workers(self, engine):
+        command, searches = engine
+        options = VerifyOptions(threshold=50, workers=2)
+        report = verify(make_tabias(PGNS), command, options)
+        assert len(report.mistakes) == 1
+        assert len(searches()) == 2
+
+    def test_cache(self, engine, tmp_path):
+        command, searches = engine
+        options = VerifyOptions(threshold=50, workers=1)
+        cache = EvaluationCache(tmp_path, "stand-in")
+        first = verify(make_tabias(PGNS), command, options, cache)
+        again = verify(
+            make_tabias(PGNS), command, options, EvaluationCache(tmp_path, "stand-in")
+        )
+        assert again.mistakes == first.mistakes
+        assert again.cached == 7
+        # the engine was not even started
+        assert searches() == [7]
+
+        # only the two new positions are searched
+        pgns = {**PGNS, "Scandinavian": WHITE + "1. e4 d5 2. exd5 Qxd5 3. Nc3 *\n"}
+        report = verify(
+            make_tabias(pgns), command, options, EvaluationCache(tmp_path, "stand-in")
+        )
+        assert (report.positions, report.cached) == (10, 7)
+        assert searches()[-1] == 2
+
+        # evaluations made with other settings are not used
+        assert len(EvaluationCache(tmp_path, "other")) == 0
+
+    def test_engine_missing(self, tmp_path):
+        with pytest.raises(VerifyError):
+            verify(make_tabias(PGNS), [str(tmp_path / "missing")])
+
+
+class TestCLI:
+    def test_verify(self, engine, tmp_path, capsys):
+        command, _ = engine
+        collection = tmp_path / "Tabias"
+        collection.mkdir()
+        for name, pgn in PGNS.items():
+            (collection / f"{name}.pgn").write_text(pgn)
+        args = ["verify", str(collection), "--engine", shlex.join(command)]
+        assert main([*args, "--threshold", "50", "--json"]) == 1
+        output = json.loads(capsys.readouterr().out)
+        assert output["mistakes"] == [
+            {
+                "tabia": "Advance",
+                "moves": "1. e4 d5 2. e5",
+                "solution": "e5",
+                "best": "exd5",
+                "loss": 100,
+            }
+        ]
+        assert main(args) == 0
+        assert "7 of 8 positions cached" in capsys.readouterr().out
+        assert main(["verify", str(collection)]) == 2
@@ -0,0 +1,183 @@
+import pathlib
+import shutil
+
+import pytest
+
+from zugzwang import dates
+from zugzwang.group import DefaultIOManager, Group, Metadata, Status
+from zugzwang.loader import initialise_group
+from zugzwang.multi import sidecar
+from zugzwang.reload import CollectionReloader
+from zugzwang.watch import InotifyWatcher, PollingWatcher, WatchError
+
+TEST_PGNS = pathlib.Path(__file__).parent / "TestPGNs"
+
+OPEN = '[White "p"]\n\n1. e4 e5 2. Nf3 Nc6 *\n'
+CLOSED = '[White "p"]\n\n1. d4 d5 2. c4 e6 3. Nc3 Nf6 *\n'
+
+
+def inotify_watcher(root):
+    try:
+        return InotifyWatcher(root)
+    except WatchError:
+        pytest.skip("inotify is unavailable")
+
+
+@pytest.fixture(params=[PollingWatcher, inotify_watcher])
+def make_watcher(request):
+    return request.param
+
+
+@pytest.fixture
+def collection(tmp_path):
+    (tmp_path / "Open.pgn").write_text(OPEN)
+    (tmp_path / "Group").mkdir()
+    shutil.copy(TEST_PGNS / "linear.pgn", tmp_path / "Group" / "Linear.pgn")
+    io_manager = DefaultIOManager()
+    root = initialise_group("UserData", tmp_path, io_manager)
+    root.update_stats()
+    return tmp_path, root, CollectionReloader(root, io_manager)
+
+
+class TestWatchers:
+    def test_changes(self, tmp_path, make_watcher):
+        (tmp_path / "Group").mkdir()
+        (tmp_path / "Open.pgn").write_text(OPEN)
+        watcher = make_watcher(tmp_path)
+        assert watcher.poll() == set()
+
+        (tmp_path / "Group" / "Closed.pgn").write_text(CLOSED)
+        (tmp_path / "Open.pgn").write_text(CLOSED)
+        (tmp_path / "notes.txt").write_text("ignored")
+        assert watcher.poll() == {
+            tmp_path / "Group" / "Closed.pgn",
+            tmp_path / "Open.pgn",
+        }
+
+        (tmp_path / "Open.pgn").unlink()
+        (tmp_path / "New").mkdir()
+        assert watcher.poll() == {tmp_path / "Open.pgn", tmp_path / "New"}
+
+        # files in a new directory are watched too
+        (tmp_path / "New" / "Open.pgn").write_text(OPEN)
+        assert watcher.poll() == {tmp_path / "New" / "Open.pgn"}
+        watcher.close()
+
+
+class TestReloader:
+    def test_created(self, collection):
+        path, root, reloader = collection
+        total = root.stats.total
+        (path / "Group" / "Closed.pgn").write_text(CLOSED)
+        assert reloader.apply({path / "Group" / "Closed.pgn"})
+
+        group = root.find(["Group"])
+        assert [child.name for child in group.children] == ["Closed", "Linear"]
+        assert root.stats.total == total + len(group.children[0].solutions())
+
+    def test_modified(self, collection):
+        path, root, reloader = collection
+        open_, linear = root.find(["Open"]), root.find(["Group", "Linear"])
+        game = linear.game
+        (path / "Open.pgn").write_text(CLOSED)
+        reloader.apply({path / "Open.pgn"})
+
+        # only the changed tabia is parsed again
+        assert root.find(["Open"]) is open_
+        assert open_.game.next().move.uci() == "d2d4"
+        assert linear.game is game
+        assert root.stats.total == open_.stats.total + linear.stats.total
+
+    def test_deleted(self, collection):
+        path, root, reloader = collection
+        (path / "Open.pgn").unlink()
+        reloader.apply({path / "Open.pgn"})
+        assert [child.name for child in root.children] == ["Group"]
+        assert root.stats == root.find(["Group"]).stats
+
+        shutil.rmtree(path / "Group")
+        reloader.apply({path / "Group"})
+        assert root.children == []
+        assert root.stats.total == 0
+
+    def test_new_directory(self, collection):
+        path, root, reloader = collection
+        (path / "New").mkdir()
+        (path / "New" / "Closed.pgn").write_text(CLOSED)
+        assert reloader.apply({path / "New", path / "New" / "Closed.pgn"})
+        new = root.find(["New"])
+        assert isinstance(new, Group)
+        assert [child.name for child in new.children] == ["Closed"]
+
+        # the new group's files are reloaded like any other
+        (path / "New" / "Closed.pgn").write_text(OPEN)
+        reloader.apply({path / "New" / "Closed.pgn"})
+        assert new.children[0].game.next().move.uci() == "e2e4"
+
+    def test_metadata(self, collection):
+        path, root, reloader = collection
+        open_ = root.find(["Open"])
+        metadata = Metadata(perspective=open_.metadata.perspective)
+        metadata.status = Status.LEARNED
+        metadata.due_date = dates.today()
+        (path / "Open.json").write_text(metadata.as_json())
+        assert reloader.apply({path / "Open.json"})
+        assert open_.metadata == metadata
+        assert root.stats.due == open_.stats.total
+
+    def test_lost_events(self, collection):
+        """A change to the root compares the whole tree with the disk."""
+        path, root, reloader = collection
+        (path / "Group" / "Linear.pgn").unlink()
+        (path / "Group" / "Closed.pgn").write_text(CLOSED)
+        reloader.apply({path})
+        group = root.find(["Group"])
+        assert [child.name for child in group.children] == ["Closed"]
+        assert root.stats.total == root.find(["Open"]).stats.total + group.stats.total
+
+    def test_lost_modifications(self, collection):
+        """Files changed while events were lost are reloaded too."""
+        path, root, reloader = collection
+        open_, linear = root.find(["Open"]), root.find(["Group", "Linear"])
+        game = linear.game
+        (path / "Open.pgn").write_text(CLOSED)
+        metadata = Metadata(perspective=linear.metadata.perspective)
+        metadata.status = Status.LEARNED
+        metadata.due_date = dates.today()
+        (path / "Group" / "Linear.json").write_text(metadata.as_json())
+        assert reloader.apply({path})
+
+        assert root.find(["Open"]) is open_
+        assert open_.game.next().move.uci() == "d2d4"
+        assert linear.game is game
+        assert linear.metadata == metadata
+        assert root.stats.due == linear.stats.total
+        assert root.stats.total == open_.stats.total + linear.stats.total
+
+        # the changes are only applied once
+        (path / "Open.pgn").write_text(OPEN)
+        reloader.apply({path / "Open.pgn"})
+        game = open_.game
+        reloader.apply({path})
+        assert open_.game is game
+
+    def test_lost_multi_metadata(self, collection):
+        """Metadata edited in a multi-game group's sidecar is reloaded too."""
+        path, root, reloader = collection
+        (path / "Games.multi.pgn").write_text(OPEN)
+        reloader.apply({path / "Games.multi.pgn"})
+        tabia = root.find(["Games", "Game 1"])
+        metadata = Metadata(perspective=tabia.metadata.perspective)
+        metadata.status = Status.LEARNED
+        metadata.due_date = dates.today()
+        (sidecar(path / "Games.multi.pgn") / "Game 1.json").write_text(
+            metadata.as_json()
+        )
+        assert reloader.apply({path})
+        assert tabia.metadata == metadata
+
+    def test_unrelated(self, collection):
+        path, root, reloader = collection
+        (path / ".attempts").mkdir()
+        (path / ".session.json").write_text("{}")
+        assert not reloader.apply({path / ".attempts", path / ".session.json"})
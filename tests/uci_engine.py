@@ -0,0 +1,81 @@
+"""
+A stand-in UCI engine for the tests, searching one ply by material.
+
+Its best move wins the most material, and its score is the material balance
+for the side to move after that move. The command counts of each run are
+appended to the file named by the first argument, if any.
+"""
+
+import sys
+
+import chess
+
+VALUES = {
+    chess.PAWN: 100,
+    chess.KNIGHT: 300,
+    chess.BISHOP: 300,
+    chess.ROOK: 500,
+    chess.QUEEN: 900,
+    chess.KING: 0,
+}
+
+
+def material(board, color):
+    return sum(
+        VALUES[piece.piece_type] * (1 if piece.color == color else -1)
+        for piece in board.piece_map().values()
+    )
+
+
+def search(board):
+    best, best_score = None, None
+    # in a fixed order, so that the choice between equal moves is stable
+    for move in sorted(board.legal_moves, key=lambda move: move.uci()):
+        board.push(move)
+        score = material(board, not board.turn)
+        board.pop()
+        if best_score is None or score > best_score:
+            best, best_score = move, score
+    return best, best_score
+
+
+def position(tokens):
+    if tokens[1] == "startpos":
+        board, rest = chess.Board(), tokens[2:]
+    else:
+        board, rest = chess.Board(" ".join(tokens[2:8])), tokens[8:]
+    if rest and rest[0] == "moves":
+        for uci in rest[1:]:
+            board.push_uci(uci)
+    return board
+
+
+def main():
+    board = chess.Board()
+    searches = 0
+    for line in sys.stdin:
+        tokens = line.split()
+        if not tokens:
+            continue
+        if tokens[0] == "uci":
+            print("id name Stand-in")
+            print("uciok")
+        elif tokens[0] == "isready":
+            print("readyok")
+        elif tokens[0] == "position":
+            board = position(tokens)
+        elif tokens[0] == "go":
+            searches += 1
+            move, score = search(board)
+            print(f"info depth 1 score cp {score} pv {move.uci()}")
+            print(f"bestmove {move.uci()}")
+        elif tokens[0] == "quit":
+            break
+        sys.stdout.flush()
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "a") as fp:
+            fp.write(f"{searches}\n")
+
+
+if __name__ == "__main__":
+    main()
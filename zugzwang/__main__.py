@@ -0,0 +1,5 @@
+import sys
+
+from zugzwang.cli import main
+
+sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Columnar analytics over the attempt log.
+
+Compaction folds rotated log segments into one NumPy file per field, in a
+numbered generation directory. Each generation lists the segments it consumed
+that are still on disk, so a compaction interrupted before deleting them never
+counts an attempt twice.
+Queries aggregate per problem with np.unique and np.bincount, without any Python
+loop over attempts.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import datetime
+import json
+import pathlib
+import shutil
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from zugzwang.attempts import CURRENT, RECORD, AttemptKind, AttemptLog
+
+# matches attempts.RECORD field for field
+DTYPE = np.dtype(
+    [
+        ("time", "<i8"),
+        ("node", "<u8"),
+        ("tabia", "<u8"),
+        ("kind", "u1"),
+        ("result", "u1"),
+        ("think_time", "<f4"),
+    ]
+)
+assert DTYPE.itemsize == RECORD.size
+
+COLUMNS_PREFIX = "columns-"
+MANIFEST = "segments.json"
+
+
+@dataclasses.dataclass
+class Attempts:
+    """Attempts as one array per field."""
+
+    time: np.ndarray
+    node: np.ndarray
+    tabia: np.ndarray
+    kind: np.ndarray
+    result: np.ndarray
+    think_time: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def select(self, mask: np.ndarray) -> Attempts:
+        return Attempts(
+            **{name: column[mask] for name, column in self._columns().items()}
+        )
+
+    def _columns(self) -> Dict[str, np.ndarray]:
+        return {field.name: getattr(self, field.name) for field in _FIELDS}
+
+    @classmethod
+    def from_records(cls, records: np.ndarray) -> Attempts:
+        return cls(
+            **{name: np.ascontiguousarray(records[name]) for name in DTYPE.names}
+        )
+
+    @classmethod
+    def concatenate(cls, parts: List[Attempts]) -> Attempts:
+        if not parts:
+            return cls.from_records(np.empty(0, dtype=DTYPE))
+        return cls(
+            **{
+                name: np.concatenate([getattr(part, name) for part in parts])
+                for name in DTYPE.names
+            }
+        )
+
+
+_FIELDS = dataclasses.fields(Attempts)
+
+
+@dataclasses.dataclass
+class Ranked:
+    node: int
+    tabia: int
+    attempts: int
+    # mean think time for slowest(), failure rate for hardest()
+    score: float
+
+
+def compact(log: AttemptLog) -> Optional[pathlib.Path]:
+    """
+    Fold the rotated segments of log into a new columns generation, returning
+    its path, or None if there was nothing to compact.
+    """
+    latest = _latest_generation(log.directory)
+    consumed = _consumed(latest)
+    segments = [segment for segment in log.segments() if segment.name not in consumed]
+    if not segments:
+        # what an interrupted compaction left behind is only deleted
+        for segment in log.segments():
+            if segment.name in consumed:
+                segment.unlink()
+        return None
+    parts = [_read_generation(latest)] if latest is not None else []
+    parts.extend(_read_segment(segment) for segment in segments)
+    attempts = Attempts.concatenate(parts)
+
+    number = _generation_number(latest) + 1 if latest is not None else 0
+    generation = log.directory / f"{COLUMNS_PREFIX}{number:06d}"
+    staging = generation.with_name(generation.name + ".tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir()
+    for name, column in attempts._columns().items():
+        np.save(staging / f"{name}.npy", column)
+    # the segments consumed before are listed again while they are on disk, in
+    # case a compaction stopped before deleting them
+    listed = {segment.name for segment in log.segments()}
+    names = sorted((consumed & listed) | {segment.name for segment in segments})
+    with open(staging / MANIFEST, "w") as fp:
+        json.dump(names, fp)
+    staging.rename(generation)
+
+    for segment in log.segments():
+        # segments rotated since the listing are left for the next compaction
+        if segment in segments or segment.name in consumed:
+            segment.unlink()
+    if latest is not None:
+        shutil.rmtree(latest)
+    return generation
+
+
+def load(log: AttemptLog, include_current: bool = True) -> Attempts:
+    """Every attempt in log: compacted, rotated and, optionally, current."""
+    latest = _latest_generation(log.directory)
+    consumed = _consumed(latest)
+    parts = [_read_generation(latest)] if latest is not None else []
+    parts.extend(
+        _read_segment(segment)
+        for segment in log.segments()
+        if segment.name not in consumed
+    )
+    if include_current and (log.directory / CURRENT).exists():
+        parts.append(_read_segment(log.directory / CURRENT))
+    return Attempts.concatenate(parts)
+
+
+def since(attempts: Attempts, date: datetime.date) -> Attempts:
+    """The attempts made on or after date, local time."""
+    start = datetime.datetime.combine(date, datetime.time())
+    return attempts.select(attempts.time >= int(start.timestamp() * 1000))
+
+
+def slowest(attempts: Attempts, n: int = 100) -> List[Ranked]:
+    """The n problems with the longest mean think time, slowest first."""
+    problems = attempts.select(
+        (attempts.kind == AttemptKind.PROBLEM) & np.isfinite(attempts.think_time)
+    )
+    return _rank(problems, problems.think_time.astype(np.float64), n)
+
+
+def hardest(attempts: Attempts, n: int = 100) -> List[Ranked]:
+    """The n problems failed most often relative to their attempts."""
+    problems = attempts.select(attempts.kind == AttemptKind.PROBLEM)
+    return _rank(problems, (problems.result == 0).astype(np.float64), n)
+
+
+def _rank(attempts: Attempts, values: np.ndarray, n: int) -> List[Ranked]:
+    # mean of values per problem, highest first
+    if not len(attempts):
+        return []
+    # node ids repeat across tabias, so a problem is keyed by both; the pair is
+    # packed into one integer from the positions of each in its unique values,
+    # as sorting plain integers is far faster than sorting records
+    tabias, tabia_inverse = np.unique(attempts.tabia, return_inverse=True)
+    nodes, node_inverse = np.unique(attempts.node, return_inverse=True)
+    keys = tabia_inverse.astype(np.int64) * len(nodes) + node_inverse
+    keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    key_tabias, key_nodes = tabias[keys // len(nodes)], nodes[keys % len(nodes)]
+    means = np.bincount(inverse, weights=values) / counts
+    n = min(n, len(keys))
+    top = np.argpartition(-means, n - 1)[:n]
+    # ties broken by attempts, then tabia and node id, for a stable report
+    top = top[np.lexsort((key_nodes[top], key_tabias[top], -counts[top], -means[top]))]
+    return [
+        Ranked(
+            node=int(key_nodes[i]),
+            tabia=int(key_tabias[i]),
+            attempts=int(counts[i]),
+            score=float(means[i]),
+        )
+        for i in top
+    ]
+
+
+def _read_segment(path: pathlib.Path) -> Attempts:
+    # a partly written trailing record, from a crash mid-append, is ignored
+    data = path.read_bytes()
+    whole = len(data) - len(data) % DTYPE.itemsize
+    return Attempts.from_records(np.frombuffer(data[:whole], dtype=DTYPE))
+
+
+def _read_generation(generation: pathlib.Path) -> Attempts:
+    return Attempts(
+        **{
+            name: np.load(generation / f"{name}.npy", mmap_mode="r")
+            for name in DTYPE.names
+        }
+    )
+
+
+def _consumed(generation: Optional[pathlib.Path]) -> Set[str]:
+    # the segments already folded into generation
+    if generation is None:
+        return set()
+    with open(generation / MANIFEST) as fp:
+        return set(json.load(fp))
+
+
+def _latest_generation(directory: pathlib.Path) -> Optional[pathlib.Path]:
+    if not directory.exists():
+        return None
+    generations = sorted(
+        path
+        for path in directory.iterdir()
+        if path.name.startswith(COLUMNS_PREFIX) and not path.name.endswith(".tmp")
+    )
+    return generations[-1] if generations else None
+
+
+def _generation_number(generation: pathlib.Path) -> int:
+    return int(generation.name[len(COLUMNS_PREFIX) :])
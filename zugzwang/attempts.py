@@ -0,0 +1,167 @@
+"""
+Append-only log of training attempts.
+
+Each attempt is a fixed-size little-endian record, appended to the current
+segment of a log directory. Once the current segment grows past
+config["attempt_log_segment_bytes"] it is rotated out, to be compacted into
+columnar files by zugzwang.analytics. Writing needs nothing beyond the standard
+library, so training never loads NumPy.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import enum
+import hashlib
+import math
+import os
+import pathlib
+import struct
+import time
+from typing import List, Optional, TYPE_CHECKING
+
+import chess.pgn
+import chess.polyglot
+
+from zugzwang.config import config
+from zugzwang.tools import ZugChessTools
+
+if TYPE_CHECKING:
+    from zugzwang.group import Tabia
+
+# time (ms since the epoch), node id, tabia id, kind, result, think time (s)
+RECORD = struct.Struct("<qQQBBf")
+
+CURRENT = "current.log"
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+
+
+class AttemptKind(enum.IntEnum):
+    PROBLEM = 0
+    TABIA = 1
+
+
+@dataclasses.dataclass
+class Attempt:
+    node_id: int
+    tabia_id: int
+    kind: AttemptKind
+    success: bool
+    # seconds from display to answer; NaN when not measured
+    think_time: float = math.nan
+    # ms since the epoch; the time of appending when not given
+    time: Optional[int] = None
+
+    def pack(self) -> bytes:
+        time_ = self.time if self.time is not None else time.time_ns() // 1_000_000
+        return RECORD.pack(
+            time_,
+            self.node_id,
+            self.tabia_id,
+            self.kind,
+            self.success,
+            self.think_time,
+        )
+
+
+def tabia_id(tabia: Tabia) -> int:
+    """
+    A 64-bit id of a tabia, from its name and the names of its groups below the
+    root, so that it survives moving the collection.
+    """
+    path = "/".join(tabia.path).encode()
+    return int.from_bytes(hashlib.blake2b(path, digest_size=8).digest(), "big")
+
+
+def node_id(node: chess.pgn.GameNode) -> int:
+    return int(ZugChessTools.node_id(node), 16)
+
+
+class AttemptLog:
+    def __init__(self, directory: pathlib.Path):
+        self._directory = pathlib.Path(directory)
+
+    @property
+    def directory(self) -> pathlib.Path:
+        return self._directory
+
+    def append(self, attempt: Attempt) -> None:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        current = self._directory / CURRENT
+        with open(current, "ab") as fp:
+            # drop a partial record left by an interrupted append
+            if partial := fp.tell() % RECORD.size:
+                fp.truncate(fp.tell() - partial)
+            fp.write(attempt.pack())
+            size = fp.tell()
+        if size >= config["attempt_log_segment_bytes"]:
+            self.rotate()
+
+    def record_problem(
+        self,
+        tabia: Tabia,
+        solution: chess.pgn.ChildNode,
+        success: bool,
+        think_time: float = math.nan,
+    ) -> None:
+        self.append(
+            Attempt(
+                node_id(solution),
+                tabia_id(tabia),
+                AttemptKind.PROBLEM,
+                success,
+                think_time,
+            )
+        )
+
+    def record_tabia(self, tabia: Tabia, success: bool) -> None:
+        # a tabia attempt is identified by the zobrist hash of its root position,
+        # as every root has the same node id
+        self.append(
+            Attempt(
+                chess.polyglot.zobrist_hash(tabia.game.board()),
+                tabia_id(tabia),
+                AttemptKind.TABIA,
+                success,
+            )
+        )
+
+    def rotate(self) -> Optional[pathlib.Path]:
+        """Close the current segment, returning its new path, if it has any."""
+        current = self._directory / CURRENT
+        if not current.exists() or current.stat().st_size == 0:
+            return None
+        # nanosecond names keep segments in order of rotation
+        segment = self._directory / (
+            f"{SEGMENT_PREFIX}{time.time_ns():020d}{SEGMENT_SUFFIX}"
+        )
+        os.replace(current, segment)
+        return segment
+
+    def segments(self) -> List[pathlib.Path]:
+        """The rotated segments, oldest first."""
+        if not self._directory.exists():
+            return []
+        return sorted(
+            path
+            for path in self._directory.iterdir()
+            if path.name.startswith(SEGMENT_PREFIX)
+            and path.name.endswith(SEGMENT_SUFFIX)
+        )
+
+
+class ProblemAttempts:
+    """Records the attempts at the problems of one tabia."""
+
+    def __init__(self, log: AttemptLog, tabia: Tabia):
+        self._log = log
+        self._tabia = tabia
+
+    def record(
+        self,
+        solution: chess.pgn.ChildNode,
+        success: bool,
+        think_time: float = math.nan,
+    ) -> None:
+        self._log.record_problem(self._tabia, solution, success, think_time)
@@ -0,0 +1,85 @@
+"""
+Load-aware due dates.
+
+A DueDateIndex counts the learned tabias due on each day. When scheduling a
+tabia, it picks a day within the tabia's recall radius that keeps the daily
+review count near a target, rather than a uniformly random one.
+"""
+
+from __future__ import annotations
+
+import collections
+import datetime
+import random
+from typing import Iterable, Optional
+
+from zugzwang.group import Metadata, Status
+from zugzwang.rng import default_rng
+
+
+class DueDateIndex:
+    def __init__(self, target: int):
+        self._target = target
+        self._counts: collections.Counter = collections.Counter()
+
+    @classmethod
+    def from_metadata(cls, metadata: Iterable[Metadata], target: int) -> DueDateIndex:
+        index = cls(target)
+        for meta in metadata:
+            index.add(meta)
+        return index
+
+    @property
+    def target(self) -> int:
+        return self._target
+
+    def count(self, date: datetime.date) -> int:
+        return self._counts[date]
+
+    def add(self, metadata: Metadata) -> None:
+        if (date := self._indexed_date(metadata)) is not None:
+            self._counts[date] += 1
+
+    def remove(self, metadata: Metadata) -> None:
+        if (date := self._indexed_date(metadata)) is not None:
+            self._counts[date] -= 1
+            if self._counts[date] <= 0:
+                del self._counts[date]
+
+    def choose(
+        self,
+        earliest: datetime.date,
+        latest: datetime.date,
+        ideal: datetime.date,
+        rng: Optional[random.Random] = None,
+    ) -> datetime.date:
+        """
+        A day between earliest and latest inclusive, in O(latest - earliest).
+
+        The day nearest the ideal that is below target wins; failing that, the
+        least-loaded day nearest the ideal. Remaining ties are broken at random.
+        """
+        rng = rng or default_rng()
+        span = (latest - earliest).days
+        days = [earliest + datetime.timedelta(days=n) for n in range(span + 1)]
+
+        def distance(day: datetime.date) -> int:
+            return abs((day - ideal).days)
+
+        below_target = [day for day in days if self._counts[day] < self._target]
+        if below_target:
+            nearest = min(distance(day) for day in below_target)
+            candidates = [day for day in below_target if distance(day) == nearest]
+        else:
+            least = min(self._counts[day] for day in days)
+            loaded = [day for day in days if self._counts[day] == least]
+            nearest = min(distance(day) for day in loaded)
+            candidates = [day for day in loaded if distance(day) == nearest]
+        return rng.choice(candidates)
+
+    @staticmethod
+    def _indexed_date(metadata: Metadata) -> Optional[datetime.date]:
+        # only learned tabias are reviewed, so only their due dates count
+        if metadata.status != Status.LEARNED:
+            return None
+        return metadata.due_date
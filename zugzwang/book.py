@@ -0,0 +1,225 @@
+"""
+Polyglot opening books of a repertoire.
+
+The book holds a move for each problem of each tabia: the solution, keyed by the
+Zobrist key of the problem's position. Entries are sorted by key, as the format
+requires, so that any Polyglot reader, or RepertoireBook here, finds the moves
+of a position by binary search. A move's weight is the number of problems that
+give it, so transpositions count once per tabia that reaches them.
+
+Books, and EPD files of best moves, are also MoveSources, from which new tabias
+are grown.
+"""
+
+from __future__ import annotations
+
+import abc
+import collections
+import mmap
+import os
+import pathlib
+import struct
+from typing import Counter, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+import chess
+import chess.pgn
+import chess.polyglot
+
+from zugzwang.tools import ZugChessTools
+from zugzwang.transpositions import keyed_boards
+
+if TYPE_CHECKING:
+    from zugzwang.group import Tabia
+
+# key, move, weight and learn, big-endian
+ENTRY = struct.Struct(">QHHI")
+MAX_WEIGHT = 0xFFFF
+
+
+class BookError(Exception):
+    pass
+
+
+def encode_move(board: chess.Board, move: chess.Move) -> int:
+    """The Polyglot encoding of move, made from the position on board."""
+    to_square = move.to_square
+    if board.is_castling(move):
+        # Polyglot castles the king onto its rook
+        rook_file = 7 if chess.square_file(to_square) > 4 else 0
+        to_square = chess.square(rook_file, chess.square_rank(move.from_square))
+    promotion = move.promotion - 1 if move.promotion else 0
+    return promotion << 12 | move.from_square << 6 | to_square
+
+
+def decode_move(board: chess.Board, raw: int) -> chess.Move:
+    from_square = raw >> 6 & 0o77
+    to_square = raw & 0o77
+    promotion = raw >> 12 & 0x7
+    move = chess.Move(from_square, to_square, promotion + 1 if promotion else None)
+    if board.is_castling(move) and board.piece_type_at(to_square) == chess.ROOK:
+        king_file = 6 if to_square > from_square else 2
+        move = chess.Move(
+            from_square, chess.square(king_file, chess.square_rank(from_square))
+        )
+    return move
+
+
+def book_entries(tabias: Iterable[Tabia]) -> List[Tuple[int, int, int]]:
+    """
+    The entries of the book of the tabias, as key, encoded move and weight, in
+    the order of the file.
+    """
+    weights: Counter[Tuple[int, int]] = collections.Counter()
+    for tabia in tabias:
+        solutions = ZugChessTools.get_solution_nodes(
+            tabia.game, tabia.metadata.perspective
+        )
+        # the problems are keyed in one traversal, at the parents of their
+        # solutions
+        moves: Dict[chess.pgn.GameNode, List[chess.Move]] = {}
+        for solution in solutions:
+            moves.setdefault(solution.parent, []).append(solution.move)
+        for node, board in keyed_boards(tabia.game):
+            if not moves:
+                break
+            for move in moves.pop(node, ()):
+                weights[board.key, encode_move(board.board, move)] += 1
+
+    # moves of the same position by falling weight, as Polyglot readers expect
+    return sorted(
+        (
+            (key, move, min(weight, MAX_WEIGHT))
+            for (key, move), weight in weights.items()
+        ),
+        key=lambda entry: (entry[0], -entry[2], entry[1]),
+    )
+
+
+def export_book(tabias: Iterable[Tabia], path: pathlib.Path) -> int:
+    """Write the book of the tabias to path, returning its number of entries."""
+    entries = book_entries(tabias)
+    partial = path.with_name(path.name + ".partial")
+    with open(partial, "wb") as fp:
+        for key, move, weight in entries:
+            fp.write(ENTRY.pack(key, move, weight, 0))
+    # a reader never sees a book half written
+    os.replace(partial, path)
+    return len(entries)
+
+
+class MoveSource(abc.ABC):
+    """Weighted moves by position, from which tabias can be grown."""
+
+    @abc.abstractmethod
+    def moves(
+        self, board: chess.Board, key: Optional[int] = None
+    ) -> List[Tuple[chess.Move, int]]:
+        """
+        The moves of the position on board and their weights, heaviest first.
+        The position's Zobrist key may be given, to save hashing the board.
+        """
+        pass
+
+
+class RepertoireBook(MoveSource):
+    """A Polyglot book, memory-mapped and searched by key."""
+
+    def __init__(self, path: pathlib.Path):
+        with open(path, "rb") as fp:
+            size = os.fstat(fp.fileno()).st_size
+            if size % ENTRY.size:
+                raise BookError(f"{path} is not a Polyglot book")
+            self._map: Optional[mmap.mmap] = (
+                mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+            )
+        self._size = size // ENTRY.size
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __enter__(self) -> RepertoireBook:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def entries(self, key: int) -> List[Tuple[int, int]]:
+        """The encoded moves and weights under key."""
+        found = []
+        index = self._lower_bound(key)
+        while index < self._size:
+            entry_key, move, weight, _ = ENTRY.unpack_from(
+                self._map, index * ENTRY.size
+            )
+            if entry_key != key:
+                break
+            found.append((move, weight))
+            index += 1
+        return found
+
+    def moves(
+        self, board: chess.Board, key: Optional[int] = None
+    ) -> List[Tuple[chess.Move, int]]:
+        if key is None:
+            key = chess.polyglot.zobrist_hash(board)
+        return [(decode_move(board, raw), weight) for raw, weight in self.entries(key)]
+
+    def contains(self, board: chess.Board, move: chess.Move) -> bool:
+        """Whether move, from the position on board, is in the repertoire."""
+        key = chess.polyglot.zobrist_hash(board)
+        raw = encode_move(board, move)
+        return any(entry == raw for entry, _ in self.entries(key))
+
+    def _lower_bound(self, key: int) -> int:
+        # the index of the first entry whose key is not less than key
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            (middle_key,) = struct.unpack_from(">Q", self._map, middle * ENTRY.size)
+            if middle_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
+class EPDBook(MoveSource):
+    """
+    The best moves of the positions of an EPD file, by their "bm" operations. A
+    move given for the same position on several lines weighs as many.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        weights: Dict[int, Counter[chess.Move]] = {}
+        with open(path) as fp:
+            for number, line in enumerate(fp, 1):
+                if not line.strip() or line.startswith("#"):
+                    continue
+                try:
+                    board, operations = chess.Board.from_epd(line)
+                except ValueError as exc:
+                    raise BookError(f"{path}:{number}: {exc}") from exc
+                best = operations.get("bm")
+                if not isinstance(best, list):
+                    continue
+                key = chess.polyglot.zobrist_hash(board)
+                weights.setdefault(key, collections.Counter()).update(best)
+        self._moves = {
+            key: sorted(counter.items(), key=lambda item: (-item[1], item[0].uci()))
+            for key, counter in weights.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._moves)
+
+    def moves(
+        self, board: chess.Board, key: Optional[int] = None
+    ) -> List[Tuple[chess.Move, int]]:
+        if key is None:
+            key = chess.polyglot.zobrist_hash(board)
+        return list(self._moves.get(key, ()))
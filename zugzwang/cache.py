@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import pathlib
+from typing import Dict, Optional
+
+
+@dataclasses.dataclass
+class CacheEntry:
+    mtime_ns: int
+    size: int
+    perspective: bool
+    solutions: int
+
+
+class SolutionCountCache:
+    """
+    Solution counts for the tabias of a single directory, keyed by tabia name.
+
+    An entry is valid while the tabia's PGN keeps its modification time and size,
+    and the tabia keeps its perspective. That lets the headless tools report
+    totals without parsing any PGNs.
+    """
+
+    FILENAME = ".solutions.json"
+
+    def __init__(self, directory: pathlib.Path):
+        self._path = directory / self.FILENAME
+        self._entries: Dict[str, CacheEntry] = {}
+        self._dirty = False
+        if self._path.exists():
+            self._load()
+
+    def get(
+        self,
+        name: str,
+        pgn_stat: os.stat_result,
+        perspective: Optional[bool] = None,
+    ) -> Optional[CacheEntry]:
+        # without a perspective, any perspective is accepted; the caller then
+        # takes the cached one, which was the default when the entry was made
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        if (entry.mtime_ns, entry.size) != (pgn_stat.st_mtime_ns, pgn_stat.st_size):
+            return None
+        if perspective is not None and entry.perspective != perspective:
+            return None
+        return entry
+
+    def set(
+        self,
+        name: str,
+        pgn_stat: os.stat_result,
+        perspective: bool,
+        solutions: int,
+    ) -> None:
+        entry = CacheEntry(
+            mtime_ns=pgn_stat.st_mtime_ns,
+            size=pgn_stat.st_size,
+            perspective=bool(perspective),
+            solutions=solutions,
+        )
+        if self._entries.get(name) != entry:
+            self._entries[name] = entry
+            self._dirty = True
+
+    def discard(self, name: str) -> None:
+        if self._entries.pop(name, None) is not None:
+            self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        # entries are stored as compact lists, in CacheEntry field order
+        data = {
+            name: list(dataclasses.astuple(entry))
+            for name, entry in sorted(self._entries.items())
+        }
+        with open(self._path, "w") as fp:
+            json.dump(data, fp, separators=(",", ":"))
+        self._dirty = False
+
+    def _load(self) -> None:
+        try:
+            with open(self._path) as fp:
+                data = json.load(fp)
+            self._entries = {name: CacheEntry(*entry) for name, entry in data.items()}
+        except (ValueError, TypeError):
+            # a corrupt cache is simply rebuilt
+            self._entries = {}
@@ -0,0 +1,166 @@
+"""
+Checkpoints of interrupted training sessions.
+
+A checkpoint records what remains of a session's queue as the paths of its
+tabias and the ids of its items, together with the state of the session's random
+generator. Taking a snapshot in the training loop only copies the queue; ids are
+computed and the file written by a CheckpointWriter on its own thread.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import pathlib
+import random
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from zugzwang.group import Group, Tabia
+
+if TYPE_CHECKING:
+    from zugzwang.queue import QueueItem
+
+
+class CheckpointError(Exception):
+    pass
+
+
+@dataclasses.dataclass
+class Checkpoint:
+    mode: str
+    # names from below the collection root down to each tabia
+    tabias: List[List[str]]
+    # index into tabias and id of each remaining item, in queue order
+    items: List[Tuple[int, str]]
+    rng_state: Optional[tuple] = None
+
+    @classmethod
+    def from_queue(
+        cls,
+        mode: str,
+        items: Sequence[QueueItem],
+        rng_state: Optional[tuple] = None,
+    ) -> Checkpoint:
+        indices: Dict[int, int] = {}
+        tabias: List[List[str]] = []
+        entries = []
+        for item in items:
+            tabia = item.tabia
+            if id(tabia) not in indices:
+                indices[id(tabia)] = len(tabias)
+                tabias.append(tabia.path)
+            entries.append((indices[id(tabia)], item.key))
+        return cls(mode, tabias, entries, rng_state)
+
+    @classmethod
+    def from_json(cls, json_str: str) -> Checkpoint:
+        try:
+            data = json.loads(json_str)
+            rng_state = data["rng_state"]
+            if rng_state is not None:
+                version, internal, gauss = rng_state
+                rng_state = (version, tuple(internal), gauss)
+            return cls(
+                mode=data["mode"],
+                tabias=data["tabias"],
+                items=[(index, key) for index, key in data["items"]],
+                rng_state=rng_state,
+            )
+        except (ValueError, TypeError, KeyError) as exc:
+            raise CheckpointError() from exc
+
+    def as_json(self) -> str:
+        data = dataclasses.asdict(self)
+        return json.dumps(data, separators=(",", ":")) + "\n"
+
+    def restore_rng(self, rng: random.Random) -> None:
+        if self.rng_state is not None:
+            rng.setstate(self.rng_state)
+
+
+def restore_items(
+    checkpoint: Checkpoint,
+    root: Group,
+    make_items: Callable[[Tabia], Dict[str, QueueItem]],
+) -> List[QueueItem]:
+    """
+    The remaining items of checkpoint, made fresh from their tabias.
+
+    make_items gives the items of a tabia by id, so only the tabias named in the
+    checkpoint are searched. Items that no longer exist are skipped.
+    """
+    tabia_items = []
+    for path in checkpoint.tabias:
+        tabia = root.find(path)
+        found = isinstance(tabia, Tabia)
+        tabia_items.append(make_items(tabia) if found else {})
+    return [
+        tabia_items[index][key]
+        for index, key in checkpoint.items
+        if key in tabia_items[index]
+    ]
+
+
+def read_checkpoint(path: pathlib.Path) -> Optional[Checkpoint]:
+    try:
+        with open(path) as fp:
+            data = fp.read()
+    except FileNotFoundError:
+        return None
+    return Checkpoint.from_json(data)
+
+
+class CheckpointWriter:
+    """
+    Writes checkpoints to a file on a background thread.
+
+    Only the latest submitted checkpoint is pending at any time; one submitted
+    while another is being written replaces any older one still waiting.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self._path = path
+        self._pending: Optional[Callable[[], Checkpoint]] = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, build: Callable[[], Checkpoint]) -> None:
+        """Queue a checkpoint, to be built and written off the calling thread."""
+        with self._condition:
+            self._pending = build
+            self._condition.notify()
+
+    def close(self) -> None:
+        """Write any pending checkpoint and stop the thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def discard(self) -> None:
+        """Stop the thread, dropping any pending checkpoint, and remove the file."""
+        with self._condition:
+            self._pending = None
+        self.close()
+        self._path.unlink(missing_ok=True)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                build, self._pending = self._pending, None
+            self._write(build())
+
+    def _write(self, checkpoint: Checkpoint) -> None:
+        # written aside and renamed, so that a crash never leaves half a file
+        staging = self._path.with_name(self._path.name + ".tmp")
+        with open(staging, "w") as fp:
+            fp.write(checkpoint.as_json())
+        os.replace(staging, self._path)
@@ -0,0 +1,596 @@
+"""
+Command line interface of ZugZwang.
+
+Each subcommand imports what it needs when it runs, so that the cheap commands
+stay cheap.
+"""
+
+import argparse
+import dataclasses
+import datetime
+import json
+import pathlib
+import sys
+from typing import List, Optional
+
+from zugzwang.config import config
+from zugzwang.schedulers import scheduler_names
+
+
+def _open_profile(args: argparse.Namespace):
+    # the store of the profile given, which the headless commands only read
+    from zugzwang.profiles import ProfileStore
+
+    if args.profile is None:
+        return None
+    return ProfileStore.open(args.path, args.profile, create=False)
+
+
+def _train(args: argparse.Namespace) -> int:
+    from zugzwang.profiles import ProfileError
+    from zugzwang.zugzwang import main as train_main
+
+    try:
+        train_main(args.path, args.profile)
+    except ProfileError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    return 0
+
+
+def _stats(args: argparse.Namespace) -> int:
+    from zugzwang.menus import GroupScene
+    from zugzwang.profiles import ProfileError
+    from zugzwang.summary import summarise
+
+    try:
+        store = _open_profile(args)
+    except ProfileError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    summary = summarise(args.path, refresh=args.refresh, store=store)
+
+    if args.json:
+        print(json.dumps(summary.as_dict(), indent=2))
+        return 0
+
+    for line in GroupScene.table([*summary.children, summary]):
+        print(line)
+    return 0
+
+
+def _forecast(args: argparse.Namespace) -> int:
+    from zugzwang.dates import ZugDates
+    from zugzwang.forecast import ForecastOptions, ScheduleArrays, simulate
+    from zugzwang.profiles import ProfileError
+    from zugzwang.summary import collect_scheduled
+
+    try:
+        store = _open_profile(args)
+    except ProfileError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    start = ZugDates.today()
+    scheduled = collect_scheduled(args.path, store=store)
+    arrays = ScheduleArrays.from_metadata(
+        [metadata for metadata, _ in scheduled],
+        start,
+        [scheduler for _, scheduler in scheduled],
+    )
+    options = ForecastOptions(
+        days=args.days,
+        success_probability=args.success,
+        learning_probability=args.learning,
+        new_per_day=args.new_per_day,
+        recall_factor=args.recall_factor,
+        recall_radius=args.recall_radius,
+        recall_max=args.recall_max,
+        scheduler=args.scheduler,
+        seed=args.seed,
+    )
+    forecast = simulate(arrays, options)
+
+    if args.json:
+        print(json.dumps(forecast.as_dict(start)))
+        return 0
+
+    print("DATE".ljust(12) + "DUE".ljust(8) + "NEW")
+    for day, (due, new) in enumerate(zip(forecast.due, forecast.new)):
+        date = start + datetime.timedelta(days=day)
+        print(date.isoformat().ljust(12) + str(due).ljust(8) + str(new))
+    return 0
+
+
+def _attempts(args: argparse.Namespace) -> int:
+    from zugzwang import analytics
+    from zugzwang.attempts import AttemptLog
+    from zugzwang.dates import ZugDates
+    from zugzwang.profiles import ProfileError
+
+    try:
+        store = _open_profile(args)
+    except ProfileError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    log = AttemptLog(
+        args.path / ".attempts" if store is None else store.directory / "attempts"
+    )
+    if args.compact:
+        log.rotate()
+        analytics.compact(log)
+
+    attempts = analytics.load(log)
+    if args.days is not None:
+        start = ZugDates.today() - datetime.timedelta(days=args.days)
+        attempts = analytics.since(attempts, start)
+    query = analytics.hardest if args.hardest else analytics.slowest
+    ranked = query(attempts, args.top)
+
+    if args.json:
+        print(json.dumps([dataclasses.asdict(row) for row in ranked]))
+        return 0
+
+    score = "FAILURE RATE" if args.hardest else "MEAN TIME"
+    print("NODE".ljust(18) + "TABIA".ljust(18) + "ATTEMPTS".ljust(10) + score)
+    for row in ranked:
+        print(
+            f"{row.node:016x}".ljust(18)
+            + f"{row.tabia:016x}".ljust(18)
+            + str(row.attempts).ljust(10)
+            + f"{row.score:.2f}"
+        )
+    return 0
+
+
+def _import(args: argparse.Namespace) -> int:
+    from zugzwang.importer import ImportOptions, import_pgn
+
+    options = ImportOptions(
+        workers=args.workers,
+        chunk_games=args.chunk,
+        max_pending=args.max_pending,
+        comments=args.keep_comments,
+        validate=args.validate,
+        multi=args.multi,
+        names=args.names,
+    )
+    report = import_pgn(args.sources, args.destination, options)
+
+    if args.json:
+        print(json.dumps(dataclasses.asdict(report)))
+        return 0
+
+    print(f"{report.written} of {report.games} games written to {args.destination}")
+    if report.errors:
+        print(f"{report.errors} games could not be read and were skipped")
+    return 0
+
+
+def _stub(args: argparse.Namespace) -> int:
+    from zugzwang.stubs import enforce_stub_files
+
+    paths, unresolved = enforce_stub_files(args.stub, args.sources, args.destination)
+
+    if args.json:
+        print(
+            json.dumps(
+                {"written": [str(path) for path in paths], "unresolved": unresolved}
+            )
+        )
+        return 0
+
+    print(f"{len(paths)} tabias written to {args.destination}")
+    for fen in unresolved:
+        print(f"unresolved: {fen}")
+    return 1 if unresolved else 0
+
+
+def _transpositions(args: argparse.Namespace) -> int:
+    from zugzwang.group import DefaultIOManager
+    from zugzwang.transpositions import analyse
+    from zugzwang.loader import initialise_group
+
+    root = initialise_group(args.path.name, args.path, DefaultIOManager())
+    analysis = analyse(root.tabias())
+    transpositions = analysis.conflicts if args.conflicts else analysis.transpositions
+
+    if args.json:
+        print(
+            json.dumps(
+                [
+                    {
+                        "epd": transposition.epd,
+                        "conflict": transposition.is_conflict,
+                        "occurrences": [
+                            {
+                                "tabia": "/".join(occurrence.tabia.path),
+                                "node": occurrence.node_id,
+                                "move": occurrence.move.uci(),
+                            }
+                            for occurrence in transposition.occurrences
+                        ],
+                    }
+                    for transposition in transpositions
+                ]
+            )
+        )
+        return 1 if analysis.conflicts else 0
+
+    for transposition in transpositions:
+        label = "CONFLICT" if transposition.is_conflict else "transposition"
+        print(f"{label}: {transposition.epd}")
+        for occurrence in transposition.occurrences:
+            tabia = "/".join(occurrence.tabia.path)
+            print(f"    {occurrence.move.uci()}  {tabia}")
+    print(
+        f"{len(analysis.transpositions)} transposed positions, "
+        f"{len(analysis.conflicts)} with conflicting solutions"
+    )
+    return 1 if analysis.conflicts else 0
+
+
+def _book(args: argparse.Namespace) -> int:
+    from zugzwang.book import export_book
+    from zugzwang.group import DefaultIOManager
+    from zugzwang.loader import initialise_group
+
+    root = initialise_group(args.path.name, args.path, DefaultIOManager())
+    entries = export_book(root.tabias(), args.destination)
+    print(f"{entries} moves written to {args.destination}")
+    return 0
+
+
+def _expand(args: argparse.Namespace) -> int:
+    import chess
+
+    from zugzwang.book import EPDBook, RepertoireBook
+    from zugzwang.expand import ExpandOptions, expand, write_tabia
+
+    root = chess.Board(args.fen) if args.fen else chess.Board()
+    for san in args.moves.split():
+        root.push_san(san)
+    if args.source.suffix == ".epd":
+        source = EPDBook(args.source)
+    else:
+        source = RepertoireBook(args.source)
+    options = ExpandOptions(
+        depth=args.depth,
+        max_replies=args.max_replies or None,
+        min_weight=args.min_weight,
+        min_share=args.min_share,
+    )
+    result = expand(source, root, args.perspective == "white", options)
+    path = write_tabia(result.game, args.destination, args.name)
+    print(
+        f"{path}: {result.positions} positions, "
+        f"{result.transpositions} transpositions not grown again"
+    )
+    return 0
+
+
+def _lint(args: argparse.Namespace) -> int:
+    from zugzwang.lint import Rule, lint_collection
+
+    ignored = set(args.ignore)
+    if unknown := ignored - {rule.value for rule in Rule}:
+        print(f"unknown rules: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+    report = lint_collection(args.path, args.workers, use_cache=not args.no_cache)
+    issues = [issue for issue in report.issues if issue.rule.value not in ignored]
+
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "files": report.files,
+                    "cached": report.cached,
+                    "issues": [
+                        {**dataclasses.asdict(issue), "rule": issue.rule.value}
+                        for issue in issues
+                    ],
+                }
+            )
+        )
+        return 1 if issues else 0
+
+    for issue in issues:
+        print(issue)
+    print(
+        f"{len(issues)} issues in {report.files} files "
+        f"({report.cached} unchanged since the last run)"
+    )
+    return 1 if issues else 0
+
+
+def _sync(args: argparse.Namespace) -> int:
+    from zugzwang.profiles import ProfileError
+    from zugzwang.sync import SyncError, open_exchange, sync
+
+    if args.profile is None:
+        print("sync needs a profile; give one with --profile", file=sys.stderr)
+        return 2
+    try:
+        report = sync(args.path, args.profile, open_exchange(args.exchange))
+    except (ProfileError, SyncError) as exc:
+        print(exc, file=sys.stderr)
+        return 2
+
+    if args.json:
+        print(json.dumps(dataclasses.asdict(report)))
+        return 0
+
+    print(f"{report.sent} changes sent to {args.exchange}")
+    print(f"{report.taken} changes taken from {report.batches} batches")
+    return 0
+
+
+def _verify(args: argparse.Namespace) -> int:
+    import shlex
+
+    from zugzwang.group import DefaultIOManager
+    from zugzwang.profiles import ProfileError, ProfileIOManager
+    from zugzwang.verify import EvaluationCache, VerifyError, VerifyOptions, verify
+    from zugzwang.loader import initialise_group
+
+    if not args.engine:
+        print("no engine; give one with --engine", file=sys.stderr)
+        return 2
+    try:
+        store = _open_profile(args)
+    except ProfileError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    io_manager = DefaultIOManager() if store is None else ProfileIOManager(store)
+    root = initialise_group(args.path.name, args.path, io_manager)
+    options = VerifyOptions(
+        time=args.time,
+        depth=args.depth,
+        threshold=args.threshold,
+        workers=args.workers,
+    )
+    # evaluations hold for one engine and budget, whatever the threshold
+    settings = json.dumps([args.engine, args.time, args.depth])
+    cache = None if args.no_cache else EvaluationCache(args.path, settings)
+    try:
+        report = verify(root.tabias(), shlex.split(args.engine), options, cache)
+    except VerifyError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+
+    if args.json:
+        print(json.dumps(dataclasses.asdict(report)))
+        return 1 if report.mistakes else 0
+
+    for mistake in report.mistakes:
+        print(mistake)
+    print(
+        f"{len(report.mistakes)} of {report.solutions} solutions lose more than "
+        f"{args.threshold} centipawns "
+        f"({report.cached} of {report.positions} positions cached)"
+    )
+    return 1 if report.mistakes else 0
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="zugzwang")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    default_path = pathlib.Path(config["user_data"])
+    # the commands that read or write training progress take a profile
+    profile = argparse.ArgumentParser(add_help=False)
+    profile.add_argument(
+        "--profile",
+        default=config["profile"],
+        help="keep training progress in this profile of the collection",
+    )
+
+    train = subparsers.add_parser(
+        "train", parents=[profile], help="interactive training"
+    )
+    train.add_argument("path", nargs="?", type=pathlib.Path, default=default_path)
+    train.set_defaults(func=_train)
+
+    stats = subparsers.add_parser(
+        "stats", parents=[profile], help="summarise a collection without loading it"
+    )
+    stats.add_argument("path", nargs="?", type=pathlib.Path, default=default_path)
+    stats.add_argument("--json", action="store_true", help="print JSON")
+    stats.add_argument(
+        "--refresh",
+        action="store_true",
+        help="count every solution again, rebuilding the solution count cache",
+    )
+    stats.set_defaults(func=_stats)
+
+    forecast = subparsers.add_parser(
+        "forecast", parents=[profile], help="simulate the daily review workload"
+    )
+    forecast.add_argument("path", nargs="?", type=pathlib.Path, default=default_path)
+    forecast.add_argument("--days", type=int, default=90)
+    forecast.add_argument(
+        "--success", type=float, default=0.9, help="review success probability"
+    )
+    forecast.add_argument(
+        "--learning", type=float, default=1.0, help="learning success probability"
+    )
+    forecast.add_argument("--new-per-day", type=int, default=config["learning_limit"])
+    forecast.add_argument("--recall-factor", type=float)
+    forecast.add_argument("--recall-radius", type=int)
+    forecast.add_argument("--recall-max", type=int)
+    forecast.add_argument(
+        "--scheduler",
+        choices=scheduler_names(),
+        help="scheduler of every tabia, overriding the config",
+    )
+    forecast.add_argument("--seed", type=int, default=config["seed"])
+    forecast.add_argument("--json", action="store_true", help="print JSON")
+    forecast.set_defaults(func=_forecast)
+
+    attempts = subparsers.add_parser(
+        "attempts",
+        parents=[profile],
+        help="rank problems by the training attempt log",
+    )
+    attempts.add_argument("path", nargs="?", type=pathlib.Path, default=default_path)
+    attempts.add_argument("--top", type=int, default=100)
+    attempts.add_argument(
+        "--hardest",
+        action="store_true",
+        help="rank by failure rate rather than think time",
+    )
+    attempts.add_argument("--days", type=int, help="only the last DAYS days")
+    attempts.add_argument(
+        "--compact", action="store_true", help="compact the log before the query"
+    )
+    attempts.add_argument("--json", action="store_true", help="print JSON")
+    attempts.set_defaults(func=_attempts)
+
+    import_ = subparsers.add_parser(
+        "import", help="import PGN databases as tabias, a file per game"
+    )
+    import_.add_argument("sources", nargs="+", type=pathlib.Path)
+    import_.add_argument("destination", type=pathlib.Path, help="group directory")
+    import_.add_argument(
+        "--workers", type=int, help="worker processes; 0 to work in one process"
+    )
+    import_.add_argument("--chunk", type=int, default=64, help="games per chunk")
+    import_.add_argument(
+        "--max-pending", type=int, help="chunks in flight before the reader waits"
+    )
+    import_.add_argument(
+        "--multi", metavar="NAME", help="write a single multi-game group NAME"
+    )
+    import_.add_argument(
+        "--names",
+        choices=["numbered", "words", "content"],
+        default="numbered",
+        help="name files by position, by random words, or from their content",
+    )
+    import_.add_argument("--keep-comments", action="store_true")
+    import_.add_argument(
+        "--validate",
+        action="store_true",
+        help="parse every game and skip those with illegal moves; much slower",
+    )
+    import_.add_argument("--json", action="store_true", help="print JSON")
+    import_.set_defaults(func=_import)
+
+    stub = subparsers.add_parser(
+        "stub", help="make tabias from the leaves of a stub, continued from sources"
+    )
+    stub.add_argument("stub", type=pathlib.Path)
+    stub.add_argument("sources", type=pathlib.Path, help="directory of source PGNs")
+    stub.add_argument("destination", type=pathlib.Path, help="group directory")
+    stub.add_argument("--json", action="store_true", help="print JSON")
+    stub.set_defaults(func=_stub)
+
+    transpositions = subparsers.add_parser(
+        "transpositions", help="find problems reached by more than one move order"
+    )
+    transpositions.add_argument(
+        "path", nargs="?", type=pathlib.Path, default=default_path
+    )
+    transpositions.add_argument(
+        "--conflicts",
+        action="store_true",
+        help="only positions whose solutions disagree",
+    )
+    transpositions.add_argument("--json", action="store_true", help="print JSON")
+    transpositions.set_defaults(func=_transpositions)
+
+    book = subparsers.add_parser(
+        "book", help="export the solutions as a Polyglot opening book"
+    )
+    book.add_argument("path", type=pathlib.Path, help="collection or group")
+    book.add_argument("destination", type=pathlib.Path, help="book file, as .bin")
+    book.set_defaults(func=_book)
+
+    expand = subparsers.add_parser(
+        "expand", help="grow a tabia from a Polyglot book or an EPD file"
+    )
+    expand.add_argument("source", type=pathlib.Path, help="book, as .bin or .epd")
+    expand.add_argument("destination", type=pathlib.Path, help="group directory")
+    expand.add_argument("--fen", help="root position; the starting one by default")
+    expand.add_argument("--moves", default="", help="SAN moves from the root position")
+    expand.add_argument("--perspective", choices=["white", "black"], default="white")
+    expand.add_argument("--depth", type=int, default=12, help="plies to grow")
+    expand.add_argument(
+        "--max-replies", type=int, default=3, help="replies per position; 0 for all"
+    )
+    expand.add_argument("--min-weight", type=int, default=1)
+    expand.add_argument(
+        "--min-share",
+        type=float,
+        default=0.0,
+        help="prune replies below this share of their position's weight",
+    )
+    expand.add_argument("--name", help="tabia name; random words by default")
+    expand.set_defaults(func=_expand)
+
+    lint = subparsers.add_parser(
+        "lint", help="check the trees of a collection for NAG mistakes"
+    )
+    lint.add_argument("path", nargs="?", type=pathlib.Path, default=default_path)
+    lint.add_argument(
+        "--workers", type=int, help="worker processes; 0 to work in one process"
+    )
+    lint.add_argument(
+        "--no-cache", action="store_true", help="lint every file, changed or not"
+    )
+    lint.add_argument(
+        "--ignore",
+        action="append",
+        default=[],
+        metavar="RULE",
+        help="leave out the issues of RULE; may be repeated",
+    )
+    lint.add_argument("--json", action="store_true", help="print JSON")
+    lint.set_defaults(func=_lint)
+
+    sync = subparsers.add_parser(
+        "sync",
+        parents=[profile],
+        help="exchange a profile's changes with other copies of the collection",
+    )
+    sync.add_argument(
+        "exchange", type=pathlib.Path, help="a directory, or a .zip archive"
+    )
+    sync.add_argument("path", nargs="?", type=pathlib.Path, default=default_path)
+    sync.add_argument("--json", action="store_true", help="print JSON")
+    sync.set_defaults(func=_sync)
+
+    verify = subparsers.add_parser(
+        "verify",
+        parents=[profile],
+        help="check the solutions of a collection with a UCI engine",
+    )
+    verify.add_argument("path", nargs="?", type=pathlib.Path, default=default_path)
+    verify.add_argument(
+        "--engine", default=config["engine"], help="command line of the engine"
+    )
+    verify.add_argument(
+        "--time", type=float, default=0.1, help="seconds for each position"
+    )
+    verify.add_argument("--depth", type=int, help="plies for each position")
+    verify.add_argument(
+        "--threshold",
+        type=int,
+        default=100,
+        help="centipawns a solution may lose against the engine's move",
+    )
+    verify.add_argument("--workers", type=int, help="engine processes")
+    verify.add_argument(
+        "--no-cache", action="store_true", help="evaluate every position afresh"
+    )
+    verify.add_argument("--json", action="store_true", help="print JSON")
+    verify.set_defaults(func=_verify)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,37 @@
 import pathlib
 
 user_data = pathlib.Path("/Users/dimebag/Chess/Tabias")
+word_list = pathlib.Path(__file__).resolve().parent.parent / "words.txt"
 
 config = {
     "user_data": user_data,
     "learning_limit": 1,
+    # seed for the shared random generator; None seeds from the OS
+    "seed": None,
+    # spread tabia due dates within their recall radius by daily load
+    "load_balancing": False,
+    "daily_review_target": 20,
+    # interval scheduler of tabias: "multiplicative" or "sm2"
+    "scheduler": "multiplicative",
+    # schedulers of particular groups, by group name; a group inherits the
+    # scheduler of its nearest listed ancestor
+    "group_schedulers": {},
+    # seconds beyond which a correct answer holds a problem's interval
+    "slow_think_time": 30.0,
+    # number of items played between checkpoints of a coalesced session
+    "checkpoint_interval": 10,
+    # size at which the attempt log starts a new segment
+    "attempt_log_segment_bytes": 1 << 20,
+    # words from which new tabias are named
+    "word_list": word_list,
+    # hold tabia trees as compact arrays rather than python-chess nodes
+    "compact_trees": False,
+    # ask a transposed problem once per coalesced session, where the solutions
+    # agree
+    "dedupe_transpositions": False,
+    # profile keeping the training progress, in the collection's .profiles
+    # directory; None keeps it in the files beside the PGNs
+    "profile": None,
+    # command line of the UCI engine verifying solutions
+    "engine": None,
 }
@@ -1,6 +1,9 @@
 import datetime
-from random import randint
-import datetime
+import random
+from typing import Optional
+
+from zugzwang.rng import default_rng
+from zugzwang.schedulers import MultiplicativeScheduler
 
 
 def _today():
@@ -44,12 +47,25 @@ class ZugDates:
         recall_factor,
         recall_radius,
         recall_max,
+        rng: Optional[random.Random] = None,
     ):
         # calculate the diff based on recall factor and radius
         previous_diff = (current_due_date - last_study_date).days
-        absolute_diff = int(previous_diff * recall_factor)
-        offset = randint(-recall_radius, recall_radius)
+        absolute_diff = MultiplicativeScheduler.scale(previous_diff, recall_factor)
+        return cls.spread(absolute_diff, recall_radius, recall_max, rng)
+
+    @classmethod
+    def spread(
+        cls,
+        interval: int,
+        recall_radius: int,
+        recall_max: int,
+        rng: Optional[random.Random] = None,
+    ):
+        # offset the ideal interval within the recall radius
+        rng = rng or default_rng()
+        offset = rng.randint(-recall_radius, recall_radius)
 
         # impose minimum and maximum values
-        diff = max(1, min(absolute_diff + offset, recall_max))
+        diff = max(1, min(interval + offset, recall_max))
         return cls.today() + datetime.timedelta(days=diff)
@@ -0,0 +1,143 @@
+"""
+Growing tabias from opening books.
+
+From a root position, the player's move in each position is the heaviest the
+source gives, and the opponent's replies are all those the source gives,
+pruned by weight. The tree is grown breadth first to a depth in plies, and a
+position reached a second time, by transposition, gets its move but is not
+grown again, as its continuation is already in the tree at no greater depth.
+The player's move is added even past the depth, and at transpositions, so that
+the lines the depth cuts end on a solution.
+"""
+
+from __future__ import annotations
+
+import collections
+import dataclasses
+import pathlib
+from typing import Deque, List, Optional, Set, Tuple
+
+import chess
+import chess.pgn
+import chess.polyglot
+
+from zugzwang.book import MoveSource
+from zugzwang.group import default_metadata
+from zugzwang.names import NameGenerator
+from zugzwang.transpositions import push_keyed
+
+
+class ExpandError(Exception):
+    pass
+
+
+@dataclasses.dataclass
+class ExpandOptions:
+    # plies from the root within which the opponent's replies are grown
+    depth: int = 12
+    # the heaviest replies kept in each position; None keeps them all
+    max_replies: Optional[int] = 3
+    # moves lighter than this are pruned
+    min_weight: int = 1
+    # replies lighter than this share of their position's total are pruned
+    min_share: float = 0.0
+
+
+@dataclasses.dataclass
+class ExpandResult:
+    game: chess.pgn.Game
+    # positions whose moves were looked up
+    positions: int = 0
+    # positions reached again, and so not grown
+    transpositions: int = 0
+
+
+def expand(
+    source: MoveSource,
+    root: chess.Board,
+    perspective: chess.Color,
+    options: Optional[ExpandOptions] = None,
+) -> ExpandResult:
+    options = options or ExpandOptions()
+    game = chess.pgn.Game()
+    game.headers["White" if perspective else "Black"] = "p"
+    game.setup(root)
+    result = ExpandResult(game)
+
+    board = root.copy(stack=False)
+    key = chess.polyglot.zobrist_hash(board)
+    visited: Set[int] = {key}
+    # each entry is a node still to grow, with its position, key and depth
+    frontier: Deque[
+        Tuple[chess.pgn.GameNode, chess.Board, int, int]
+    ] = collections.deque([(game, board, key, 0)])
+    while frontier:
+        node, board, key, depth = frontier.popleft()
+        result.positions += 1
+        moves = _prune(source.moves(board, key), board, options)
+        if board.turn == perspective:
+            # the player's move is the heaviest; it is added at any depth, so
+            # that lines end on a solution
+            moves = moves[:1]
+        elif depth >= options.depth:
+            continue
+        for move, _ in moves:
+            child = node.add_variation(move)
+            child_board = board.copy(stack=False)
+            child_key = push_keyed(child_board, key, move)
+            if child_key in visited:
+                result.transpositions += 1
+                if child_board.turn == perspective:
+                    # the problem keeps its solution, though the line goes on
+                    # where the position was first reached
+                    best = _prune(
+                        source.moves(child_board, child_key), child_board, options
+                    )
+                    for best_move, _ in best[:1]:
+                        child.add_variation(best_move)
+                continue
+            visited.add(child_key)
+            frontier.append((child, child_board, child_key, depth + 1))
+    return result
+
+
+def write_tabia(
+    game: chess.pgn.Game,
+    destination: pathlib.Path,
+    name: Optional[str] = None,
+) -> pathlib.Path:
+    """
+    Write game as a tabia in destination, with its default metadata, under
+    name or a new name from the word list. Returns the path of the PGN.
+    """
+    destination.mkdir(parents=True, exist_ok=True)
+    # the word list is only read if a name is to be made up
+    names = NameGenerator.for_directory(destination, words=() if name else None)
+    if name is None:
+        name = names.random()
+    elif not names.reserve(name):
+        raise ExpandError(f"{name} is already in {destination}")
+    path = destination / (name + ".pgn")
+    with open(path, "w") as fp:
+        print(game, file=fp)
+    with open(destination / (name + ".json"), "w") as fp:
+        fp.write(default_metadata(game).as_json())
+    return path
+
+
+def _prune(
+    moves: List[Tuple[chess.Move, int]],
+    board: chess.Board,
+    options: ExpandOptions,
+) -> List[Tuple[chess.Move, int]]:
+    # a book may hold moves that are illegal here, from a hash collision
+    moves = [
+        (move, weight)
+        for move, weight in moves
+        if weight >= options.min_weight and board.is_legal(move)
+    ]
+    total = sum(weight for _, weight in moves)
+    moves = [
+        (move, weight) for move, weight in moves if weight >= options.min_share * total
+    ]
+    return moves[: options.max_replies]
@@ -0,0 +1,228 @@
+"""
+Review workload forecasts.
+
+The scheduling state of every tabia is loaded into NumPy arrays, and each
+simulated day applies the batch interval logic of each tabia's scheduler to all
+due tabias at once. That makes year-long forecasts over very large collections cheap
+enough to compare different recall parameters.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import datetime
+from typing import Iterable, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from zugzwang.dates import ZugDates
+from zugzwang.group import Metadata, Status
+from zugzwang.schedulers import Scheduler, get_scheduler, scheduler_names
+
+# day offset standing in for a missing date
+_NO_DATE = np.iinfo(np.int32).min
+
+
+@dataclasses.dataclass
+class ForecastOptions:
+    days: int = 90
+    # probability that a review of a learned tabia succeeds
+    success_probability: float = 0.9
+    # probability that a new tabia is learned at its first attempt
+    learning_probability: float = 1.0
+    new_per_day: int = 1
+    # override the recall parameters of every tabia, when given
+    recall_factor: Optional[float] = None
+    recall_radius: Optional[int] = None
+    recall_max: Optional[int] = None
+    # override the scheduler of every tabia, when given
+    scheduler: Optional[str] = None
+    seed: Optional[int] = None
+
+
+@dataclasses.dataclass
+class Forecast:
+    # reviews of learned tabias, per day
+    due: np.ndarray
+    # tabias attempted for the first time, per day
+    new: np.ndarray
+
+    def as_dict(self, start: datetime.date) -> dict:
+        return {
+            "start": start.isoformat(),
+            "due": self.due.tolist(),
+            "new": self.new.tolist(),
+        }
+
+
+class ScheduleArrays:
+    """
+    The scheduling state of a collection, as one array per Metadata field.
+
+    Dates are held as day offsets from the start of the forecast, and schedulers
+    as indices into scheduler_names().
+    """
+
+    def __init__(
+        self,
+        learned: np.ndarray,
+        last_study_date: np.ndarray,
+        due_date: np.ndarray,
+        recall_factor: np.ndarray,
+        recall_radius: np.ndarray,
+        recall_max: np.ndarray,
+        ease: np.ndarray,
+        repetitions: np.ndarray,
+        scheduler: np.ndarray,
+    ):
+        self.learned = learned
+        self.last_study_date = last_study_date
+        self.due_date = due_date
+        self.recall_factor = recall_factor
+        self.recall_radius = recall_radius
+        self.recall_max = recall_max
+        self.ease = ease
+        self.repetitions = repetitions
+        self.scheduler = scheduler
+
+    def __len__(self) -> int:
+        return len(self.learned)
+
+    @classmethod
+    def from_metadata(
+        cls,
+        metadata: Iterable[Metadata],
+        start: Optional[datetime.date] = None,
+        schedulers: Optional[Sequence[str]] = None,
+    ) -> ScheduleArrays:
+        """
+        The arrays of the given metadata. schedulers names the scheduler of each
+        tabia, defaulting to the configured one.
+        """
+        start = start or ZugDates.today()
+        metadata = list(metadata)
+        codes = {name: code for code, name in enumerate(scheduler_names())}
+        if schedulers is None:
+            schedulers = [get_scheduler().name] * len(metadata)
+
+        def offset(date: Optional[datetime.date]) -> int:
+            return (date - start).days if date is not None else _NO_DATE
+
+        rows = [
+            (
+                meta.status == Status.LEARNED,
+                offset(meta.last_study_date),
+                offset(meta.due_date),
+                meta.recall_factor,
+                meta.recall_radius,
+                meta.recall_max,
+                meta.ease,
+                meta.repetitions,
+                codes[get_scheduler(name).name],
+            )
+            for meta, name in zip(metadata, schedulers)
+        ]
+        columns = list(zip(*rows)) or [()] * 9
+        return cls(
+            learned=np.array(columns[0], dtype=bool),
+            last_study_date=np.array(columns[1], dtype=np.int64),
+            due_date=np.array(columns[2], dtype=np.int64),
+            recall_factor=np.array(columns[3], dtype=np.float64),
+            recall_radius=np.array(columns[4], dtype=np.int32),
+            recall_max=np.array(columns[5], dtype=np.int32),
+            ease=np.array(columns[6], dtype=np.float64),
+            repetitions=np.array(columns[7], dtype=np.int32),
+            scheduler=np.array(columns[8], dtype=np.int8),
+        )
+
+    def copy(self) -> ScheduleArrays:
+        return ScheduleArrays(
+            **{name: array.copy() for name, array in vars(self).items()}
+        )
+
+
+def simulate(arrays: ScheduleArrays, options: ForecastOptions) -> Forecast:
+    """
+    Simulate options.days days of scheduled training, starting today (day 0).
+
+    Every due tabia is reviewed on the day it falls due, or on day 0 if it is
+    overdue, and the first options.new_per_day unlearned tabias are attempted each
+    day. The arrays are left unchanged.
+    """
+    state = arrays.copy()
+    rng = np.random.default_rng(options.seed)
+    if options.recall_factor is not None:
+        state.recall_factor[:] = options.recall_factor
+    if options.recall_radius is not None:
+        state.recall_radius[:] = options.recall_radius
+    if options.recall_max is not None:
+        state.recall_max[:] = options.recall_max
+    if options.scheduler is not None:
+        name = get_scheduler(options.scheduler).name
+        state.scheduler[:] = scheduler_names().index(name)
+
+    due_counts = np.zeros(options.days, dtype=np.int64)
+    new_counts = np.zeros(options.days, dtype=np.int64)
+    # unlearned tabias are learned in collection order, as in scheduled training
+    unlearned = np.flatnonzero(~state.learned)
+
+    for day in range(options.days):
+        due = np.flatnonzero(state.learned & (state.due_date <= day))
+        due_counts[day] = len(due)
+        succeeded = rng.random(len(due)) < options.success_probability
+        _success(state, due[succeeded], day, rng)
+        _failure(state, due[~succeeded], day)
+
+        attempted = unlearned[: options.new_per_day]
+        unlearned = unlearned[options.new_per_day :]
+        new_counts[day] = len(attempted)
+        learned = rng.random(len(attempted)) < options.learning_probability
+        state.learned[attempted[learned]] = True
+        _success(state, attempted[learned], day, rng)
+        _failure(state, attempted[~learned], day)
+        # a failed first attempt leaves the tabia at the front of the new tabias
+        unlearned = np.concatenate([attempted[~learned], unlearned])
+
+    return Forecast(due=due_counts, new=new_counts)
+
+
+def _success(
+    state: ScheduleArrays,
+    index: np.ndarray,
+    day: int,
+    rng: np.random.Generator,
+) -> None:
+    # the vectorised counterpart of Metadata.success
+    due_date = state.due_date[index]
+    previous_diff = due_date - state.last_study_date[index]
+    absolute_diff = np.zeros(len(index), dtype=np.int64)
+    for scheduler, selected in _by_scheduler(state, index):
+        scheduler.batch_success(state, index[selected])
+        absolute_diff[selected] = scheduler.batch_interval(
+            previous_diff[selected], state, index[selected]
+        )
+    radius = state.recall_radius[index]
+    offset = rng.integers(-radius, radius, endpoint=True)
+    diff = np.clip(absolute_diff + offset, 1, state.recall_max[index])
+    # without a due date, a success is due tomorrow
+    diff = np.where(due_date == _NO_DATE, 1, diff)
+    state.last_study_date[index] = day
+    state.due_date[index] = day + diff
+
+
+def _failure(state: ScheduleArrays, index: np.ndarray, day: int) -> None:
+    for scheduler, selected in _by_scheduler(state, index):
+        scheduler.batch_failure(state, index[selected])
+    state.last_study_date[index] = day
+    state.due_date[index] = day + 1
+
+
+def _by_scheduler(
+    state: ScheduleArrays,
+    index: np.ndarray,
+) -> Iterator[Tuple[Scheduler, np.ndarray]]:
+    # the schedulers used at index, each with a mask of its positions in index
+    names = scheduler_names()
+    codes = state.scheduler[index]
+    for code in np.unique(codes):
+        yield get_scheduler(names[code]), codes == code
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import io
 import os
-from typing import List, Union
+from typing import List, Tuple, Union, TYPE_CHECKING
 import pathlib
 import abc
 import datetime
@@ -11,11 +12,25 @@ import enum
 import chess
 import random
 
+from zugzwang.attempts import AttemptLog
+from zugzwang.config import config
+from zugzwang.multi import GameIndex, MultiGameFile, sidecar
+from zugzwang.schedule import ProblemStore, ProblemStoreError
 from zugzwang.stats import ZugStats
 from zugzwang.tools import ZugChessTools, ZugJsonTools
+from zugzwang.tree import CompactTree
 from zugzwang.dates import ZugDates
+from zugzwang.rng import default_rng
+from zugzwang.schedulers import Scheduler, get_scheduler, scheduler_for
 from zugzwang import dates
 
+if TYPE_CHECKING:
+    from zugzwang.balance import DueDateIndex
+
+# the name of the group at the root of a collection, whatever its directory;
+# group_schedulers refer to the root by it
+ROOT_NAME = "UserData"
+
 
 class Status(str, enum.Enum):
     LEARNED = "LEARNED"
@@ -46,6 +61,9 @@ class Metadata:
     recall_radius: int = 3
     recall_factor: float = 2.0
     recall_max: int = 365
+    # state of the SM-2 scheduler
+    ease: float = 2.5
+    repetitions: int = 0
 
     @classmethod
     def from_json(cls, json_str: str) -> Metadata:
@@ -64,13 +82,24 @@ class Metadata:
         )
         return string + "\n"
 
-    def success(self):
+    def success(
+        self,
+        rng: Optional[random.Random] = None,
+        index: Optional[DueDateIndex] = None,
+        scheduler: Optional[Scheduler] = None,
+    ):
+        scheduler = scheduler or get_scheduler()
+        scheduler.success(self)
         self.status = Status.LEARNED
         self.successes += 1
+        # the next interval follows from the previous one, so the due date is
+        # calculated before the study date moves on
+        due_date = self._due_date(rng, index, scheduler)
         self.last_study_date = dates.today()
-        self.due_date = self._due_date()
+        self.due_date = due_date
 
-    def failure(self):
+    def failure(self, scheduler: Optional[Scheduler] = None):
+        (scheduler or get_scheduler()).failure(self)
         self.last_study_date = dates.today()
         self.due_date = ZugDates.tomorrow()
         self.failures += 1
@@ -110,23 +139,54 @@ class Metadata:
         year, month, day = tuple(date.split("-"))
         return datetime.date(int(year), int(month), int(day))
 
-    def _due_date(self) -> datetime.date:
-        if self.last_study_date is None:
-            raise ValueError("Cannot calculate due_date without last_study_date")
-
-        if self.due_date is None:
+    def _due_date(
+        self,
+        rng: Optional[random.Random] = None,
+        index: Optional[DueDateIndex] = None,
+        scheduler: Optional[Scheduler] = None,
+    ) -> datetime.date:
+        if self.due_date is None or self.last_study_date is None:
             return dates.tomorrow()
 
-        # calculate the diff based on recall factor and radius
+        # calculate the diff based on the scheduler and recall radius
         previous_diff = (self.due_date - self.last_study_date).days
-        absolute_diff = int(previous_diff * self.recall_factor)
-        offset = random.randint(-self.recall_radius, self.recall_radius)
+        scheduler = scheduler or get_scheduler()
+        absolute_diff = scheduler.interval(previous_diff, self)
+
+        if index is not None:
+            # let the index pick the day within the radius, by daily load
+            def day(diff: int) -> datetime.date:
+                diff = max(1, min(diff, self.recall_max))
+                return dates.today() + datetime.timedelta(days=diff)
+
+            return index.choose(
+                day(absolute_diff - self.recall_radius),
+                day(absolute_diff + self.recall_radius),
+                day(absolute_diff),
+                rng,
+            )
+
+        rng = rng or default_rng()
+        offset = rng.randint(-self.recall_radius, self.recall_radius)
 
         # impose minimum and maximum values
         diff = max(1, min(absolute_diff + offset, self.recall_max))
         return dates.today() + datetime.timedelta(days=diff)
 
 
+def metadata_stats(metadata: Metadata, solutions: int) -> ZugStats:
+    # a tabia is learned or not as a whole, so its stats count all of its
+    # solutions towards exactly one of new and learned
+    stats = ZugStats(total=solutions)
+    if metadata.status == Status.LEARNED:
+        stats.learned = solutions
+        if metadata.due_date is not None and metadata.due_date <= dates.today():
+            stats.due = solutions
+    else:
+        stats.new = solutions
+    return stats
+
+
 class Item(abc.ABC):
     def __init__(
         self,
@@ -149,6 +209,23 @@ class Item(abc.ABC):
     def parent(self) -> Optional[Group]:
         return self._parent
 
+    @property
+    def root(self) -> Item:
+        item = self
+        while item.parent is not None:
+            item = item.parent
+        return item
+
+    @property
+    def path(self) -> List[str]:
+        """The names from below the root down to this item."""
+        names = []
+        item = self
+        while item.parent is not None:
+            names.append(item.name)
+            item = item.parent
+        return names[::-1]
+
     @property
     def stats(self) -> ZugStats:
         if self._stats is None:
@@ -198,6 +275,29 @@ class Group(Item):
     def add_child(self, child: Item) -> None:
         self._children.append(child)
 
+    def insert_child(self, child: Item) -> None:
+        # in order of name, as the loader adds them
+        index = next(
+            (i for i, item in enumerate(self._children) if item.name > child.name),
+            len(self._children),
+        )
+        self._children.insert(index, child)
+
+    def remove_child(self, child: Item) -> None:
+        self._children.remove(child)
+
+    def find(self, path: List[str]) -> Optional[Item]:
+        """The item at path below this group, visiting no other branch."""
+        item = self
+        for name in path:
+            if not isinstance(item, Group):
+                return None
+            children = item.children
+            item = next((child for child in children if child.name == name), None)
+            if item is None:
+                return None
+        return item
+
 
 class Tabia(Item):
     def __init__(
@@ -210,12 +310,24 @@ class Tabia(Item):
         self._parent = parent
         self._game = io_manager.read(self)
         self._metadata = io_manager.read_meta(self) or self._default_metadata()
+        self._problems = io_manager.read_problems(self) or ProblemStore()
         self._stats = None
 
     @property
     def game(self) -> chess.GameNode:
         return self._game
 
+    def reload_game(self, io_manager: IOManager) -> None:
+        self._game = io_manager.read(self)
+        self._stats = None
+
+    def reload_metadata(self, io_manager: IOManager) -> None:
+        self._metadata = io_manager.read_meta(self) or self._default_metadata()
+        self._stats = None
+
+    def reload_problems(self, io_manager: IOManager) -> None:
+        self._problems = io_manager.read_problems(self) or ProblemStore()
+
     @property
     def name(self) -> str:
         return self._name
@@ -224,8 +336,13 @@ class Tabia(Item):
     def metadata(self) -> Metadata:
         return self._metadata
 
+    @property
+    def problems(self) -> ProblemStore:
+        return self._problems
+
     def flip_perspective(self):
         self._metadata.perspective = not self._metadata.perspective
+        self._stats = None
 
     def tabias(self) -> Generator[Tabia, None, None]:
         def gen():
@@ -239,34 +356,68 @@ class Tabia(Item):
             self._metadata.perspective,
         )
 
+    def identified_solutions(self) -> List[Tuple[str, chess.pgn.ChildNode]]:
+        return ZugChessTools.get_identified_solution_nodes(
+            self._game,
+            self._metadata.perspective,
+        )
+
     def lines(self) -> List[List[chess.pgn.GameNode]]:
         return ZugChessTools.get_lines(self._game, self._metadata.perspective)
 
+    def identified_lines(self) -> List[Tuple[str, List[chess.pgn.GameNode]]]:
+        return ZugChessTools.get_identified_lines(
+            self._game,
+            self._metadata.perspective,
+        )
+
+    @property
+    def scheduler(self) -> Scheduler:
+        return scheduler_for([ROOT_NAME, *self.path[:-1]])
+
     def is_learned(self):
         return self._metadata.status == Status.LEARNED
 
     def is_due(self):
         return self.is_learned() and self._metadata.due_date <= dates.today()
 
-    def record_attempt(self, result: Result) -> None:
+    def record_attempt(
+        self,
+        result: Result,
+        rng: Optional[random.Random] = None,
+        index: Optional[DueDateIndex] = None,
+        log: Optional[AttemptLog] = None,
+    ) -> None:
+        if log is not None:
+            log.record_tabia(self, result == Result.SUCCESS)
+        if index is not None:
+            index.remove(self._metadata)
+        scheduler = self.scheduler
         if result == Result.SUCCESS:
-            self._metadata.success()
+            self._metadata.success(rng, index, scheduler)
         elif result == Result.FAILURE:
-            self._metadata.failure()
+            self._metadata.failure(scheduler)
+        if index is not None:
+            index.add(self._metadata)
+        self._stats = None
 
     def _generate_stats(self) -> ZugStats:
-        stats = ZugStats()
-        stats.total = len(self.solutions())
-        return stats
+        return metadata_stats(self._metadata, len(self.solutions()))
 
     def _default_metadata(self) -> Metadata:
-        if self._game.headers["White"] == "p":
-            perspective = chess.WHITE
-        elif self._game.headers["Black"] == "p":
-            perspective = chess.BLACK
-        else:
-            perspective = not self._game.board().turn
-        return Metadata(perspective=perspective)
+        return default_metadata(self._game)
+
+
+def default_metadata(game: chess.pgn.Game) -> Metadata:
+    # a player named "p" marks the perspective; otherwise the perspective is
+    # the side not to move at the root
+    if game.headers["White"] == "p":
+        perspective = chess.WHITE
+    elif game.headers["Black"] == "p":
+        perspective = chess.BLACK
+    else:
+        perspective = not game.board().turn
+    return Metadata(perspective=perspective)
 
 
 class IOManager(abc.ABC):
@@ -282,10 +433,28 @@ class IOManager(abc.ABC):
     def read(self, tabia: Tabia) -> chess.pgn.Game:
         pass
 
+    @abc.abstractmethod
+    def read_problems(self, tabia: Tabia) -> Optional[ProblemStore]:
+        pass
+
+    @abc.abstractmethod
+    def write_problems(self, tabia: Tabia) -> None:
+        pass
+
+    def attempt_log(self, item: Item) -> Optional[AttemptLog]:
+        # attempts go unlogged, unless the manager keeps a log
+        return None
+
+    def checkpoint_path(self, item: Item) -> Optional[pathlib.Path]:
+        # sessions can't be resumed, unless the manager keeps checkpoints
+        return None
+
 
 class DefaultIOManager(IOManager):
     def __init__(self):
         self._groups: Dict[Group, pathlib.Path] = {}
+        self._attempt_logs: Dict[Item, AttemptLog] = {}
+        self._multi_files: Dict[Group, MultiGameFile] = {}
 
     def read_meta(self, tabia: Tabia) -> Optional[Metadata]:
         meta_path = self._meta_path(tabia)
@@ -304,15 +473,86 @@ class DefaultIOManager(IOManager):
             fp.write(tabia.metadata.as_json())
 
     def read(self, tabia: Tabia) -> chess.pgn.Game:
+        if (multi_file := self._multi_files.get(tabia.parent)) is not None:
+            return self._read_game(io.StringIO(multi_file.text(tabia.name)))
         with open(self._pgn_path(tabia)) as fp:
-            game = chess.pgn.read_game(fp)
-        return game
+            return self._read_game(fp)
+
+    @staticmethod
+    def _read_game(fp: TextIO) -> chess.pgn.Game:
+        if config["compact_trees"]:
+            return CompactTree.read(fp).root
+        return chess.pgn.read_game(fp)
+
+    def read_problems(self, tabia: Tabia) -> Optional[ProblemStore]:
+        problems_path = self._problems_path(tabia)
+        if not problems_path.exists():
+            return None
+        with open(problems_path) as fp:
+            data = fp.read()
+        try:
+            problems = ProblemStore.from_json(data)
+        except ProblemStoreError as exc:
+            raise IOError(f"Cannot read problems for {tabia.name}") from exc
+        return problems
+
+    def write_problems(self, tabia: Tabia) -> None:
+        with open(self._problems_path(tabia), "w") as fp:
+            fp.write(tabia.problems.as_json())
+
+    def attempt_log(self, item: Item) -> AttemptLog:
+        # one log per collection, in a directory the loader skips
+        root = item.root
+        if root not in self._attempt_logs:
+            self._attempt_logs[root] = AttemptLog(self._groups[root] / ".attempts")
+        return self._attempt_logs[root]
+
+    def checkpoint_path(self, item: Item) -> pathlib.Path:
+        # one interrupted session per collection
+        return self._groups[item.root] / ".session.json"
 
     def register_group(self, group: Group, path: pathlib.Path):
         self._groups[group] = path
 
+    def group_path(self, group: Group) -> Optional[pathlib.Path]:
+        """The directory the group was registered with, if any."""
+        return self._groups.get(group)
+
+    def group_at(self, path: pathlib.Path) -> Optional[Group]:
+        """The group registered with the directory at path, if any."""
+        return next(
+            (group for group, dir_ in self._groups.items() if dir_ == path), None
+        )
+
+    def is_multi_group(self, group: Group) -> bool:
+        return group in self._multi_files
+
+    def forget_group(self, group: Group) -> None:
+        """Unregister the group and every group below it."""
+        for item in [group, *self._subgroups(group)]:
+            self._groups.pop(item, None)
+            if (multi_file := self._multi_files.pop(item, None)) is not None:
+                multi_file.close()
+
+    @classmethod
+    def _subgroups(cls, group: Group) -> Generator[Group, None, None]:
+        for child in group.children:
+            if isinstance(child, Group):
+                yield child
+                yield from cls._subgroups(child)
+
+    def register_multi_group(
+        self, group: Group, pgn_path: pathlib.Path, index: GameIndex
+    ) -> None:
+        # the tabias' metadata lives in the sidecar directory, beside the index
+        self._groups[group] = sidecar(pgn_path)
+        self._multi_files[group] = MultiGameFile(pgn_path, index)
+
     def _meta_path(self, tabia: Tabia) -> pathlib.Path:
         return self._groups[tabia.parent] / (tabia.name + ".json")
 
+    def _problems_path(self, tabia: Tabia) -> pathlib.Path:
+        return self._groups[tabia.parent] / (tabia.name + ".problems.json")
+
     def _pgn_path(self, tabia: Tabia) -> pathlib.Path:
         return self._groups[tabia.parent] / (tabia.name + ".pgn")
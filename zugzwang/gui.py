@@ -1,9 +1,12 @@
 import pygame
 import chess
+import pathlib
 import time
 
 from typing import List, Tuple, Dict, Callable
 
+from zugzwang import inputs
+
 
 class ColourScheme:
     def __init__(
@@ -45,7 +48,7 @@ ROUGE_THEME = ColourScheme(
 class ZugGUI:
     """Draws the chess board."""
 
-    QUIT = "QUIT"
+    QUIT = inputs.QUIT
 
     _AWAITING_SOURCE = "AWAITING SOURCE"
     _AWAITING_TARGET = "AWAITING TARGET"
@@ -54,31 +57,22 @@ class ZugGUI:
 
     _SQUARE_SIZE = 60
 
-    _PIECE_IMAGES = {
-        chess.Piece(chess.PAWN, chess.WHITE): pygame.image.load("img/white_pawn.png"),
-        chess.Piece(chess.KNIGHT, chess.WHITE): pygame.image.load(
-            "img/white_knight.png"
-        ),
-        chess.Piece(chess.BISHOP, chess.WHITE): pygame.image.load(
-            "img/white_bishop.png"
-        ),
-        chess.Piece(chess.ROOK, chess.WHITE): pygame.image.load("img/white_rook.png"),
-        chess.Piece(chess.QUEEN, chess.WHITE): pygame.image.load("img/white_queen.png"),
-        chess.Piece(chess.KING, chess.WHITE): pygame.image.load("img/white_king.png"),
-        chess.Piece(chess.PAWN, chess.BLACK): pygame.image.load("img/black_pawn.png"),
-        chess.Piece(chess.KNIGHT, chess.BLACK): pygame.image.load(
-            "img/black_knight.png"
-        ),
-        chess.Piece(chess.BISHOP, chess.BLACK): pygame.image.load(
-            "img/black_bishop.png"
-        ),
-        chess.Piece(chess.ROOK, chess.BLACK): pygame.image.load("img/black_rook.png"),
-        chess.Piece(chess.QUEEN, chess.BLACK): pygame.image.load("img/black_queen.png"),
-        chess.Piece(chess.KING, chess.BLACK): pygame.image.load("img/black_king.png"),
+    _IMAGE_DIR = pathlib.Path(__file__).parent.parent / "img"
+    _IMAGE_NAMES = {
+        chess.PAWN: "pawn",
+        chess.KNIGHT: "knight",
+        chess.BISHOP: "bishop",
+        chess.ROOK: "rook",
+        chess.QUEEN: "queen",
+        chess.KING: "king",
     }
 
+    # populated by the first ZugGUI, so that importing this module is cheap
+    _PIECE_IMAGES: Dict[chess.Piece, pygame.Surface] = {}
+
     def __init__(self):
         pygame.init()
+        self._load_piece_images()
         self._screen = pygame.display.set_mode([480, 480])
         self._board = None
         self._move = None
@@ -87,10 +81,22 @@ class ZugGUI:
         self._source = None
         self._target = None
         self._running = False
+        self._asked_at = 0.0
+        self._think_time = 0.0
         self._status = self._AWAITING_SOURCE
         self._perspective = chess.WHITE
         self._colour_scheme = ROUGE_THEME
 
+    @classmethod
+    def _load_piece_images(cls):
+        if cls._PIECE_IMAGES:
+            return
+        for colour, colour_name in ((chess.WHITE, "white"), (chess.BLACK, "black")):
+            for piece_type, piece_name in cls._IMAGE_NAMES.items():
+                path = cls._IMAGE_DIR / f"{colour_name}_{piece_name}.png"
+                piece = chess.Piece(piece_type, colour)
+                cls._PIECE_IMAGES[piece] = pygame.image.load(str(path))
+
     def set_perspective(self, perspective: chess.Color):
         self._perspective = perspective
 
@@ -106,9 +112,19 @@ class ZugGUI:
         self._status = self._AWAITING_SOURCE
         self._source = None
         self._target = None
+        self._asked_at = time.perf_counter()
         self._event_loop()
+        self._think_time = time.perf_counter() - self._asked_at
         return self._input
 
+    def get_timed_input(self) -> inputs.TimedInput:
+        """
+        The next input, with the seconds from asking for it to its registration.
+        The position is on display by then, so this is the user's thinking time.
+        """
+        input_ = self.get_input()
+        return inputs.TimedInput(input_, self._think_time)
+
     def kill(self):
         pygame.quit()
 
@@ -0,0 +1,320 @@
+"""
+Importing PGN databases into a collection.
+
+The import is a pipeline of three stages. A reader streams the raw text of each
+game from the sources without parsing it, and hands games on in chunks. A pool of
+worker processes drops the comments from each chunk and lays the games out again
+in a normal form, parsing them only if asked to validate their moves. A single
+writer thread puts the games on disk, either one file per tabia or, for a
+multi-game group, one buffered write per chunk.
+
+The stages are joined by bounded queues: the reader stops while the workers hold
+their limit of chunks, and the workers' results wait while the writer is behind,
+so memory use stays flat however large the sources.
+"""
+
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import dataclasses
+import io
+import os
+import pathlib
+import queue
+import re
+import threading
+from typing import Deque, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+import chess.pgn
+
+from zugzwang.multi import SUFFIX as MULTI_SUFFIX
+from zugzwang.names import NameGenerator, load_words
+
+NAMINGS = ("numbered", "words", "content")
+
+
+class PGNImportError(Exception):
+    pass
+
+
+@dataclasses.dataclass
+class ImportOptions:
+    # worker processes; None for one per CPU, 0 to clean games in this process
+    workers: Optional[int] = None
+    chunk_games: int = 64
+    # chunks held by the workers before the reader waits; None for two per worker
+    max_pending: Optional[int] = None
+    comments: bool = False
+    # parse every game, skipping those with illegal moves
+    validate: bool = False
+    # write every game to the multi-game group of this name
+    multi: Optional[str] = None
+    # how files are named: "numbered" by position in the source, "words" at
+    # random, or "content" from the game, for imports that can be repeated
+    names: str = "numbered"
+
+
+@dataclasses.dataclass
+class ImportReport:
+    games: int = 0
+    written: int = 0
+    # games that were empty, or had illegal moves when validated, and were skipped
+    errors: int = 0
+
+
+@dataclasses.dataclass
+class Chunk:
+    source: str
+    # position of the first game in its source
+    start: int
+    games: List[str]
+
+
+def read_games(fp: TextIO) -> Iterator[str]:
+    """
+    The raw text of each game in fp.
+
+    A game starts at a tag line after movetext. Lines inside a brace comment are
+    never taken for tags, though nothing else is parsed.
+    """
+    lines: List[str] = []
+    in_movetext = False
+    in_comment = False
+    for line in fp:
+        if not in_comment and line.startswith("[") and in_movetext:
+            yield "".join(lines)
+            lines = []
+            in_movetext = False
+        lines.append(line)
+        if not in_comment and (line.startswith("[") or not line.strip()):
+            continue
+        in_movetext = True
+        # a brace comment may span lines; braces don't nest in PGN
+        opened, closed = line.rfind("{"), line.rfind("}")
+        if opened > closed:
+            in_comment = True
+        elif closed > opened:
+            in_comment = False
+    if "".join(lines).strip():
+        yield "".join(lines)
+
+
+def read_chunks(source: pathlib.Path, size: int) -> Iterator[Chunk]:
+    with open(source, encoding="utf-8-sig", errors="replace") as fp:
+        games: List[str] = []
+        start = 0
+        for game in read_games(fp):
+            games.append(game)
+            if len(games) == size:
+                yield Chunk(source.stem, start, games)
+                start += len(games)
+                games = []
+        if games:
+            yield Chunk(source.stem, start, games)
+
+
+def clean_games(
+    games: List[str],
+    comments: bool = False,
+    validate: bool = False,
+) -> List[Optional[str]]:
+    """
+    Each game in a normal form, or None where it can't be read.
+
+    Unless validate is set, games are cleaned as text, which is far faster than
+    parsing them but leaves illegal moves to be found when the tabia is loaded.
+    """
+    if not validate:
+        return [_clean_text(text, comments) for text in games]
+    cleaned: List[Optional[str]] = []
+    for text in games:
+        game = chess.pgn.read_game(io.StringIO(text))
+        if game is None or game.errors:
+            cleaned.append(None)
+            continue
+        if not comments:
+            _clear_comments(game)
+        # the exporter drops NAGs along with comments, so comments are cleared
+        # from the tree instead
+        exporter = chess.pgn.StringExporter(headers=True, variations=True)
+        cleaned.append(game.accept(exporter) + "\n")
+    return cleaned
+
+
+# brace comments, rest-of-line comments and escaped lines of movetext
+_COMMENT = re.compile(r"\{[^}]*\}?|;[^\n]*|^%[^\n]*", re.MULTILINE)
+_WRAP = re.compile(r"(\S.{0,78})(?: |$)")
+
+
+def _clean_text(text: str, comments: bool) -> Optional[str]:
+    headers: List[str] = []
+    lines = text.splitlines()
+    for index, line in enumerate(lines):
+        if line.startswith("["):
+            headers.append(line.strip())
+        elif line.strip():
+            break
+    else:
+        return None
+    movetext = "\n".join(lines[index:])
+    if comments:
+        # a comment may run to the end of its line, so lines are kept as they are
+        return "\n".join(headers) + "\n\n" + movetext.strip() + "\n"
+    movetext = " ".join(_COMMENT.sub(" ", movetext).split())
+    # wrapped to the export format's line length, at spaces; a token too long
+    # to wrap leaves the movetext on one line
+    wrapped = _WRAP.findall(movetext)
+    if sum(map(len, wrapped)) + len(wrapped) - 1 != len(movetext):
+        wrapped = [movetext]
+    return "\n".join(headers) + "\n\n" + "\n".join(wrapped) + "\n"
+
+
+def _clear_comments(game: chess.pgn.Game) -> None:
+    # iteratively, as deep games would overflow the stack
+    stack: List[chess.pgn.GameNode] = [game]
+    while stack:
+        node = stack.pop()
+        node.comment = ""
+        if isinstance(node, chess.pgn.ChildNode):
+            node.starting_comment = ""
+        stack.extend(node.variations)
+
+
+class GameWriter:
+    """Writes cleaned chunks on its own thread, in the order they are put."""
+
+    def __init__(
+        self,
+        destination: pathlib.Path,
+        multi: Optional[str] = None,
+        max_pending: int = 4,
+        names: str = "numbered",
+    ):
+        if names not in NAMINGS:
+            raise PGNImportError(f"Unknown naming {names}")
+        destination.mkdir(parents=True, exist_ok=True)
+        self._destination = destination
+        self._multi = multi
+        self._naming = names
+        self._names = NameGenerator.for_directory(
+            destination, words=load_words() if names != "numbered" else ()
+        )
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._written = 0
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def written(self) -> int:
+        return self._written
+
+    def put(self, chunk: Chunk) -> None:
+        """Queue a chunk of cleaned games, waiting while the queue is full."""
+        self._queue.put(chunk)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise PGNImportError("Cannot write games") from self._error
+
+    def _run(self) -> None:
+        multi_fp = None
+        try:
+            if self._multi is not None:
+                path = self._destination / (self._multi + MULTI_SUFFIX)
+                multi_fp = open(path, "a", encoding="utf-8")
+            while (chunk := self._queue.get()) is not None:
+                games = [game for game in chunk.games if game is not None]
+                if multi_fp is not None:
+                    multi_fp.write("\n".join(games))
+                    multi_fp.write("\n" if games else "")
+                else:
+                    self._write_files(chunk)
+                self._written += len(games)
+        except BaseException as exc:
+            self._error = exc
+            # keep taking chunks, so that the pipeline can't block on a full queue
+            while self._queue.get() is not None:
+                pass
+        finally:
+            if multi_fp is not None:
+                multi_fp.close()
+
+    def _write_files(self, chunk: Chunk) -> None:
+        for position, game in enumerate(chunk.games, chunk.start):
+            if game is None:
+                continue
+            name = self._name(chunk.source, position, game)
+            with open(self._destination / (name + ".pgn"), "w") as fp:
+                fp.write(game)
+
+    def _name(self, source: str, position: int, game: str) -> str:
+        if self._naming == "words":
+            return self._names.random()
+        if self._naming == "content":
+            return self._names.from_content(game)
+        base = name = f"{source}-{position + 1:06d}"
+        count = 1
+        while not self._names.reserve(name):
+            count += 1
+            name = f"{base}-{count}"
+        return name
+
+
+def import_pgn(
+    sources: Sequence[pathlib.Path],
+    destination: pathlib.Path,
+    options: Optional[ImportOptions] = None,
+) -> ImportReport:
+    options = options or ImportOptions()
+    workers = (os.cpu_count() or 1) if options.workers is None else options.workers
+    max_pending = options.max_pending or 2 * max(workers, 1)
+    report = ImportReport()
+    writer = GameWriter(destination, options.multi, max_pending, options.names)
+
+    def drain(pending: Deque[Tuple[Chunk, concurrent.futures.Future]]) -> None:
+        # results are taken in submission order, so output order is input order
+        chunk, future = pending.popleft()
+        cleaned = dataclasses.replace(chunk, games=future.result())
+        report.errors += sum(game is None for game in cleaned.games)
+        writer.put(cleaned)
+
+    try:
+        if workers == 0:
+            executor = _InlineExecutor()
+        else:
+            executor = concurrent.futures.ProcessPoolExecutor(workers)
+        with executor:
+            pending: Deque[
+                Tuple[Chunk, concurrent.futures.Future]
+            ] = collections.deque()
+            for source in sources:
+                for chunk in read_chunks(source, options.chunk_games):
+                    report.games += len(chunk.games)
+                    future = executor.submit(
+                        clean_games, chunk.games, options.comments, options.validate
+                    )
+                    pending.append((chunk, future))
+                    if len(pending) >= max_pending:
+                        drain(pending)
+            while pending:
+                drain(pending)
+    finally:
+        writer.close()
+
+    report.written = writer.written
+    return report
+
+
+class _InlineExecutor(concurrent.futures.Executor):
+    # runs each job as it is submitted, for small imports and for debugging
+    def submit(self, fn, /, *args, **kwargs) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
@@ -0,0 +1,17 @@
+# Values that ZugGUI.get_input() may return in place of a chess.Move, and the
+# timed inputs of ZugGUI.get_timed_input().
+# They live outside zugzwang.gui so that training code can recognise them
+# without importing pygame.
+
+from typing import NamedTuple, Union
+
+import chess
+
+QUIT = "QUIT"
+
+
+class TimedInput(NamedTuple):
+    """An input with the seconds between asking for it and receiving it."""
+
+    value: Union[chess.Move, str]
+    think_time: float
@@ -0,0 +1,358 @@
+"""
+Linting the trees of a collection.
+
+The solution search reads a tree by the NAGs of the replies to each problem: the
+first reply without NAGs is the candidate, "!?" marks an alternative and "?" a
+blunder. Anything else is silently skipped, so mistakes in a tree only show in
+training. The linter walks each tree as the search does and reports
+
+- problems with more than one candidate, of which only the first is used,
+- replies whose NAGs mark none of the above,
+- the subtrees that are never reached because of either, and
+- hanging problems, which have no candidate to train.
+
+Files are linted across a process pool. The issues of each file are cached
+under a hash of its content and its tabias' perspectives, so a re-run only
+lints the files that changed.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import dataclasses
+import enum
+import hashlib
+import io
+import json
+import os
+import pathlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import chess
+import chess.pgn
+
+from zugzwang.group import Metadata, MetadataError, default_metadata
+from zugzwang.multi import GameIndex, MultiGameFile, is_multi, sidecar
+from zugzwang.tools import ALTERNATIVE, BLUNDER, CANDIDATE, ZugChessTools
+
+# part of every cache key, so that changing the rules relints every file
+VERSION = 1
+
+
+class LintError(Exception):
+    pass
+
+
+class Rule(str, enum.Enum):
+    PARSE_ERROR = "parse-error"
+    MULTIPLE_CANDIDATES = "multiple-candidates"
+    UNKNOWN_NAG = "unknown-nag"
+    UNREACHABLE = "unreachable"
+    HANGING_PROBLEM = "hanging-problem"
+
+
+@dataclasses.dataclass
+class LintIssue:
+    # relative to the linted directory
+    file: str
+    # the tabia's name within a multi-game file
+    game: Optional[str]
+    rule: Rule
+    # the moves from the root, in SAN
+    moves: str
+    message: str
+
+    def __str__(self) -> str:
+        location = self.file if self.game is None else f"{self.file}:{self.game}"
+        return (
+            f"{location}: {self.rule.value}: {self.moves or '(root)'}: {self.message}"
+        )
+
+    def as_list(self) -> list:
+        return [self.file, self.game, self.rule.value, self.moves, self.message]
+
+    @classmethod
+    def from_list(cls, values: list) -> LintIssue:
+        file, game, rule, moves, message = values
+        return cls(file, game, Rule(rule), moves, message)
+
+
+@dataclasses.dataclass
+class LintReport:
+    files: int = 0
+    # files whose issues came from the cache
+    cached: int = 0
+    issues: List[LintIssue] = dataclasses.field(default_factory=list)
+
+
+def lint_game(
+    game: chess.pgn.Game,
+    perspective: chess.Color,
+) -> Iterator[Tuple[Rule, chess.pgn.GameNode, str]]:
+    """The issues of game, each with the node it concerns, in preorder."""
+    for error in game.errors:
+        yield Rule.PARSE_ERROR, game, str(error)
+
+    # as in the solution search, the side to move alternates down the tree, and
+    # the perspective turns at each blunder
+    stack = [(game, perspective, game.board().turn)]
+    while stack:
+        node, solution_perspective, player_to_move = stack.pop()
+        children = []
+        if player_to_move != solution_perspective:
+            children = [(child, solution_perspective) for child in node.variations]
+        else:
+            candidates = []
+            for reply in node.variations:
+                mask = ZugChessTools.nag_mask(reply)
+                if mask == CANDIDATE:
+                    candidates.append(reply)
+                elif mask == ALTERNATIVE:
+                    children.append((reply, solution_perspective))
+                elif mask == BLUNDER:
+                    children.append((reply, not solution_perspective))
+                else:
+                    nags = " ".join(f"${nag}" for nag in sorted(reply.nags))
+                    message = f"{nags} is not a candidate, alternative or blunder"
+                    yield Rule.UNKNOWN_NAG, reply, message
+                    yield Rule.UNREACHABLE, reply, _unreachable(reply)
+            if not candidates:
+                message = "no candidate reply" if node.variations else "no reply"
+                yield Rule.HANGING_PROBLEM, node, message
+            else:
+                children.insert(0, (candidates[0], solution_perspective))
+            if len(candidates) > 1:
+                yield (
+                    Rule.MULTIPLE_CANDIDATES,
+                    node,
+                    f"{len(candidates)} candidates; only {candidates[0].san()} is used",
+                )
+                for candidate in candidates[1:]:
+                    yield Rule.UNREACHABLE, candidate, _unreachable(candidate)
+        stack.extend(
+            (child, child_perspective, not player_to_move)
+            for child, child_perspective in reversed(children)
+        )
+
+
+def lint_file(
+    path: pathlib.Path,
+    perspectives: Dict[Optional[str], Optional[chess.Color]],
+    relative: str,
+) -> List[LintIssue]:
+    """
+    Lint a PGN, or each game of a multi-game file. A tabia without a perspective
+    takes its default one.
+    """
+    issues = []
+    for name, game in _read_games(path):
+        if game is None:
+            issues.append(LintIssue(relative, name, Rule.PARSE_ERROR, "", "no game"))
+            continue
+        perspective = perspectives.get(name)
+        if perspective is None:
+            perspective = default_metadata(game).perspective
+        for rule, node, message in lint_game(game, perspective):
+            issues.append(LintIssue(relative, name, rule, _moves(node), message))
+    return issues
+
+
+class LintCache:
+    """The issues of each file linted, keyed by its path from the root."""
+
+    FILENAME = ".lint.json"
+
+    def __init__(self, root: pathlib.Path):
+        self._path = root / self.FILENAME
+        self._entries: Dict[str, Tuple[str, List[LintIssue]]] = {}
+        self._dirty = False
+        if self._path.exists():
+            self._load()
+
+    def get(self, relative: str, key: str) -> Optional[List[LintIssue]]:
+        entry = self._entries.get(relative)
+        if entry is None or entry[0] != key:
+            return None
+        return entry[1]
+
+    def set(self, relative: str, key: str, issues: List[LintIssue]) -> None:
+        self._entries[relative] = (key, issues)
+        self._dirty = True
+
+    def retain(self, relatives: Iterable[str]) -> None:
+        """Drop the entries of files that are gone."""
+        relatives = set(relatives)
+        kept = {
+            relative: entry
+            for relative, entry in self._entries.items()
+            if relative in relatives
+        }
+        if len(kept) != len(self._entries):
+            self._entries = kept
+            self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        data = {
+            relative: [key, [issue.as_list() for issue in issues]]
+            for relative, (key, issues) in sorted(self._entries.items())
+        }
+        with open(self._path, "w") as fp:
+            json.dump(data, fp, separators=(",", ":"))
+        self._dirty = False
+
+    def _load(self) -> None:
+        try:
+            with open(self._path) as fp:
+                data = json.load(fp)
+            self._entries = {
+                relative: (key, [LintIssue.from_list(issue) for issue in issues])
+                for relative, (key, issues) in data.items()
+            }
+        except (ValueError, TypeError, KeyError):
+            # a corrupt cache is simply rebuilt
+            self._entries = {}
+
+
+def lint_collection(
+    root: pathlib.Path,
+    workers: Optional[int] = None,
+    use_cache: bool = True,
+) -> LintReport:
+    """
+    Lint every PGN under root, with worker processes, one per CPU by default,
+    or in this process if workers is 0.
+    """
+    if not root.is_dir():
+        raise LintError(f"No collection at {root}")
+    cache = LintCache(root) if use_cache else None
+    report = LintReport()
+    jobs: List[_Job] = []
+    keys: Dict[str, str] = {}
+    results: Dict[str, List[LintIssue]] = {}
+    for path in pgn_paths(root):
+        relative = path.relative_to(root).as_posix()
+        perspectives = _perspectives(path)
+        keys[relative] = _cache_key(path, perspectives)
+        report.files += 1
+        cached = cache.get(relative, keys[relative]) if cache is not None else None
+        if cached is not None:
+            report.cached += 1
+            results[relative] = cached
+        else:
+            jobs.append((path, perspectives, relative))
+
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    if workers > 0 and len(jobs) > 1:
+        workers = min(workers, len(jobs))
+        # a few chunks per worker, so that one large file can't hold up the rest
+        chunksize = max(1, len(jobs) // (4 * workers))
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            linted = list(pool.map(_lint_job, jobs, chunksize=chunksize))
+    else:
+        linted = [_lint_job(job) for job in jobs]
+
+    for (_, _, relative), issues in zip(jobs, linted):
+        results[relative] = issues
+        if cache is not None:
+            cache.set(relative, keys[relative], issues)
+
+    for relative in sorted(results):
+        report.issues.extend(results[relative])
+    if cache is not None:
+        cache.retain(results)
+        cache.save()
+    return report
+
+
+def pgn_paths(root: pathlib.Path) -> List[pathlib.Path]:
+    """The PGNs under root that the loader would read, in loading order."""
+    paths = []
+    with os.scandir(root) as scan:
+        entries = sorted(scan, key=lambda entry: entry.name)
+    for entry in entries:
+        if entry.name.endswith(".pgn"):
+            paths.append(pathlib.Path(entry.path))
+        elif "." not in entry.name and entry.is_dir():
+            paths.extend(pgn_paths(pathlib.Path(entry.path)))
+    return paths
+
+
+_Job = Tuple[pathlib.Path, Dict[Optional[str], Optional[chess.Color]], str]
+
+
+def _lint_job(job: _Job) -> List[LintIssue]:
+    return lint_file(*job)
+
+
+def _read_games(
+    path: pathlib.Path,
+) -> Iterator[Tuple[Optional[str], Optional[chess.pgn.Game]]]:
+    if not is_multi(path.name):
+        with open(path) as fp:
+            yield None, chess.pgn.read_game(fp)
+        return
+    index = GameIndex.load(path)
+    multi_file = MultiGameFile(path, index)
+    try:
+        for name in index.names:
+            yield name, chess.pgn.read_game(io.StringIO(multi_file.text(name)))
+    finally:
+        multi_file.close()
+
+
+def _perspectives(path: pathlib.Path) -> Dict[Optional[str], Optional[chess.Color]]:
+    # the perspective decides what is a problem, so it is part of the cache key,
+    # while the rest of the metadata changes with every session and is not
+    if not is_multi(path.name):
+        return {None: _perspective(path.with_suffix(".json"))}
+    directory = sidecar(path)
+    if not directory.is_dir():
+        return {}
+    return {
+        meta_path.name[: -len(".json")]: _perspective(meta_path)
+        for meta_path in sorted(directory.iterdir())
+        if meta_path.name.endswith(".json")
+        and meta_path.name.count(".") == 1
+        and meta_path.name != GameIndex.FILENAME
+    }
+
+
+def _perspective(meta_path: pathlib.Path) -> Optional[chess.Color]:
+    try:
+        with open(meta_path) as fp:
+            return Metadata.from_json(fp.read()).perspective
+    except (FileNotFoundError, MetadataError, TypeError):
+        return None
+
+
+def _cache_key(
+    path: pathlib.Path,
+    perspectives: Dict[Optional[str], Optional[chess.Color]],
+) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fp:
+        while chunk := fp.read(1 << 20):
+            digest.update(chunk)
+    extra = [VERSION, sorted((name or "", p) for name, p in perspectives.items())]
+    digest.update(json.dumps(extra).encode())
+    return digest.hexdigest()
+
+
+def _moves(node: chess.pgn.GameNode) -> str:
+    moves = []
+    while node.parent is not None:
+        moves.append(node.move)
+        node = node.parent
+    return node.board().variation_san(reversed(moves))
+
+
+def _unreachable(node: chess.pgn.ChildNode) -> str:
+    count = 0
+    stack = [node]
+    while stack:
+        count += 1
+        stack.extend(stack.pop().variations)
+    moves = "move" if count == 1 else "moves"
+    return f"{count} {moves} never trained"
@@ -0,0 +1,95 @@
+"""
+Loading a collection from disk into a tree of groups and tabias.
+
+Directories become groups, PGN files tabias and multi-game PGN files groups of
+tabias. Other files and directories with a dot in their names, such as
+metadata and sidecar directories, are not items.
+"""
+
+from __future__ import annotations
+
+import os
+import pathlib
+from typing import List, Optional
+
+from zugzwang.group import DefaultIOManager, Group, Item, Tabia
+from zugzwang.multi import GameIndex, group_name, is_multi
+
+
+def is_excluded(filename: str):
+    return "." in filename and not filename.endswith(".pgn")
+
+
+def search_dir(
+    path: pathlib.Path,
+    parent: Group,
+    io_manager: DefaultIOManager,
+) -> List[Item]:
+
+    names: List[str] = [
+        name for name in sorted(os.listdir(path)) if not is_excluded(name)
+    ]
+    return [load_item(name, path / name, parent, io_manager) for name in names]
+
+
+def load_item(
+    name: str,
+    path: pathlib.Path,
+    parent: Group,
+    io_manager: DefaultIOManager,
+) -> Item:
+    """The item for the entry called name at path, in the group parent."""
+    if is_multi(name):
+        return initialise_multi_group(
+            name=name,
+            path=path,
+            io_manager=io_manager,
+            parent=parent,
+        )
+    if name.endswith(".pgn"):
+        return Tabia(
+            name=name[:-4],
+            parent=parent,
+            io_manager=io_manager,
+        )
+    return initialise_group(
+        name=name,
+        path=path,
+        io_manager=io_manager,
+        parent=parent,
+    )
+
+
+def initialise_group(
+    name: str,
+    path: pathlib.Path,
+    io_manager: DefaultIOManager,
+    parent: Optional[Group] = None,
+) -> Group:
+    group = Group(
+        name=name,
+        parent=parent,
+    )
+    io_manager.register_group(group, path)
+    for item in search_dir(path, group, io_manager):
+        group.add_child(item)
+
+    return group
+
+
+def initialise_multi_group(
+    name: str,
+    path: pathlib.Path,
+    io_manager: DefaultIOManager,
+    parent: Optional[Group] = None,
+) -> Group:
+    group = Group(
+        name=group_name(name),
+        parent=parent,
+    )
+    index = GameIndex.load(path)
+    io_manager.register_multi_group(group, path, index)
+    for game_name in index.names:
+        group.add_child(Tabia(name=game_name, parent=group, io_manager=io_manager))
+
+    return group
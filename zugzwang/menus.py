@@ -11,6 +11,8 @@ _training_mode_map = {
     "p": TrainingMode.PROBLEMS,
     "t": TrainingMode.TABIAS,
     "s": TrainingMode.SCHEDULED,
+    "d": TrainingMode.DUE_PROBLEMS,
+    "r": TrainingMode.RESUME,
 }
 
 
@@ -135,18 +137,25 @@ class GroupScene(MenuScene):
             "",
         ]
 
-    def _get_header(self) -> str:
+    @classmethod
+    def table(cls, items: List[Item]) -> List[str]:
+        """The header and rows for the given items; used by the headless CLI too."""
+        return [
+            cls._get_header(),
+            *[cls._get_row(index + 1, item) for index, item in enumerate(items)],
+        ]
+
+    @classmethod
+    def _get_header(cls) -> str:
         return "".join(
-            [header.ljust(spacing) for header, spacing in self._table_schema.values()]
+            [header.ljust(spacing) for header, spacing in cls._table_schema.values()]
         )
 
     def _get_table(self) -> List[str]:
-        return [
-            self._get_row(index + 1, child)
-            for index, child in enumerate(self._group.children)
-        ]
+        return self.table(self._group.children)[1:]
 
-    def _get_row(self, index: int, item: Item) -> str:
+    @classmethod
+    def _get_row(cls, index: int, item: Item) -> str:
         stats = item.stats
         coverage = (stats.learned * 100) // stats.total if stats.total > 0 else 0
         row = {
@@ -162,7 +171,7 @@ class GroupScene(MenuScene):
 
         row_str = ""
         for field, string in row.items():
-            _, spacing = self._table_schema[field]
+            _, spacing = cls._table_schema[field]
             if field == "coverage":
                 row_str += string.rjust(spacing)
                 continue
@@ -177,11 +186,13 @@ class GroupScene(MenuScene):
             "l  - line-based training",
             "t  - tabia-based training",
             "s  - scheduled training",
+            "d  - due problem training",
+            "r  - resume interrupted session",
             "b  - go back",
         ]
 
     def _validate(self, input_) -> Optional[str]:
-        if input_ in ["p", "l", "t", "s", "b"]:
+        if input_ in ["p", "l", "t", "s", "d", "r", "b"]:
             return input_
         if not self._represents_int(input_):
             return None
@@ -193,7 +204,7 @@ class GroupScene(MenuScene):
             index = int(input_) - 1
             return self._group.children[index]
 
-        elif input_ in ["p", "l", "t", "s"]:
+        elif input_ in ["p", "l", "t", "s", "d", "r"]:
             mode = _training_mode_map[input_]
             options = TrainingOptions(mode=mode)
             return TrainingSpec(self._group, options)
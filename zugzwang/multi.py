@@ -0,0 +1,148 @@
+"""
+Multi-game PGN files.
+
+A file named like Openings.multi.pgn is loaded as a group whose tabias are its
+games. The file is scanned once for the byte offset of each game, and the
+offsets are kept in an index in the sidecar directory Openings.multi, next to
+the metadata of the tabias. A tabia's game is then read by slicing a memory map
+of the file at its offset, without parsing the games before it.
+
+Tabias are named from their Event header where it has one, or else by their
+position in the file.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import io
+import json
+import mmap
+import os
+import pathlib
+from typing import Dict, List, Optional, Tuple
+
+import chess.pgn
+
+SUFFIX = ".multi.pgn"
+
+
+class GameIndexError(Exception):
+    pass
+
+
+def is_multi(filename: str) -> bool:
+    return filename.endswith(SUFFIX)
+
+
+def group_name(filename: str) -> str:
+    return filename[: -len(SUFFIX)]
+
+
+def sidecar(pgn_path: pathlib.Path) -> pathlib.Path:
+    """The directory holding the index and the tabias' metadata."""
+    return pgn_path.with_name(group_name(pgn_path.name) + ".multi")
+
+
+@dataclasses.dataclass
+class GameIndex:
+    FILENAME = "index.json"
+
+    mtime_ns: int
+    size: int
+    # name and byte offset of each game, in file order
+    games: List[Tuple[str, int]]
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name, _ in self.games]
+
+    def matches(self, pgn_stat: os.stat_result) -> bool:
+        return (self.mtime_ns, self.size) == (pgn_stat.st_mtime_ns, pgn_stat.st_size)
+
+    @classmethod
+    def scan(cls, pgn_path: pathlib.Path) -> GameIndex:
+        pgn_stat = pgn_path.stat()
+        games = []
+        names = set()
+        with open(pgn_path, "rb") as raw:
+            # at the start of a game the decoder holds no state, so tell gives
+            # the byte offset
+            fp = io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace")
+            while True:
+                offset = fp.tell()
+                if (headers := chess.pgn.read_headers(fp)) is None:
+                    break
+                name = _game_name(headers, len(games), names)
+                names.add(name)
+                games.append((name, offset))
+        return cls(pgn_stat.st_mtime_ns, pgn_stat.st_size, games)
+
+    @classmethod
+    def load(cls, pgn_path: pathlib.Path) -> GameIndex:
+        """The index of the file, rescanned and saved if stale or missing."""
+        index_path = sidecar(pgn_path) / cls.FILENAME
+        index = _read_index(index_path)
+        if index is None or not index.matches(pgn_path.stat()):
+            index = cls.scan(pgn_path)
+            index_path.parent.mkdir(exist_ok=True)
+            index_path.write_text(index.as_json())
+        return index
+
+    @classmethod
+    def from_json(cls, json_str: str) -> GameIndex:
+        try:
+            data = json.loads(json_str)
+            return cls(
+                mtime_ns=data["mtime_ns"],
+                size=data["size"],
+                games=[(name, offset) for name, offset in data["games"]],
+            )
+        except (ValueError, TypeError, KeyError) as exc:
+            raise GameIndexError() from exc
+
+    def as_json(self) -> str:
+        return json.dumps(dataclasses.asdict(self), separators=(",", ":")) + "\n"
+
+
+class MultiGameFile:
+    """The games of a multi-game PGN, read through a memory map by tabia name."""
+
+    def __init__(self, pgn_path: pathlib.Path, index: GameIndex):
+        self._path = pgn_path
+        self._spans: Dict[str, Tuple[int, int]] = {}
+        ends = [offset for _, offset in index.games[1:]] + [index.size]
+        for (name, offset), end in zip(index.games, ends):
+            self._spans[name] = (offset, end)
+        self._map: Optional[mmap.mmap] = None
+
+    def text(self, name: str) -> str:
+        if self._map is None:
+            # the map outlives the file object
+            with open(self._path, "rb") as fp:
+                self._map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        start, end = self._spans[name]
+        return self._map[start:end].decode("utf-8-sig", errors="replace")
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+def _game_name(headers: chess.pgn.Headers, position: int, taken: set) -> str:
+    event = headers.get("Event", "?")
+    name = event if event not in ("", "?") else f"Game {position + 1}"
+    name = name.replace(os.sep, "-")
+    # names key the tabias' metadata, so they must be unique within the file
+    base, count = name, 1
+    while name in taken:
+        count += 1
+        name = f"{base} ({count})"
+    return name
+
+
+def _read_index(index_path: pathlib.Path) -> Optional[GameIndex]:
+    try:
+        return GameIndex.from_json(index_path.read_text())
+    except (FileNotFoundError, GameIndexError):
+        return None
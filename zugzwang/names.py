@@ -0,0 +1,119 @@
+"""
+Names for new tabias.
+
+A NameGenerator joins capitalised words from the word list, as in
+"AddedBasketCorner". Random names sample the list in O(1) per word; content
+names are drawn from a hash of the game, so that importing the same game twice
+gives the same name. Either way, a candidate is checked against the names
+already taken in the target directory, and no name is handed out twice.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import pathlib
+import random
+from typing import Iterable, Optional, Sequence, Set, Tuple
+
+from zugzwang.config import config
+from zugzwang.multi import group_name, is_multi
+from zugzwang.rng import default_rng
+
+
+class NamingError(Exception):
+    pass
+
+
+@functools.lru_cache(maxsize=None)
+def load_words(path: Optional[pathlib.Path] = None) -> Tuple[str, ...]:
+    """The word list, read once per path; short words are left out."""
+    path = pathlib.Path(path or config["word_list"])
+    with open(path) as fp:
+        words = (line.strip() for line in fp)
+        return tuple(word for word in words if len(word) > 3)
+
+
+def taken_names(directory: pathlib.Path) -> Set[str]:
+    """The names of the items already in directory."""
+    if not directory.exists():
+        return set()
+    names = set()
+    for path in directory.iterdir():
+        if is_multi(path.name):
+            names.add(group_name(path.name))
+        elif path.suffix in (".pgn", ".json"):
+            names.add(path.name.split(".")[0])
+        elif "." not in path.name:
+            names.add(path.name)
+    return names
+
+
+class NameGenerator:
+    # attempts at a free name before giving up; with thousands of words and
+    # three per name, a collision is already rare
+    MAX_TRIES = 100
+
+    def __init__(
+        self,
+        words: Optional[Sequence[str]] = None,
+        taken: Iterable[str] = (),
+        rng: Optional[random.Random] = None,
+        length: int = 3,
+    ):
+        self._words = words if words is not None else load_words()
+        self._taken = set(taken)
+        self._rng = rng or default_rng()
+        self._length = length
+
+    @classmethod
+    def for_directory(
+        cls,
+        directory: pathlib.Path,
+        words: Optional[Sequence[str]] = None,
+        rng: Optional[random.Random] = None,
+    ) -> NameGenerator:
+        return cls(words, taken_names(directory), rng)
+
+    def random(self) -> str:
+        self._check_words()
+        for _ in range(self.MAX_TRIES):
+            indices = self._rng.sample(range(len(self._words)), self._length)
+            if (name := self._claim(indices)) is not None:
+                return name
+        raise NamingError("No free name found")
+
+    def from_content(self, content: str) -> str:
+        """
+        A name determined by content, unless it is taken, in which case the next
+        name in a sequence also determined by content.
+        """
+        self._check_words()
+        seed = content.encode()
+        for attempt in range(self.MAX_TRIES):
+            digest = hashlib.blake2b(
+                seed, digest_size=4 * self._length, person=attempt.to_bytes(8, "big")
+            ).digest()
+            indices = [
+                int.from_bytes(digest[4 * i : 4 * i + 4], "big") % len(self._words)
+                for i in range(self._length)
+            ]
+            if (name := self._claim(indices)) is not None:
+                return name
+        raise NamingError("No free name found")
+
+    def reserve(self, name: str) -> bool:
+        """Take name if it is free, returning whether it was."""
+        if name in self._taken:
+            return False
+        self._taken.add(name)
+        return True
+
+    def _check_words(self) -> None:
+        if len(self._words) < self._length:
+            raise NamingError("Too few words")
+
+    def _claim(self, indices: Sequence[int]) -> Optional[str]:
+        words = (self._words[index] for index in indices)
+        name = "".join(word[0].upper() + word[1:] for word in words)
+        return name if self.reserve(name) else None
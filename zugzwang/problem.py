@@ -1,29 +1,53 @@
+from __future__ import annotations
+
+import random
 import time
-from typing import List
+from typing import List, Optional, Tuple, TYPE_CHECKING
 
 import chess
 
+from zugzwang import inputs
+from zugzwang.attempts import ProblemAttempts
 from zugzwang.queue import QueueItem, QueueResult
-from zugzwang.gui import ZugGUI
+from zugzwang.tools import ZugChessTools
+
+if TYPE_CHECKING:
+    from zugzwang.gui import ZugGUI
+    from zugzwang.group import Tabia
 
 
-def _present_problem(solution: chess.pgn.ChildNode, gui: ZugGUI) -> QueueResult:
+def _present_problem(
+    solution: chess.pgn.ChildNode,
+    gui: ZugGUI,
+    attempts: Optional[ProblemAttempts] = None,
+) -> Tuple[QueueResult, float]:
+    # the think time of a problem is summed over all tries at it
     failed = False
+    think_time = 0.0
 
-    while (result := _get_result(solution, gui)) == QueueResult.FAILURE:
+    while True:
+        result, try_time = _get_result(solution, gui)
+        think_time += try_time
+        if result != QueueResult.FAILURE:
+            break
         failed = True
     if failed is True and result == QueueResult.SUCCESS:
         result = QueueResult.FAILURE
 
-    return result
+    if attempts is not None and result != QueueResult.QUIT:
+        attempts.record(solution, result == QueueResult.SUCCESS, think_time)
+    return result, think_time
 
 
-def _get_result(solution: chess.pgn.ChildNode, gui: ZugGUI) -> QueueResult:
+def _get_result(
+    solution: chess.pgn.ChildNode,
+    gui: ZugGUI,
+) -> Tuple[QueueResult, float]:
     gui.setup_position(solution.parent.board())
-    input_ = gui.get_input()
+    input_, think_time = gui.get_timed_input()
 
-    if input_ == ZugGUI.QUIT:
-        return QueueResult.QUIT
+    if input_ == inputs.QUIT:
+        return QueueResult.QUIT, think_time
 
     if not isinstance(input_, chess.Move):
         raise ValueError("Input from ZugGUI not recognised.")
@@ -31,29 +55,116 @@ def _get_result(solution: chess.pgn.ChildNode, gui: ZugGUI) -> QueueResult:
     if input_ == solution.move:
         gui.setup_position(solution.board())
         time.sleep(1)
-        return QueueResult.SUCCESS
+        return QueueResult.SUCCESS, think_time
     else:
-        return QueueResult.FAILURE
+        return QueueResult.FAILURE, think_time
 
 
 class Problem(QueueItem):
-    def __init__(self, solution: chess.pgn.ChildNode):
+    def __init__(
+        self,
+        solution: chess.pgn.ChildNode,
+        tabia: Optional[Tabia] = None,
+        attempts: Optional[ProblemAttempts] = None,
+    ):
         self._solution = solution
+        self._tabia = tabia
+        self._attempts = attempts
+        self._think_time: Optional[float] = None
+
+    @property
+    def tabia(self) -> Optional[Tabia]:
+        return self._tabia
+
+    @property
+    def key(self) -> str:
+        """The id of the problem within its tabia: its solution's node id."""
+        return ZugChessTools.node_id(self._solution)
+
+    @property
+    def think_time(self) -> Optional[float]:
+        """Seconds spent on the problem when last played."""
+        return self._think_time
 
     def play(self, gui: ZugGUI) -> QueueResult:
         gui.set_perspective(self._solution.parent.board().turn)
-        return _present_problem(self._solution, gui)
+        result, self._think_time = _present_problem(self._solution, gui, self._attempts)
+        return result
+
+
+class ScheduledProblem(Problem):
+    """A problem whose first result is recorded in its tabia's problem store."""
+
+    def __init__(
+        self,
+        solution: chess.pgn.ChildNode,
+        tabia: Tabia,
+        node_id: str,
+        rng: Optional[random.Random] = None,
+        attempts: Optional[ProblemAttempts] = None,
+    ):
+        super().__init__(solution, tabia, attempts)
+        self._node_id = node_id
+        self._rng = rng
+        self._recorded = False
+
+    @property
+    def key(self) -> str:
+        return self._node_id
+
+    def play(self, gui: ZugGUI) -> QueueResult:
+        result = super().play(gui)
+        if result != QueueResult.QUIT and not self._recorded:
+            self._record(result)
+        return result
+
+    def _record(self, result: QueueResult) -> None:
+        record = self._tabia.problems.setdefault(self._node_id)
+        scheduler = self._tabia.scheduler
+        if result == QueueResult.SUCCESS:
+            record.success(self._tabia.metadata, self._rng, self.think_time, scheduler)
+        else:
+            record.failure(self._tabia.metadata, scheduler)
+        self._recorded = True
 
 
 class Line(QueueItem):
-    def __init__(self, line: List[chess.pgn.GameNode]):
+    def __init__(
+        self,
+        line: List[chess.pgn.GameNode],
+        tabia: Optional[Tabia] = None,
+        attempts: Optional[ProblemAttempts] = None,
+    ):
         self._line = line
+        self._tabia = tabia
+        self._attempts = attempts
+        self._think_time: Optional[float] = None
+
+    @property
+    def tabia(self) -> Optional[Tabia]:
+        return self._tabia
+
+    @property
+    def key(self) -> str:
+        """The id of the line within its tabia, from its first and last nodes."""
+        start, end = (
+            bytes.fromhex(ZugChessTools.node_id(node))
+            for node in (self._line[0], self._line[-1])
+        )
+        return ZugChessTools.line_id(start, end).hex()
+
+    @property
+    def think_time(self) -> Optional[float]:
+        """Seconds spent on the line's problems when last played."""
+        return self._think_time
 
     def play(self, gui: ZugGUI) -> QueueResult:
         result = QueueResult.SUCCESS
+        self._think_time = 0.0
         gui.set_perspective(self._line[0].board().turn)
         for solution in self._line[1::2]:
-            item_result = _present_problem(solution, gui)
+            item_result, think_time = _present_problem(solution, gui, self._attempts)
+            self._think_time += think_time
             if item_result == QueueResult.QUIT:
                 return QueueResult.QUIT
             if item_result == QueueResult.FAILURE:
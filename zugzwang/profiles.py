@@ -0,0 +1,455 @@
+"""
+Training profiles over a shared collection.
+
+A profile keeps one person's scheduling data apart from the collection, so that
+several people can train the same PGNs. Its directory, under the collection's
+.profiles directory, holds the metadata and problem stores of every tabia in a
+single journal, beside the profile's attempt log and session checkpoint. The
+PGNs, and the caches and indexes built from them, are shared, and a profile
+never writes to the files beside them.
+
+The journal is append-only: a write appends a line, and the last line for a
+tabia wins, but for lines taken from another copy of the profile by
+zugzwang.sync, which are merged with the record. Once stale lines outnumber
+the live ones, compact rewrites the journal with only the live lines.
+
+A sync may run while the trainer has the profile open, so the journal is only
+read and written under an exclusive lock on the profile's lock file. Each
+append takes the last sequence number from the file under the lock, never from
+a number cached before it.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import datetime
+import json
+import os
+import pathlib
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # without flock, as on Windows, writers of a profile are not serialised
+    fcntl = None  # type: ignore[assignment]
+
+from zugzwang.attempts import AttemptLog
+from zugzwang.group import (
+    DefaultIOManager,
+    IOError,
+    Item,
+    Metadata,
+    MetadataError,
+    Tabia,
+)
+from zugzwang.schedule import ProblemRecord, ProblemStore, ProblemStoreError
+
+DIRECTORY = ".profiles"
+JOURNAL = "store.log"
+LOCK = "store.lock"
+
+# record kinds of the journal
+METADATA = "meta"
+PROBLEMS = "problems"
+
+
+class ProfileError(Exception):
+    pass
+
+
+def profile_directory(collection: pathlib.Path, name: str) -> pathlib.Path:
+    if not name or name.startswith(".") or "/" in name or os.sep in name:
+        raise ProfileError(f"{name!r} is not a valid profile name")
+    return collection / DIRECTORY / name
+
+
+def profile_names(collection: pathlib.Path) -> List[str]:
+    directory = collection / DIRECTORY
+    if not directory.is_dir():
+        return []
+    return sorted(path.name for path in directory.iterdir() if path.is_dir())
+
+
+def tabia_key(tabia: Tabia) -> str:
+    return "/".join(tabia.path)
+
+
+def merge_data(kind: str, local: str, remote: str) -> str:
+    """
+    The merge of two records of a tabia: of metadata, the one with the later
+    study date, then with more attempts; of problem stores, each problem's
+    record alike. The merge is symmetric, so copies merging each other's
+    records agree.
+    """
+    if kind == METADATA:
+        try:
+            ranked = [(_metadata_rank(data), data) for data in (local, remote)]
+        except MetadataError:
+            return local
+        return max(ranked)[1]
+    if kind == PROBLEMS:
+        try:
+            local_store = ProblemStore.from_json(local)
+            remote_store = ProblemStore.from_json(remote)
+        except ProblemStoreError:
+            return local
+        records = dict(local_store.items())
+        for node_id, record in remote_store.items():
+            if (current := records.get(node_id)) is None or _record_rank(
+                record
+            ) > _record_rank(current):
+                records[node_id] = record
+        merged = ProblemStore(records).as_json()
+        return local if merged == local else merged
+    return remote
+
+
+def _metadata_rank(data: str) -> Tuple[int, int, str]:
+    metadata = Metadata.from_json(data)
+    return (
+        _ordinal(metadata.last_study_date),
+        metadata.successes + metadata.failures,
+        data,
+    )
+
+
+def _record_rank(record: ProblemRecord) -> Tuple[int, int, List[int]]:
+    return (
+        _ordinal(record.last_study_date),
+        record.successes + record.failures,
+        record.as_list(),
+    )
+
+
+def _ordinal(date: Optional[datetime.date]) -> int:
+    return date.toordinal() if date is not None else 0
+
+
+class Journal:
+    """
+    The journal of a profile, read and written at its end.
+
+    Each line is a JSON list of the record's kind, tabia key, data and
+    sequence number, and a flag if the data is to be merged with the record
+    rather than replace it. Sequence numbers rise down the file, so the lines
+    since any number are found by binary search.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self._path = path
+        self._sequence: Optional[int] = None
+        self._fp: Optional[IO[bytes]] = None
+        self._locked = False
+
+    @property
+    def path(self) -> pathlib.Path:
+        return self._path
+
+    @property
+    def sequence(self) -> int:
+        """The sequence number of the last line, or 0 without any."""
+        if self._sequence is None or not self._locked:
+            self._sequence = self._last_sequence()
+        return self._sequence
+
+    @contextlib.contextmanager
+    def locked(self) -> Iterator[None]:
+        """
+        Hold the profile's lock, against other processes; appends take it
+        themselves if it is not held already.
+        """
+        if self._locked:
+            yield
+            return
+        with _exclusive(self._path.with_name(LOCK)):
+            self._locked = True
+            # another process may have appended or compacted since
+            self._sequence = None
+            try:
+                yield
+            finally:
+                self._locked = False
+
+    def append(self, kind: str, key: str, data: str, merge: bool = False) -> int:
+        """Append a line, returning its sequence number."""
+        return self.extend([(kind, key, data)], merge)
+
+    def extend(
+        self, records: Iterable[Tuple[str, str, str]], merge: bool = False
+    ) -> int:
+        """
+        Append a line for each kind, key and data, returning the sequence
+        number of the last.
+        """
+        with self.locked():
+            sequence = self.sequence
+            lines = []
+            for kind, key, data in records:
+                sequence += 1
+                lines.append(encode_line(kind, key, data, sequence, merge))
+            self._fp = self._open()
+            self._fp.write(b"".join(lines))
+            # a line is never left in the buffer, where a crash would lose it
+            self._fp.flush()
+            self._sequence = sequence
+        return sequence
+
+    def since(self, sequence: int) -> List[bytes]:
+        """The whole lines after the line numbered sequence."""
+        if not self._path.exists():
+            return []
+        with open(self._path, "rb") as fp:
+            low, high = 0, os.fstat(fp.fileno()).st_size
+            # the least offset at or after which the first line is later
+            while low < high:
+                middle = (low + high) // 2
+                _, line = self._line_from(fp, middle)
+                if not line or _sequence_of(line) > sequence:
+                    high = middle
+                else:
+                    low = middle + 1
+            start, _ = self._line_from(fp, low)
+            fp.seek(start)
+            return [line for line in fp if line.endswith(b"\n")]
+
+    def close(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    def _open(self) -> IO[bytes]:
+        # the file is opened again if a compaction has replaced it
+        if self._fp is not None:
+            try:
+                if os.stat(self._path).st_ino == os.fstat(self._fp.fileno()).st_ino:
+                    return self._fp
+            except FileNotFoundError:
+                pass
+            self._fp.close()
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        return open(self._path, "ab")
+
+    @staticmethod
+    def _line_from(fp: IO[bytes], offset: int) -> Tuple[int, bytes]:
+        # the first whole line starting at or after offset, and its start
+        if offset:
+            fp.seek(offset - 1)
+            fp.readline()
+        else:
+            fp.seek(0)
+        start = fp.tell()
+        line = fp.readline()
+        return start, line if line.endswith(b"\n") else b""
+
+    def _last_sequence(self) -> int:
+        if not self._path.exists():
+            return 0
+        with open(self._path, "rb") as fp:
+            size = os.fstat(fp.fileno()).st_size
+            block = 4096
+            while True:
+                fp.seek(max(0, size - block))
+                lines = [
+                    line for line in fp.read().splitlines(True) if line.endswith(b"\n")
+                ]
+                # the first line of a block may be cut, unless it starts the file
+                if len(lines) > 1 or block >= size:
+                    return _sequence_of(lines[-1]) if lines else 0
+                block *= 2
+
+
+@contextlib.contextmanager
+def _exclusive(path: pathlib.Path) -> Iterator[None]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "ab") as fp:
+        if fcntl is not None:
+            fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+        # the lock goes with the file's closing
+        yield
+
+
+def encode_line(
+    kind: str, key: str, data: str, sequence: int, merge: bool = False
+) -> bytes:
+    fields: List[Any] = [kind, key, data, sequence]
+    if merge:
+        fields.append(True)
+    return (json.dumps(fields, separators=(",", ":")) + "\n").encode()
+
+
+def decode_line(line: bytes) -> Tuple[str, str, str, int, bool]:
+    kind, key, data, sequence, *merge = json.loads(line)
+    return kind, key, data, sequence, bool(merge and merge[0])
+
+
+def _sequence_of(line: bytes) -> int:
+    return json.loads(line)[3]
+
+
+class ProfileStore:
+    """The metadata and problem stores of one profile, keyed by tabia path."""
+
+    def __init__(self, directory: pathlib.Path):
+        self._directory = directory
+        self._path = directory / JOURNAL
+        # data and sequence number of each record
+        self._records: Dict[Tuple[str, str], Tuple[str, int]] = {}
+        self._lines = 0
+        self._journal = Journal(self._path)
+        # the number of the last line read, or appended right after it
+        self._sequence = 0
+        with self._journal.locked():
+            if self._path.exists():
+                self._sequence = self._load()
+
+    @classmethod
+    def open(
+        cls, collection: pathlib.Path, name: str, create: bool = True
+    ) -> ProfileStore:
+        """The store of the named profile of the collection."""
+        directory = profile_directory(collection, name)
+        if not create and not directory.is_dir():
+            raise ProfileError(f"{collection} has no profile {name}")
+        directory.mkdir(parents=True, exist_ok=True)
+        return cls(directory)
+
+    @property
+    def directory(self) -> pathlib.Path:
+        return self._directory
+
+    @property
+    def stale(self) -> int:
+        """The number of journal lines overwritten by later ones."""
+        return self._lines - len(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __enter__(self) -> ProfileStore:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def get(self, kind: str, key: str) -> Optional[str]:
+        record = self._records.get((kind, key))
+        return record[0] if record is not None else None
+
+    def set(self, kind: str, key: str, data: str) -> None:
+        if self.get(kind, key) == data:
+            return
+        sequence = self._journal.append(kind, key, data)
+        if sequence == self._sequence + 1:
+            self._sequence = sequence
+        self._records[kind, key] = (data, sequence)
+        self._lines += 1
+
+    def keys(self, kind: str) -> Iterator[str]:
+        return (key for record_kind, key in self._records if record_kind == kind)
+
+    def metadata(self, key: str) -> Optional[Metadata]:
+        data = self.get(METADATA, key)
+        if data is None:
+            return None
+        try:
+            return Metadata.from_json(data)
+        except MetadataError as exc:
+            raise IOError(f"Cannot read metadata for {key}") from exc
+
+    def problems(self, key: str) -> Optional[ProblemStore]:
+        data = self.get(PROBLEMS, key)
+        if data is None:
+            return None
+        try:
+            return ProblemStore.from_json(data)
+        except ProblemStoreError as exc:
+            raise IOError(f"Cannot read problems for {key}") from exc
+
+    def compact(self, force: bool = False) -> bool:
+        """
+        Rewrite the journal with only its live lines, if they are outnumbered
+        by stale ones, or if forced. Returns whether it was rewritten.
+        """
+        if not force and self.stale <= len(self._records):
+            return False
+        self.close()
+        with self._journal.locked():
+            if self._journal.sequence != self._sequence:
+                # lines appended by another process are read, not dropped
+                self._records = {}
+                self._lines = 0
+                self._sequence = self._load()
+            partial = self._path.with_name(self._path.name + ".partial")
+            # the lines keep their sequence numbers, and so their order
+            records = sorted(self._records.items(), key=lambda item: item[1][1])
+            with open(partial, "wb") as fp:
+                for (kind, key), (data, sequence) in records:
+                    fp.write(encode_line(kind, key, data, sequence))
+            os.replace(partial, self._path)
+        self._lines = len(self._records)
+        return True
+
+    def close(self) -> None:
+        self._journal.close()
+
+    def _load(self) -> int:
+        # returns the sequence number of the last line
+        with open(self._path, "rb") as fp:
+            lines = fp.readlines()
+        sequence = 0
+        for number, line in enumerate(lines, 1):
+            try:
+                kind, key, data, sequence, merge = decode_line(line)
+            except (ValueError, TypeError) as exc:
+                if number == len(lines) and not line.endswith(b"\n"):
+                    # a line cut short by a crash is dropped, and only there
+                    with open(self._path, "r+b") as fp:
+                        fp.truncate(sum(len(line) for line in lines[:-1]))
+                    return sequence
+                raise ProfileError(f"{self._path}:{number}: bad record") from exc
+            if merge and (current := self._records.get((kind, key))) is not None:
+                data = merge_data(kind, current[0], data)
+            self._records[kind, key] = (data, sequence)
+            self._lines += 1
+        if lines and not lines[-1].endswith(b"\n"):
+            # the next line must not run on from the last
+            with open(self._path, "ab") as fp:
+                fp.write(b"\n")
+        return sequence
+
+
+class ProfileIOManager(DefaultIOManager):
+    """
+    Reads the collection like the DefaultIOManager, but keeps the tabias'
+    metadata, problems, attempts and checkpoints in a profile.
+    """
+
+    def __init__(self, store: ProfileStore):
+        super().__init__()
+        self._store = store
+
+    @property
+    def store(self) -> ProfileStore:
+        return self._store
+
+    def read_meta(self, tabia: Tabia) -> Optional[Metadata]:
+        return self._store.metadata(tabia_key(tabia))
+
+    def write_meta(self, tabia: Tabia) -> None:
+        self._store.set(METADATA, tabia_key(tabia), tabia.metadata.as_json())
+
+    def read_problems(self, tabia: Tabia) -> Optional[ProblemStore]:
+        return self._store.problems(tabia_key(tabia))
+
+    def write_problems(self, tabia: Tabia) -> None:
+        self._store.set(PROBLEMS, tabia_key(tabia), tabia.problems.as_json())
+
+    def attempt_log(self, item: Item) -> AttemptLog:
+        root = item.root
+        if root not in self._attempt_logs:
+            self._attempt_logs[root] = AttemptLog(self._store.directory / "attempts")
+        return self._attempt_logs[root]
+
+    def checkpoint_path(self, item: Item) -> pathlib.Path:
+        return self._store.directory / "session.json"
@@ -1,10 +1,15 @@
+from __future__ import annotations
+
 import chess
 import random
-from typing import Optional, List
+from typing import Optional, List, TYPE_CHECKING
 import abc
 import enum
 
-from zugzwang.gui import ZugGUI
+from zugzwang.rng import default_rng
+
+if TYPE_CHECKING:
+    from zugzwang.gui import ZugGUI
 
 
 # NOTE: QUIT is in these enums
@@ -32,10 +37,12 @@ class Queue:
         self,
         insertion_index: int = 0,
         insertion_radius: int = 0,
+        rng: Optional[random.Random] = None,
     ):
         self._queue = []
         self._insertion_index = insertion_index
         self._insertion_radius = insertion_radius
+        self._rng = rng or default_rng()
 
     def _insert(
         self,
@@ -45,7 +52,7 @@ class Queue:
     ):
         radius = radius if radius is not None else self._insertion_radius
         absolute_index = index if index is not None else self._insertion_index
-        random_offset = random.randint(-radius, radius)
+        random_offset = self._rng.randint(-radius, radius)
         index = max(0, absolute_index + random_offset)
         self._queue.insert(index, item)
 
@@ -64,6 +71,10 @@ class Queue:
     def size(self) -> int:
         return len(self._queue)
 
+    def items(self) -> List[QueueItem]:
+        """A copy of the queued items, front first."""
+        return list(self._queue)
+
     def play_single(self, gui: ZugGUI) -> None:
         item = self._queue.pop(0)
         result = item.play(gui)
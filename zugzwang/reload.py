@@ -0,0 +1,203 @@
+"""
+Incremental reloading of a collection as its files change.
+
+A CollectionReloader takes the paths reported by a watcher and brings the group
+tree into line with the disk: tabias whose PGN changed are re-parsed, created
+and deleted files and directories add and remove items, and edited metadata and
+problems are read again. Nothing else is reloaded, and only the stats of the
+groups above a change are recomputed.
+
+When the watcher has lost events, the whole tree is compared with the disk: the
+reloader keeps the modification time and size of every PGN and JSON file it
+has seen, and the files that differ are applied as if their events had come.
+"""
+
+from __future__ import annotations
+
+import os
+import pathlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from zugzwang.group import DefaultIOManager, Group, Item, Tabia
+from zugzwang.multi import group_name, is_multi, sidecar
+from zugzwang.loader import is_excluded, load_item
+
+
+class CollectionReloader:
+    def __init__(
+        self,
+        root: Group,
+        io_manager: DefaultIOManager,
+    ):
+        self._root = root
+        self._io_manager = io_manager
+        self._loaded: Set[pathlib.Path] = set()
+        # the modification time and size of each file as last applied
+        path = io_manager.group_path(root)
+        self._files = _stat_files(path) if path is not None else {}
+
+    def apply(self, paths: Iterable[pathlib.Path]) -> bool:
+        """Apply the changes at paths, returning whether any item changed."""
+        changed: Set[Group] = set()
+        self._loaded = set()
+        # parents before children, so that a new directory is loaded whole and
+        # the events of its files can be skipped
+        paths = sorted(paths, key=lambda path: len(path.parts))
+        for path in paths:
+            if self._loaded.intersection(path.parents):
+                continue
+            if (group := self._apply(path)) is not None:
+                changed.add(group)
+        for group in changed:
+            self._update_stats(group)
+        for path in paths:
+            self._restat(path)
+        return bool(changed)
+
+    def _apply(self, path: pathlib.Path) -> Optional[Group]:
+        io_manager = self._io_manager
+
+        if (group := io_manager.group_at(path)) is not None:
+            # a multi-game group's directory only holds its sidecar files
+            if io_manager.is_multi_group(group):
+                return None
+            if group is self._root:
+                # events were lost, so compare the whole tree with the disk:
+                # the files that changed are applied first, then items are
+                # added and removed, and every group's stats recomputed
+                for changed in self._changed_files(path):
+                    if not self._loaded.intersection(changed.parents):
+                        self._apply(changed)
+                return self._reconcile(group, path, recursive=True)
+            if not path.is_dir():
+                return self._remove(group)
+            return self._reconcile(group, path)
+
+        if (parent := io_manager.group_at(path.parent)) is None:
+            return None
+        name = path.name
+
+        if is_multi(name):
+            # the games' offsets all move together, so the group is rebuilt
+            existing = parent.find([group_name(name)])
+            if existing is not None:
+                self._remove(existing)
+            return self._add(parent, path) if path.exists() else parent
+        if name.endswith(".pgn"):
+            return self._update_tabia(parent, path)
+        if name.endswith(".problems.json"):
+            tabia = parent.find([name[: -len(".problems.json")]])
+            if isinstance(tabia, Tabia):
+                tabia.reload_problems(io_manager)
+            return None
+        if name.endswith(".json"):
+            tabia = parent.find([name[: -len(".json")]])
+            if isinstance(tabia, Tabia):
+                tabia.reload_metadata(io_manager)
+                return parent
+            return None
+        if path.is_dir() and not is_excluded(name) and parent.find([name]) is None:
+            return self._add(parent, path)
+        return None
+
+    def _update_tabia(self, parent: Group, path: pathlib.Path) -> Optional[Group]:
+        tabia = parent.find([path.name[:-4]])
+        if not path.exists():
+            return self._remove(tabia) if tabia is not None else None
+        # a file still being written is picked up by the event that closes it
+        if path.stat().st_size == 0:
+            return None
+        if isinstance(tabia, Tabia):
+            tabia.reload_game(self._io_manager)
+            return parent
+        return self._add(parent, path)
+
+    def _reconcile(
+        self, group: Group, path: pathlib.Path, recursive: bool = False
+    ) -> Group:
+        on_disk = {
+            _item_name(entry.name): entry
+            for entry in path.iterdir()
+            if not is_excluded(entry.name)
+        }
+        for child in list(group.children):
+            if child.name not in on_disk:
+                self._remove(child)
+            elif recursive and isinstance(child, Group):
+                if not self._io_manager.is_multi_group(child):
+                    self._reconcile(child, on_disk[child.name], recursive)
+                    child.update_stats()
+        for name, entry in on_disk.items():
+            if group.find([name]) is None:
+                self._add(group, entry)
+        return group
+
+    def _changed_files(self, path: pathlib.Path) -> List[pathlib.Path]:
+        # the files under path created, deleted or changed since last applied
+        current = _stat_files(path)
+        seen = {file: self._files[file] for file in self._files if path in file.parents}
+        changed = {
+            file
+            for file in current.keys() | seen.keys()
+            if current.get(file) != seen.get(file)
+        }
+        return sorted(changed, key=lambda file: len(file.parts))
+
+    def _restat(self, path: pathlib.Path) -> None:
+        is_file = path.suffix in (".pgn", ".json")
+        if self._files.pop(path, None) is None and not is_file:
+            # only a directory's event makes for a walk over every file
+            for file in [file for file in self._files if path in file.parents]:
+                del self._files[file]
+        if path.is_dir():
+            self._files.update(_stat_files(path))
+        elif is_file and path.exists():
+            self._files[path] = _signature(path.stat())
+
+    def _add(self, parent: Group, path: pathlib.Path) -> Group:
+        self._loaded.add(path)
+        parent.insert_child(load_item(path.name, path, parent, self._io_manager))
+        return parent
+
+    def _remove(self, item: Item) -> Group:
+        parent = item.parent
+        parent.remove_child(item)
+        if isinstance(item, Group):
+            self._io_manager.forget_group(item)
+        return parent
+
+    @staticmethod
+    def _update_stats(group: Optional[Group]) -> None:
+        while group is not None:
+            group.update_stats()
+            group = group.parent
+
+
+def _item_name(filename: str) -> str:
+    if is_multi(filename):
+        return group_name(filename)
+    if filename.endswith(".pgn"):
+        return filename[:-4]
+    return filename
+
+
+def _signature(stat: os.stat_result) -> Tuple[int, int]:
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _stat_files(directory: pathlib.Path) -> Dict[pathlib.Path, Tuple[int, int]]:
+    # the PGN and JSON files of the directory and the groups below it, with the
+    # sidecar files of its multi-game groups, which hold their tabias' metadata
+    files = {}
+    with os.scandir(directory) as scan:
+        for entry in scan:
+            if entry.is_dir():
+                if not is_excluded(entry.name):
+                    files.update(_stat_files(pathlib.Path(entry.path)))
+            elif entry.name.endswith((".pgn", ".json")):
+                files[pathlib.Path(entry.path)] = _signature(entry.stat())
+                if is_multi(entry.name):
+                    directory_ = sidecar(pathlib.Path(entry.path))
+                    if directory_.is_dir():
+                        files.update(_stat_files(directory_))
+    return files
@@ -0,0 +1,23 @@
+import random
+from typing import Optional
+
+from zugzwang.config import config
+
+_rng: Optional[random.Random] = None
+
+
+def default_rng() -> random.Random:
+    """
+    The generator used wherever none is injected, seeded from config["seed"].
+
+    It is private to ZugZwang, so code that uses the global random module can't
+    disturb a seeded run.
+    """
+    global _rng
+    if _rng is None:
+        _rng = random.Random(config["seed"])
+    return _rng
+
+
+def reseed(seed: Optional[int] = None) -> None:
+    default_rng().seed(seed)
@@ -0,0 +1,221 @@
+"""
+Per-problem scheduling.
+
+Each tabia keeps a ProblemStore beside its metadata, mapping solution node ids to
+ProblemRecords. A record holds the review state of a single problem, so that a
+scheduled session can present exactly the problems that are due. Records are
+scheduled by their tabia's scheduler, with the scheduler's state kept per problem.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import datetime
+import heapq
+import itertools
+import json
+import random
+from typing import Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+import chess.pgn
+
+from zugzwang.config import config
+from zugzwang.dates import ZugDates
+from zugzwang.schedulers import Scheduler, get_scheduler
+
+if TYPE_CHECKING:
+    from zugzwang.group import Metadata, Tabia
+
+
+class ProblemStoreError(Exception):
+    pass
+
+
+@dataclasses.dataclass
+class ProblemRecord:
+    last_study_date: Optional[datetime.date] = None
+    due_date: Optional[datetime.date] = None
+    successes: int = 0
+    failures: int = 0
+    # state of the SM-2 scheduler, as on Metadata
+    repetitions: int = 0
+    ease: float = 2.5
+
+    def success(
+        self,
+        metadata: Metadata,
+        rng: Optional[random.Random] = None,
+        think_time: Optional[float] = None,
+        scheduler: Optional[Scheduler] = None,
+    ) -> None:
+        scheduler = scheduler or get_scheduler()
+        # the recall parameters are those of the problem's tabia
+        state = self._state(metadata)
+        # a slow answer is not yet secure, so the interval is held, not grown
+        slow = think_time is not None and think_time > config["slow_think_time"]
+        if not slow:
+            scheduler.success(state)
+        if self.due_date is None or self.last_study_date is None:
+            due_date = ZugDates.tomorrow()
+        else:
+            previous_interval = (self.due_date - self.last_study_date).days
+            if not slow:
+                interval = scheduler.interval(previous_interval, state)
+            else:
+                interval = previous_interval
+            due_date = ZugDates.spread(
+                interval, metadata.recall_radius, metadata.recall_max, rng
+            )
+        self.last_study_date = ZugDates.today()
+        self.due_date = due_date
+        self.successes += 1
+        self.repetitions, self.ease = state.repetitions, state.ease
+
+    def failure(
+        self, metadata: Metadata, scheduler: Optional[Scheduler] = None
+    ) -> None:
+        state = self._state(metadata)
+        (scheduler or get_scheduler()).failure(state)
+        self.last_study_date = ZugDates.today()
+        self.due_date = ZugDates.tomorrow()
+        self.failures += 1
+        self.repetitions, self.ease = state.repetitions, state.ease
+
+    def _state(self, metadata: Metadata) -> Metadata:
+        # the tabia's metadata, with the scheduler's state of this problem
+        return dataclasses.replace(
+            metadata, repetitions=self.repetitions, ease=self.ease
+        )
+
+    def as_list(self) -> List[float]:
+        values = [
+            _to_ordinal(self.last_study_date),
+            _to_ordinal(self.due_date),
+            self.successes,
+            self.failures,
+        ]
+        # the SM-2 state is left out while untouched, as under the
+        # multiplicative scheduler
+        if (self.repetitions, self.ease) != (
+            ProblemRecord.repetitions,
+            ProblemRecord.ease,
+        ):
+            values += [self.repetitions, self.ease]
+        return values
+
+    @classmethod
+    def from_list(cls, values: List[float]) -> ProblemRecord:
+        last_study_date, due_date, successes, failures, *state = values
+        repetitions, ease = state or (cls.repetitions, cls.ease)
+        return cls(
+            last_study_date=_from_ordinal(last_study_date),
+            due_date=_from_ordinal(due_date),
+            successes=successes,
+            failures=failures,
+            repetitions=repetitions,
+            ease=ease,
+        )
+
+
+def _to_ordinal(date: Optional[datetime.date]) -> int:
+    return date.toordinal() if date is not None else 0
+
+
+def _from_ordinal(ordinal: int) -> Optional[datetime.date]:
+    return datetime.date.fromordinal(ordinal) if ordinal else None
+
+
+class ProblemStore:
+    """
+    The problem records of one tabia, keyed by node id.
+
+    Records are serialised as lists with ordinal dates, which keeps the store
+    small for tabias with hundreds of problems.
+    """
+
+    def __init__(self, records: Optional[Dict[str, ProblemRecord]] = None):
+        self._records: Dict[str, ProblemRecord] = records or {}
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self._records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get(self, node_id: str) -> Optional[ProblemRecord]:
+        return self._records.get(node_id)
+
+    def setdefault(self, node_id: str) -> ProblemRecord:
+        return self._records.setdefault(node_id, ProblemRecord())
+
+    def items(self) -> Iterable[Tuple[str, ProblemRecord]]:
+        return self._records.items()
+
+    @classmethod
+    def from_json(cls, json_str: str) -> ProblemStore:
+        try:
+            data = json.loads(json_str)
+            records = {
+                node_id: ProblemRecord.from_list(values)
+                for node_id, values in data.items()
+            }
+        except (ValueError, TypeError, AttributeError) as exc:
+            raise ProblemStoreError() from exc
+        return cls(records)
+
+    def as_json(self) -> str:
+        data = {
+            node_id: record.as_list()
+            for node_id, record in sorted(self._records.items())
+        }
+        return json.dumps(data, separators=(",", ":")) + "\n"
+
+
+@dataclasses.dataclass
+class DueProblem:
+    tabia: Tabia
+    node_id: str
+    solution: chess.pgn.ChildNode
+
+
+def _due_date(tabia: Tabia, node_id: str) -> Optional[datetime.date]:
+    # problems without a record follow their tabia, so that a collection trained
+    # tabia by tabia moves over to per-problem scheduling without losing its state
+    if (record := tabia.problems.get(node_id)) is not None:
+        return record.due_date
+    if tabia.is_learned():
+        return tabia.metadata.due_date
+    return None
+
+
+def due_problems(
+    tabias: Iterable[Tabia],
+    learning_limit: int,
+    today: Optional[datetime.date] = None,
+) -> List[DueProblem]:
+    """
+    The problems due across the given tabias, most overdue first, followed by the
+    new problems of at most learning_limit tabias.
+    """
+    today = today or ZugDates.today()
+    heap: List[Tuple[datetime.date, int, DueProblem]] = []
+    new: List[DueProblem] = []
+    new_tabias = 0
+    # the counter breaks ties between equal due dates, preserving collection order
+    counter = itertools.count()
+
+    for tabia in tabias:
+        tabia_new = []
+        for node_id, solution in tabia.identified_solutions():
+            problem = DueProblem(tabia, node_id, solution)
+            due_date = _due_date(tabia, node_id)
+            if due_date is None:
+                tabia_new.append(problem)
+            elif due_date <= today:
+                heapq.heappush(heap, (due_date, next(counter), problem))
+        if tabia_new and new_tabias < learning_limit:
+            new.extend(tabia_new)
+            new_tabias += 1
+
+    due = [heapq.heappop(heap)[2] for _ in range(len(heap))]
+    return due + new
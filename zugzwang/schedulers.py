@@ -0,0 +1,163 @@
+"""
+Interval schedulers.
+
+A Scheduler decides how far ahead a successful review pushes the next one, and
+keeps whatever per-tabia state it needs on the tabia's Metadata. The recall
+radius and recall maximum are applied on top by the caller, for every scheduler.
+
+Each scheduler also has a batch counterpart of its interval logic over NumPy
+arrays, for simulations and bulk migrations. NumPy is only imported there.
+"""
+
+from __future__ import annotations
+
+import abc
+from typing import Dict, List, Optional, Sequence, TYPE_CHECKING
+
+from zugzwang.config import config
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from zugzwang.forecast import ScheduleArrays
+    from zugzwang.group import Metadata
+
+
+class SchedulerError(Exception):
+    pass
+
+
+class Scheduler(abc.ABC):
+    name: str
+
+    @abc.abstractmethod
+    def interval(self, previous_interval: int, metadata: Metadata) -> int:
+        """
+        The ideal number of days until the next review after a success, given the
+        number of days the previous review was scheduled ahead.
+        """
+
+    def success(self, metadata: Metadata) -> None:
+        """Update the scheduler's state for a success, before interval()."""
+
+    def failure(self, metadata: Metadata) -> None:
+        """Update the scheduler's state for a failure."""
+
+    @abc.abstractmethod
+    def batch_interval(
+        self,
+        previous_interval: np.ndarray,
+        arrays: ScheduleArrays,
+        index: np.ndarray,
+    ) -> np.ndarray:
+        """interval() over the tabias at index, after batch_success()."""
+
+    def batch_success(self, arrays: ScheduleArrays, index: np.ndarray) -> None:
+        """success() over the tabias at index."""
+
+    def batch_failure(self, arrays: ScheduleArrays, index: np.ndarray) -> None:
+        """failure() over the tabias at index."""
+
+
+class MultiplicativeScheduler(Scheduler):
+    """Each interval is the previous one times the tabia's recall factor."""
+
+    name = "multiplicative"
+
+    def interval(self, previous_interval: int, metadata: Metadata) -> int:
+        return self.scale(previous_interval, metadata.recall_factor)
+
+    @staticmethod
+    def scale(previous_interval: int, recall_factor: float) -> int:
+        return int(previous_interval * recall_factor)
+
+    def batch_interval(self, previous_interval, arrays, index):
+        import numpy as np
+
+        return np.floor(previous_interval * arrays.recall_factor[index]).astype(
+            np.int64
+        )
+
+
+class SM2Scheduler(Scheduler):
+    """
+    SuperMemo 2 style scheduling.
+
+    Intervals run 1, 6, then grow by a per-tabia ease factor. A success leaves
+    the ease unchanged, a failure lowers it and restarts the repetitions.
+    """
+
+    name = "sm2"
+
+    MIN_EASE = 1.3
+    # the SM-2 ease update for response quality 2, "incorrect but remembered"
+    FAILURE_EASE_CHANGE = -0.32
+
+    def interval(self, previous_interval: int, metadata: Metadata) -> int:
+        if metadata.repetitions <= 1:
+            return 1
+        if metadata.repetitions == 2:
+            return 6
+        return round(previous_interval * metadata.ease)
+
+    def success(self, metadata: Metadata) -> None:
+        metadata.repetitions += 1
+
+    def failure(self, metadata: Metadata) -> None:
+        metadata.repetitions = 0
+        metadata.ease = max(self.MIN_EASE, metadata.ease + self.FAILURE_EASE_CHANGE)
+
+    def batch_interval(self, previous_interval, arrays, index):
+        import numpy as np
+
+        repetitions = arrays.repetitions[index]
+        grown = np.rint(previous_interval * arrays.ease[index]).astype(np.int64)
+        return np.select([repetitions <= 1, repetitions == 2], [1, 6], grown)
+
+    def batch_success(self, arrays, index):
+        arrays.repetitions[index] += 1
+
+    def batch_failure(self, arrays, index):
+        import numpy as np
+
+        arrays.repetitions[index] = 0
+        arrays.ease[index] = np.maximum(
+            self.MIN_EASE, arrays.ease[index] + self.FAILURE_EASE_CHANGE
+        )
+
+
+_registry: Dict[str, Scheduler] = {}
+
+
+def register(scheduler: Scheduler) -> None:
+    _registry[scheduler.name] = scheduler
+
+
+def get_scheduler(name: Optional[str] = None) -> Scheduler:
+    """The scheduler registered under name, or the configured default."""
+    name = name or config["scheduler"]
+    try:
+        return _registry[name]
+    except KeyError:
+        raise SchedulerError(f"Unknown scheduler {name}") from None
+
+
+def scheduler_names() -> List[str]:
+    return list(_registry)
+
+
+def scheduler_for(group_names: Sequence[str]) -> Scheduler:
+    """
+    The scheduler of a tabia, given the names of its groups from the root down.
+
+    The innermost group listed in config["group_schedulers"] decides.
+    """
+    group_schedulers = config["group_schedulers"]
+    for name in reversed(group_names):
+        if name in group_schedulers:
+            return get_scheduler(group_schedulers[name])
+    return get_scheduler()
+
+
+register(MultiplicativeScheduler())
+register(SM2Scheduler())
@@ -0,0 +1,195 @@
+"""
+Stub enforcement.
+
+A stub is a PGN sketching the opening moves of a repertoire. Each of its leaves at
+which the opponent is to move is looked up among a set of source PGNs, and a new
+tabia is made starting from the leaf, holding the moves that follow it in the
+first source that reaches the same position.
+
+The leaves are found first, so that a single pass over the sources, with one
+board made and unmade along each traversal, indexes only the positions that are
+wanted, and stops once every leaf has been found.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import pathlib
+from typing import (
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import chess
+import chess.pgn
+
+from zugzwang.names import NameGenerator
+
+
+class StubError(Exception):
+    pass
+
+
+@dataclasses.dataclass
+class StubResult:
+    # the new tabias, in the order of the stub's leaves
+    games: List[chess.pgn.Game]
+    # FENs of the leaves that no source reaches
+    unresolved: List[str]
+
+
+def position_key(board: chess.Board) -> Hashable:
+    # positions are matched without their move counters, so that a source
+    # reaching a leaf by transposition still counts; the key is built from the
+    # bitboards, as formatting an EPD costs more than the rest of the search
+    ep_square = board.ep_square if board.has_legal_en_passant() else None
+    return (
+        board.pawns,
+        board.knights,
+        board.bishops,
+        board.rooks,
+        board.queens,
+        board.kings,
+        board.occupied_co[chess.WHITE],
+        board.occupied_co[chess.BLACK],
+        board.turn,
+        board.clean_castling_rights(),
+        ep_square,
+    )
+
+
+def stub_perspective(stub: chess.pgn.Game) -> chess.Color:
+    return chess.WHITE if stub.headers["White"] == "p" else chess.BLACK
+
+
+def leaves(stub: chess.pgn.Game, perspective: chess.Color) -> List[chess.Board]:
+    """The positions at the stub's leaves with the opponent to move."""
+    found = []
+    for node, board in _traverse(stub):
+        if node.is_end() and board.turn != perspective:
+            found.append(board.copy(stack=False))
+    return found
+
+
+def find_positions(
+    keys: Iterable[Hashable],
+    sources: Iterable[chess.pgn.Game],
+) -> Dict[Hashable, chess.pgn.GameNode]:
+    """
+    The first node reaching each position, by source order and then preorder.
+    """
+    wanted = set(keys)
+    found: Dict[Hashable, chess.pgn.GameNode] = {}
+    for source in sources:
+        for node, board in _traverse(source):
+            if (key := position_key(board)) in wanted:
+                found[key] = node
+                wanted.remove(key)
+                if not wanted:
+                    return found
+    return found
+
+
+def enforce_stub(
+    stub: chess.pgn.Game,
+    sources: Iterable[chess.pgn.Game],
+    perspective: Optional[chess.Color] = None,
+) -> StubResult:
+    if perspective is None:
+        perspective = stub_perspective(stub)
+    boards = leaves(stub, perspective)
+    found = find_positions([position_key(board) for board in boards], sources)
+
+    games = []
+    unresolved = []
+    for board in boards:
+        if (node := found.get(position_key(board))) is None:
+            unresolved.append(board.fen())
+        else:
+            games.append(_game_from(board, node, perspective))
+    return StubResult(games, unresolved)
+
+
+def enforce_stub_files(
+    stub_path: pathlib.Path,
+    source_dir: pathlib.Path,
+    target_dir: pathlib.Path,
+    names: Optional[NameGenerator] = None,
+) -> Tuple[List[pathlib.Path], List[str]]:
+    """
+    Enforce the stub at stub_path against every PGN in source_dir, writing the
+    new tabias to target_dir. Returns their paths and the unresolved leaves.
+    """
+    with open(stub_path) as fp:
+        stub = chess.pgn.read_game(fp)
+    if stub is None:
+        raise StubError(f"No game in {stub_path}")
+    sources = sorted(
+        path
+        for path in source_dir.iterdir()
+        if path.suffix == ".pgn" and path.resolve() != stub_path.resolve()
+    )
+    result = enforce_stub(stub, _read_games(sources))
+
+    target_dir.mkdir(parents=True, exist_ok=True)
+    names = names or NameGenerator.for_directory(target_dir)
+    paths = []
+    for game in result.games:
+        path = target_dir / (names.random() + ".pgn")
+        with open(path, "w") as fp:
+            print(game, file=fp)
+        paths.append(path)
+    return paths, result.unresolved
+
+
+def _traverse(
+    game: chess.pgn.Game,
+) -> Iterator[Tuple[chess.pgn.GameNode, chess.Board]]:
+    # preorder, with one board pushed on the way down and popped on the way up;
+    # the board yielded with a node is only valid until the next one
+    board = game.board()
+    stack: List[Tuple[chess.pgn.GameNode, bool]] = [(game, True)]
+    while stack:
+        node, entering = stack.pop()
+        if not entering:
+            board.pop()
+            continue
+        if node.parent is not None:
+            board.push(node.move)
+            stack.append((node, False))
+        yield node, board
+        stack.extend((child, True) for child in reversed(node.variations))
+
+
+def _game_from(
+    board: chess.Board,
+    source: chess.pgn.GameNode,
+    perspective: chess.Color,
+) -> chess.pgn.Game:
+    game = chess.pgn.Game()
+    game.headers["White" if perspective else "Black"] = "p"
+    game.setup(board)
+    # the source's moves are copied, so that the new game shares no nodes
+    stack: List[Tuple[chess.pgn.GameNode, chess.pgn.GameNode]] = [(source, game)]
+    while stack:
+        original, copy = stack.pop()
+        for child in original.variations:
+            variation = copy.add_variation(
+                child.move, comment=child.comment, nags=child.nags
+            )
+            stack.append((child, variation))
+    return game
+
+
+def _read_games(paths: Sequence[pathlib.Path]) -> Iterator[chess.pgn.Game]:
+    # lazily, so that sources after the last leaf is found are never read
+    for path in paths:
+        with open(path) as fp:
+            while (game := chess.pgn.read_game(fp)) is not None:
+                yield game
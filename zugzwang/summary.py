@@ -0,0 +1,226 @@
+"""
+Headless summaries of a collection, built from metadata and cached solution counts.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import io
+import os
+import pathlib
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import chess.pgn
+
+from zugzwang.cache import SolutionCountCache
+from zugzwang.group import (
+    ROOT_NAME,
+    IOError,
+    Metadata,
+    MetadataError,
+    default_metadata,
+    metadata_stats,
+)
+from zugzwang.loader import is_excluded
+from zugzwang.multi import GameIndex, MultiGameFile, group_name, is_multi, sidecar
+from zugzwang.schedulers import scheduler_for
+from zugzwang.stats import ZugStats
+from zugzwang.tools import ZugChessTools
+
+if TYPE_CHECKING:
+    from zugzwang.profiles import ProfileStore
+
+
+@dataclasses.dataclass
+class Summary:
+    name: str
+    stats: ZugStats = dataclasses.field(default_factory=ZugStats)
+    children: List[Summary] = dataclasses.field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            **dataclasses.asdict(self.stats),
+            "children": [child.as_dict() for child in self.children],
+        }
+
+
+def summarise(
+    path: pathlib.Path,
+    name: Optional[str] = None,
+    refresh: bool = False,
+    store: Optional[ProfileStore] = None,
+    group_names: Sequence[str] = (),
+) -> Summary:
+    """
+    Summarise the group at path without loading any tabias.
+
+    Solution counts come from each directory's SolutionCountCache. Tabias missing
+    from the cache have their PGNs parsed and the cache updated; refresh ignores
+    the cache and counts every tabia afresh.
+    Metadata comes from the profile's store if one is given, in which the tabias
+    are keyed by group_names, the names of the groups below the collection.
+    """
+    summary = Summary(name=name if name is not None else path.name)
+    cache = SolutionCountCache(path)
+
+    with os.scandir(path) as scan:
+        entries = sorted(scan, key=lambda entry: entry.name)
+
+    for entry in entries:
+        if is_excluded(entry.name):
+            continue
+        if is_multi(entry.name):
+            child = _summarise_multi(
+                pathlib.Path(entry.path), refresh, store, group_names
+            )
+        elif entry.name.endswith(".pgn"):
+            tabia_name = entry.name[:-4]
+            child = _summarise_tabia(
+                tabia_name,
+                _saved_metadata(path, [*group_names, tabia_name], store),
+                entry.stat(),
+                lambda entry=entry: _read_game(entry.path),
+                cache,
+                refresh,
+            )
+        else:
+            child = summarise(
+                pathlib.Path(entry.path),
+                entry.name,
+                refresh,
+                store,
+                [*group_names, entry.name],
+            )
+        summary.children.append(child)
+        summary.stats = summary.stats + child.stats
+
+    cache.save()
+    return summary
+
+
+def collect_metadata(
+    path: pathlib.Path, store: Optional[ProfileStore] = None
+) -> List[Metadata]:
+    """
+    The metadata of every tabia under path, defaulting where none is saved.
+    """
+    return [metadata for metadata, _ in collect_scheduled(path, store=store)]
+
+
+def collect_scheduled(
+    path: pathlib.Path,
+    group_names: Sequence[str] = (),
+    store: Optional[ProfileStore] = None,
+) -> List[Tuple[Metadata, str]]:
+    """
+    The metadata of every tabia under path, each with the name of its scheduler.
+    """
+    # the collection is named as the trainer names its root group, so that
+    # group_schedulers apply alike
+    group_names = [*group_names, path.name] if group_names else [ROOT_NAME]
+    # the keys of a profile's store leave out the collection's name
+    key_names = group_names[1:]
+    scheduler = scheduler_for(group_names).name
+    scheduled = []
+    with os.scandir(path) as scan:
+        entries = sorted(scan, key=lambda entry: entry.name)
+    for entry in entries:
+        if is_excluded(entry.name):
+            continue
+        if is_multi(entry.name):
+            multi_names = [*group_names, group_name(entry.name)]
+            multi_scheduler = scheduler_for(multi_names).name
+            directory = sidecar(pathlib.Path(entry.path))
+            multi_key = [*key_names, group_name(entry.name)]
+            for name in GameIndex.load(pathlib.Path(entry.path)).names:
+                metadata = _saved_metadata(directory, [*multi_key, name], store)
+                scheduled.append((metadata or Metadata(), multi_scheduler))
+        elif entry.name.endswith(".pgn"):
+            metadata = _saved_metadata(path, [*key_names, entry.name[:-4]], store)
+            scheduled.append((metadata or Metadata(), scheduler))
+        else:
+            scheduled.extend(
+                collect_scheduled(pathlib.Path(entry.path), group_names, store)
+            )
+    return scheduled
+
+
+def _read_game(pgn_path: str) -> chess.pgn.Game:
+    with open(pgn_path) as fp:
+        return chess.pgn.read_game(fp)
+
+
+def _summarise_multi(
+    pgn_path: pathlib.Path,
+    refresh: bool,
+    store: Optional[ProfileStore],
+    group_names: Sequence[str],
+) -> Summary:
+    # the games share the file, so any edit to it invalidates all their entries
+    index = GameIndex.load(pgn_path)
+    directory = sidecar(pgn_path)
+    cache = SolutionCountCache(directory)
+    multi_file = MultiGameFile(pgn_path, index)
+    summary = Summary(name=group_name(pgn_path.name))
+    pgn_stat = pgn_path.stat()
+    multi_key = [*group_names, summary.name]
+    for name in index.names:
+        child = _summarise_tabia(
+            name,
+            _saved_metadata(directory, [*multi_key, name], store),
+            pgn_stat,
+            lambda name=name: chess.pgn.read_game(io.StringIO(multi_file.text(name))),
+            cache,
+            refresh,
+        )
+        summary.children.append(child)
+        summary.stats = summary.stats + child.stats
+    multi_file.close()
+
+    cache.save()
+    return summary
+
+
+def _summarise_tabia(
+    name: str,
+    metadata: Optional[Metadata],
+    pgn_stat: os.stat_result,
+    read_game: Callable[[], chess.pgn.Game],
+    cache: SolutionCountCache,
+    refresh: bool,
+) -> Summary:
+    perspective = metadata.perspective if metadata is not None else None
+
+    if not refresh and (cached := cache.get(name, pgn_stat, perspective)) is not None:
+        metadata = metadata or Metadata(perspective=cached.perspective)
+        return Summary(name=name, stats=metadata_stats(metadata, cached.solutions))
+
+    game = read_game()
+    metadata = metadata or default_metadata(game)
+    solutions = len(ZugChessTools.get_solution_nodes(game, metadata.perspective))
+    cache.set(name, pgn_stat, metadata.perspective, solutions)
+    return Summary(name=name, stats=metadata_stats(metadata, solutions))
+
+
+def _saved_metadata(
+    directory: pathlib.Path,
+    names: Sequence[str],
+    store: Optional[ProfileStore],
+) -> Optional[Metadata]:
+    # names are the tabia's path below the collection, the last its own name
+    if store is not None:
+        return store.metadata("/".join(names))
+    return _read_metadata(directory / (names[-1] + ".json"))
+
+
+def _read_metadata(meta_path: pathlib.Path) -> Optional[Metadata]:
+    try:
+        with open(meta_path) as fp:
+            data = fp.read()
+    except FileNotFoundError:
+        return None
+    try:
+        return Metadata.from_json(data)
+    except MetadataError as exc:
+        raise IOError(f"Cannot read metadata {meta_path}") from exc
@@ -0,0 +1,228 @@
+"""
+Offline sync of a profile between copies of a collection.
+
+Copies exchange change logs through an exchange, a directory or a zip archive
+carried between machines. A sync writes a batch of the lines its profile's
+journal gained since its last sync, and appends the batches of the other
+copies it has not yet taken to the journal, as lines to merge. Only these
+deltas are read and written: the start of the delta is found in the journal by
+binary search, and the journal is never loaded whole.
+
+Batches are numbered per copy, and the number is kept in the copy's sync
+state, so it keeps rising when the exchange is replaced or pruned, and other
+copies, which remember the last number they took, never skip a batch. A sync
+holds the profile's lock throughout, so a trainer with the profile open only
+appends before or after it.
+
+Merged lines resolve when the profile is next loaded, by merge_data: a tabia's
+metadata with the later study date wins, then that with more attempts, and
+problem stores merge record by record alike. The merge is symmetric, so copies
+agree whichever syncs first.
+"""
+
+from __future__ import annotations
+
+import abc
+import dataclasses
+import hashlib
+import json
+import os
+import pathlib
+import re
+import socket
+import zipfile
+from typing import Dict, List, Tuple
+
+from zugzwang.profiles import JOURNAL, Journal, decode_line, profile_directory
+
+STATE = "sync.json"
+BATCH = re.compile(r"(?P<origin>[0-9a-f]+)-(?P<number>\d+)\.log")
+
+
+class SyncError(Exception):
+    pass
+
+
+class Exchange(abc.ABC):
+    """Where copies of a collection leave their batches for each other."""
+
+    @abc.abstractmethod
+    def names(self) -> List[str]:
+        """The names of the batches, as paths with forward slashes."""
+        pass
+
+    @abc.abstractmethod
+    def read(self, name: str) -> bytes:
+        pass
+
+    @abc.abstractmethod
+    def write(self, name: str, data: bytes) -> None:
+        pass
+
+
+class DirectoryExchange(Exchange):
+    def __init__(self, path: pathlib.Path):
+        self._path = path
+
+    def names(self) -> List[str]:
+        if not self._path.is_dir():
+            return []
+        return [
+            path.relative_to(self._path).as_posix()
+            for path in self._path.glob("*/*.log")
+        ]
+
+    def read(self, name: str) -> bytes:
+        return (self._path / name).read_bytes()
+
+    def write(self, name: str, data: bytes) -> None:
+        path = self._path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".partial")
+        partial.write_bytes(data)
+        # a copy never takes half a batch
+        os.replace(partial, path)
+
+
+class ArchiveExchange(Exchange):
+    """A zip archive, to which batches are added."""
+
+    def __init__(self, path: pathlib.Path):
+        self._path = path
+
+    def names(self) -> List[str]:
+        if not self._path.exists():
+            return []
+        try:
+            with zipfile.ZipFile(self._path) as archive:
+                return archive.namelist()
+        except zipfile.BadZipFile as exc:
+            raise SyncError(f"{self._path} is not a zip archive") from exc
+
+    def read(self, name: str) -> bytes:
+        with zipfile.ZipFile(self._path) as archive:
+            return archive.read(name)
+
+    def write(self, name: str, data: bytes) -> None:
+        with zipfile.ZipFile(self._path, "a", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(name, data)
+
+
+def open_exchange(path: pathlib.Path) -> Exchange:
+    if path.suffix == ".zip":
+        return ArchiveExchange(path)
+    return DirectoryExchange(path)
+
+
+@dataclasses.dataclass
+class SyncState:
+    # sequence number of the last journal line sent, and number of its batch
+    sent: int = 0
+    batch: int = 0
+    # number of the last batch taken, by origin
+    taken: Dict[str, int] = dataclasses.field(default_factory=dict)
+
+
+@dataclasses.dataclass
+class SyncReport:
+    origin: str
+    # lines sent, in a batch of the number given
+    sent: int = 0
+    batch: int = 0
+    # lines taken, from this many batches
+    taken: int = 0
+    batches: int = 0
+
+
+def origin_id(directory: pathlib.Path) -> str:
+    """
+    The id of a copy of a profile, from the machine and the profile's path. It
+    is not stored in the profile, so that a copy of the files is a new origin.
+    """
+    name = f"{socket.gethostname()}:{directory.resolve()}"
+    return hashlib.blake2b(name.encode(), digest_size=6).hexdigest()
+
+
+def sync(collection: pathlib.Path, profile: str, exchange: Exchange) -> SyncReport:
+    """
+    Send the profile's changes since its last sync to the exchange, then take
+    the changes other copies have left there.
+    """
+    directory = profile_directory(collection, profile)
+    journal = Journal(directory / JOURNAL)
+    with journal.locked():
+        return _sync(directory, profile, journal, exchange)
+
+
+def _sync(
+    directory: pathlib.Path, profile: str, journal: Journal, exchange: Exchange
+) -> SyncReport:
+    origin = origin_id(directory)
+    states = _read_states(directory)
+    state = states.get(origin, SyncState())
+    report = SyncReport(origin)
+
+    batches: Dict[str, List[Tuple[int, str]]] = {}
+    for name in exchange.names():
+        folder, _, filename = name.rpartition("/")
+        if folder == profile and (match := BATCH.fullmatch(filename)):
+            batches.setdefault(match["origin"], []).append((int(match["number"]), name))
+
+    if lines := journal.since(state.sent):
+        # a batch of this copy's already in the exchange is never overwritten
+        numbers = (number for number, _ in batches.get(origin, ()))
+        report.batch = max(state.batch, *numbers, 0) + 1
+        exchange.write(f"{profile}/{origin}-{report.batch:06d}.log", b"".join(lines))
+        report.sent = len(lines)
+        state.batch = report.batch
+
+    try:
+        for other, found in sorted(batches.items()):
+            if other == origin:
+                continue
+            for number, name in sorted(found):
+                if number <= state.taken.get(other, 0):
+                    continue
+                records = [
+                    decode_line(line)[:3] for line in exchange.read(name).splitlines()
+                ]
+                journal.extend(records, merge=True)
+                report.taken += len(records)
+                state.taken[other] = number
+                report.batches += 1
+    except (ValueError, TypeError) as exc:
+        raise SyncError(f"{name} is not a batch") from exc
+    finally:
+        journal.close()
+        # the lines just taken are not sent back
+        state.sent = journal.sequence
+        states[origin] = state
+        _write_states(directory, states)
+    return report
+
+
+def _read_states(directory: pathlib.Path) -> Dict[str, SyncState]:
+    path = directory / STATE
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text())
+        return {
+            origin: SyncState(
+                sent=state["sent"],
+                batch=state.get("batch", 0),
+                taken=dict(state["taken"]),
+            )
+            for origin, state in data.items()
+        }
+    except (ValueError, TypeError, KeyError) as exc:
+        raise SyncError(f"Cannot read {path}") from exc
+
+
+def _write_states(directory: pathlib.Path, states: Dict[str, SyncState]) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / STATE
+    partial = path.with_name(path.name + ".partial")
+    data = {origin: dataclasses.asdict(state) for origin, state in states.items()}
+    partial.write_text(json.dumps(data, indent=2) + "\n")
+    os.replace(partial, path)
@@ -1,9 +1,17 @@
-from typing import List
+from typing import List, Optional, Tuple
 import chess
 import chess.pgn
+import hashlib
 import json
 import datetime
 
+from zugzwang.tree import CompactNode, nag_mask
+
+# NAG masks of the replies to a problem that the searches distinguish
+CANDIDATE = nag_mask(())
+ALTERNATIVE = nag_mask((5,))
+BLUNDER = nag_mask((2,))
+
 
 class ZugJsonError(Exception):
     pass
@@ -98,44 +106,143 @@ class ZugChessToolsParseError(ZugChessToolsError):
 
 
 class ZugChessTools:
+
+    # node ids chain a short hash down the move path from the root, so that a
+    # node's id depends only on the moves leading to it
+    ROOT_ID = hashlib.blake2b(b"", digest_size=8).digest()
+
+    @staticmethod
+    def child_id(parent_id: bytes, move: chess.Move) -> bytes:
+        return hashlib.blake2b(parent_id + move.uci().encode(), digest_size=8).digest()
+
+    @classmethod
+    def node_id(cls, node: chess.pgn.GameNode) -> str:
+        moves = []
+        while node.parent is not None:
+            moves.append(node.move)
+            node = node.parent
+        id_ = cls.ROOT_ID
+        for move in reversed(moves):
+            id_ = cls.child_id(id_, move)
+        return id_.hex()
+
+    @staticmethod
+    def nag_mask(node: chess.pgn.GameNode) -> int:
+        # compact trees store the mask, so only GameNodes convert their set
+        if isinstance(node, CompactNode):
+            return node.nag_mask
+        return nag_mask(node.nags) if node.nags else CANDIDATE
+
+    @classmethod
+    def classify(
+        cls, replies: List[chess.pgn.ChildNode]
+    ) -> Tuple[
+        Optional[chess.pgn.ChildNode],
+        List[chess.pgn.ChildNode],
+        List[chess.pgn.ChildNode],
+    ]:
+        """
+        The first candidate, the alternatives and the blunders among the replies
+        to a problem, sorted in one pass over their NAG masks.
+        """
+        candidate = None
+        alternatives = []
+        blunders = []
+        for reply in replies:
+            mask = cls.nag_mask(reply)
+            if mask == CANDIDATE:
+                if candidate is None:
+                    candidate = reply
+            elif mask == ALTERNATIVE:
+                alternatives.append(reply)
+            elif mask == BLUNDER:
+                blunders.append(reply)
+        return candidate, alternatives, blunders
+
     @classmethod
     def get_solution_nodes(
         cls, game: chess.pgn.Game, perspective: bool
     ) -> List[chess.pgn.ChildNode]:
+        return [node for _, node in cls._search_solutions(game, perspective, False)]
+
+    @classmethod
+    def get_identified_solution_nodes(
+        cls, game: chess.pgn.Game, perspective: bool
+    ) -> List[Tuple[str, chess.pgn.ChildNode]]:
+        """
+        The solution nodes paired with their node ids, computed in the same pass.
+        """
+        return [
+            (id_.hex(), node)
+            for id_, node in cls._search_solutions(game, perspective, True)
+        ]
+
+    @classmethod
+    def _search_solutions(
+        cls, game: chess.pgn.Game, perspective: bool, identify: bool
+    ) -> List[Tuple[Optional[bytes], chess.pgn.ChildNode]]:
         # define a list to store solutions and a recursive search function
+        # each node's id is derived from its parent's on the way down, if required
         solutions = []
 
-        def search_node(node: chess.pgn.GameNode, solution_perspective: bool):
+        # the side to move alternates down the tree, so only the root's board is
+        # ever set up
+        def search_node(
+            node: chess.pgn.GameNode,
+            solution_perspective: bool,
+            player_to_move: bool,
+            id_: Optional[bytes],
+        ):
             nonlocal solutions
-            player_to_move = node.board().turn
             if player_to_move != solution_perspective:
                 # the node is a solution or an alternative
                 # if it's solution, add it to the solution set
-                if node != game and node.nags == set():
-                    solutions.append(node)
+                if node != game and cls.nag_mask(node) == CANDIDATE:
+                    solutions.append((id_, node))
                 # work recursively on all children
                 for problem in node.variations:
-                    search_node(problem, solution_perspective)
+                    search_node(
+                        problem,
+                        solution_perspective,
+                        not player_to_move,
+                        child(id_, problem),
+                    )
             else:
                 # the node is a problem
                 # if it has no variations, it's a hanging problem
                 # otherwise, any variation is either a blunder or a candidate
                 # find the first candidate if it exists, and work recursively
-                replies = node.variations
-                candidates = [node for node in replies if node.nags == set()]
-                if candidates:
-                    solution = candidates[0]
-                    search_node(solution, solution_perspective)
-                alternatives = [node for node in replies if node.nags == {5}]
+                solution, alternatives, blunders = cls.classify(node.variations)
+                if solution is not None:
+                    search_node(
+                        solution,
+                        solution_perspective,
+                        not player_to_move,
+                        child(id_, solution),
+                    )
                 for alternative in alternatives:
-                    search_node(alternative, solution_perspective)
+                    search_node(
+                        alternative,
+                        solution_perspective,
+                        not player_to_move,
+                        child(id_, alternative),
+                    )
                 # work recursively on blunders with reversed perspective
-                blunders = [node for node in replies if node.nags == {2}]
                 for blunder in blunders:
-                    search_node(blunder, not solution_perspective)
+                    search_node(
+                        blunder,
+                        not solution_perspective,
+                        not player_to_move,
+                        child(id_, blunder),
+                    )
+
+        def child(id_: Optional[bytes], node: chess.pgn.ChildNode) -> Optional[bytes]:
+            return cls.child_id(id_, node.move) if identify else None
 
         # call it on the root node
-        search_node(game, perspective)
+        search_node(
+            game, perspective, game.board().turn, cls.ROOT_ID if identify else None
+        )
 
         return solutions
 
@@ -143,12 +250,37 @@ class ZugChessTools:
     def get_lines(
         cls, game: chess.pgn.Game, perspective: bool
     ) -> List[chess.pgn.GameNode]:
+        return [line for _, line in cls._search_lines(game, perspective, False)]
+
+    @classmethod
+    def get_identified_lines(
+        cls, game: chess.pgn.Game, perspective: bool
+    ) -> List[Tuple[str, List[chess.pgn.GameNode]]]:
+        """
+        The lines paired with their line ids, computed in the same pass.
+
+        A line is determined by its first and last nodes, so its id is a hash of
+        their node ids.
+        """
+        return [
+            (id_.hex(), line)
+            for id_, line in cls._search_lines(game, perspective, True)
+        ]
+
+    @staticmethod
+    def line_id(start_id: bytes, end_id: bytes) -> bytes:
+        return hashlib.blake2b(b"line" + start_id + end_id, digest_size=8).digest()
+
+    @classmethod
+    def _search_lines(
+        cls, game: chess.pgn.Game, perspective: bool, identify: bool
+    ) -> List[Tuple[Optional[bytes], List[chess.pgn.GameNode]]]:
 
         # define an empty list to store the lines and a recursive search function
         lines = []
 
         def is_blunder(node: chess.pgn.GameNode):
-            return 2 in node.nags
+            return bool(cls.nag_mask(node) & BLUNDER)
 
         def has_solution(problem: chess.pgn.GameNode):
             return any(not is_blunder(child) for child in problem.variations)
@@ -163,52 +295,93 @@ class ZugChessTools:
             # there exists a child problem with a child solution
             return not any(has_solution(problem) for problem in solution.variations)
 
+        # as in the solution search, the side to move alternates down the tree
         def search_node(
             node: chess.pgn.GameNode,
             solution_perspective: bool,
+            player_to_move: bool,
             prefix: List[chess.pgn.GameNode],
+            id_: Optional[bytes],
+            start_id: Optional[bytes],
         ):
 
-
             # copy the prefix; necessary because otherwise all branches would modify
             # the same prefix
             # it's easist to do this once, here at the top of the function
             prefix = prefix.copy()
-            player_to_move = node.board().turn
             if player_to_move != solution_perspective:
                 # the node is a solution
                 # append it to the prefix if and only if it is not the root
                 if node != game:
+                    start_id = start_id if prefix else id_
                     prefix.append(node)
                 # if the line ends here, add it to the set of lines
                 # otherwise, work recursively on all children
-                if is_line_end(node):
-                    lines.append(prefix)
+                if is_line_end(node) and prefix:
+                    lines.append((line(start_id, id_), prefix))
                 for problem in node.variations:
-                    search_node(problem, solution_perspective, prefix)
+                    search_node(
+                        problem,
+                        solution_perspective,
+                        not player_to_move,
+                        prefix,
+                        child(id_, problem),
+                        start_id,
+                    )
             else:
                 # the node is a problem; append it to the prefix
+                start_id = start_id if prefix else id_
                 prefix.append(node)
                 # if it has no variations, it's a hanging problem, ignore it
                 # otherwise, any variation is either a candidate or a blunder
                 # find the first candidate if it exists, and work recursively
-                replies = node.variations
-                candidates = [node for node in replies if node.nags == set()]
-                if candidates:
-                    solution = candidates[0]
-                    search_node(solution, solution_perspective, prefix)
-                alternatives = [node for node in replies if node.nags == {5}]
+                solution, alternatives, blunders = cls.classify(node.variations)
+                if solution is not None:
+                    search_node(
+                        solution,
+                        solution_perspective,
+                        not player_to_move,
+                        prefix,
+                        child(id_, solution),
+                        start_id,
+                    )
                 for alternative in alternatives:
-                    for node in alternative.variations:
-                        search_node(node, solution_perspective, [])
+                    alternative_id = child(id_, alternative)
+                    for reply in alternative.variations:
+                        search_node(
+                            reply,
+                            solution_perspective,
+                            player_to_move,
+                            [],
+                            child(alternative_id, reply),
+                            None,
+                        )
                 # work recursively on blunders with reversed perspective
                 # and a new prefix starting at the blunder
-                blunders = [node for node in node.variations if node.nags == {2}]
                 for blunder in blunders:
-                    search_node(blunder, not solution_perspective, [])
+                    search_node(
+                        blunder,
+                        not solution_perspective,
+                        not player_to_move,
+                        [],
+                        child(id_, blunder),
+                        None,
+                    )
 
-        # call it on the root node
-        search_node(game, perspective, [])
+        def child(id_: Optional[bytes], node: chess.pgn.ChildNode) -> Optional[bytes]:
+            return cls.child_id(id_, node.move) if identify else None
 
-        # TODO: I think the search process is returning empty lines
-        return [line for line in lines if line]
+        def line(start_id: Optional[bytes], end_id: Optional[bytes]):
+            return cls.line_id(start_id, end_id) if identify else None
+
+        # call it on the root node
+        search_node(
+            game,
+            perspective,
+            game.board().turn,
+            [],
+            cls.ROOT_ID if identify else None,
+            None,
+        )
+
+        return lines
@@ -1,13 +1,22 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import Callable, Optional, TYPE_CHECKING
 import random
 import dataclasses
 from typing import List
 import enum
 import random
 import abc
-
+import pathlib
+
+from zugzwang.attempts import AttemptLog, ProblemAttempts
+from zugzwang.balance import DueDateIndex
+from zugzwang.checkpoint import (
+    Checkpoint,
+    CheckpointWriter,
+    read_checkpoint,
+    restore_items,
+)
 from zugzwang.cli_tools import clear_screen
 from zugzwang.config import config
 from zugzwang.group import (
@@ -16,10 +25,15 @@ from zugzwang.group import (
     Result as TabiaResult,
     Tabia,
 )
-from zugzwang.queue import Queue, QueueResult
-from zugzwang.problem import Problem, Line
-from zugzwang.gui import ZugGUI
+from zugzwang.queue import Queue, QueueItem, QueueResult
+from zugzwang.rng import default_rng
+from zugzwang.problem import Problem, Line, ScheduledProblem
+from zugzwang.schedule import due_problems
 from zugzwang.scenes import Scene, SceneResult
+from zugzwang.transpositions import analyse
+
+if TYPE_CHECKING:
+    from zugzwang.gui import ZugGUI
 
 # TODO: assess use of io_manager
 # Having it pushed all the way into Trainer.train() feels wrong
@@ -31,6 +45,8 @@ class TrainingMode(str, enum.Enum):
     SCHEDULED = "SCHEDULED"
     PROBLEMS = "PROBLEMS"
     LINES = "LINES"
+    DUE_PROBLEMS = "DUE_PROBLEMS"
+    RESUME = "RESUME"
 
 
 class TrainingStatus(str, enum.Enum):
@@ -57,15 +73,19 @@ class TrainingSpec:
     options: TrainingOptions
 
 
-def _get_trainer(options: TrainingOptions) -> Trainer:
+def _get_trainer(
+    options: TrainingOptions,
+    rng: Optional[random.Random] = None,
+) -> Trainer:
     cls_dict = {
         TrainingMode.TABIAS: TabiaTrainer,
         TrainingMode.SCHEDULED: TabiaTrainer,
         TrainingMode.LINES: LineTrainer,
         TrainingMode.PROBLEMS: ProblemTrainer,
+        TrainingMode.DUE_PROBLEMS: DueProblemTrainer,
     }
     cls = cls_dict[options.mode]
-    return cls(options)
+    return cls(options, rng)
 
 
 def _get_tabias(item: Item, options: TrainingOptions) -> List[Tabia]:
@@ -83,8 +103,12 @@ def train(
     spec: TrainingSpec,
     gui: ZugGUI,
     io_manager: IOManager,
+    rng: Optional[random.Random] = None,
 ) -> TrainingResult:
-    trainer = _get_trainer(spec.options)
+    if spec.options.mode == TrainingMode.RESUME:
+        return resume(spec.item, gui, io_manager, rng)
+
+    trainer = _get_trainer(spec.options, rng)
     tabias = _get_tabias(spec.item, spec.options)
 
     trainer.train(tabias, gui, io_manager)
@@ -92,6 +116,34 @@ def train(
     return TrainingStatus.COMPLETED
 
 
+def resume(
+    item: Item,
+    gui: ZugGUI,
+    io_manager: IOManager,
+    rng: Optional[random.Random] = None,
+) -> TrainingStatus:
+    """Resume the collection's interrupted session, if there is one."""
+    root = item.root
+    path = io_manager.checkpoint_path(root)
+    if path is None or (checkpoint := read_checkpoint(path)) is None:
+        return TrainingStatus.COMPLETED
+    options = TrainingOptions(mode=TrainingMode(checkpoint.mode))
+    trainer = _get_trainer(options, rng)
+    trainer.resume(checkpoint, root, gui, io_manager)
+    return TrainingStatus.COMPLETED
+
+
+def _attempt_log(tabias: List[Tabia], io_manager: IOManager) -> Optional[AttemptLog]:
+    return io_manager.attempt_log(tabias[0]) if tabias else None
+
+
+def _problem_attempts(
+    log: Optional[AttemptLog],
+    tabia: Tabia,
+) -> Optional[ProblemAttempts]:
+    return ProblemAttempts(log, tabia) if log is not None else None
+
+
 class Trainer(abc.ABC):
 
     _result_map = {
@@ -100,9 +152,16 @@ class Trainer(abc.ABC):
         QueueResult.FAILURE: TrainingResult.FAILURE,
     }
 
-    def __init__(self, options: Optional[TrainingOptions] = None):
+    def __init__(
+        self,
+        options: Optional[TrainingOptions] = None,
+        rng: Optional[random.Random] = None,
+    ):
         self._options = options or TrainingOptions()
-        self._queue = Queue(insertion_index=3, insertion_radius=1)
+        self._rng = rng or default_rng()
+        self._queue = Queue(insertion_index=3, insertion_radius=1, rng=self._rng)
+        self._log: Optional[AttemptLog] = None
+        self._checkpoint_path: Optional[pathlib.Path] = None
 
     def train(
         self,
@@ -110,17 +169,67 @@ class Trainer(abc.ABC):
         gui: ZugGui,
         io_manager: IOManager,
     ) -> TrainingResult:
+        self._log = _attempt_log(tabias, io_manager)
         if self._options.coalesce is True:
+            if tabias:
+                self._checkpoint_path = io_manager.checkpoint_path(tabias[0])
             return self._train_coalesced(tabias, gui)
         return _train(tabias, gui, io_manager)
 
+    def resume(
+        self,
+        checkpoint: Checkpoint,
+        root: Group,
+        gui: ZugGUI,
+        io_manager: IOManager,
+    ) -> None:
+        """Play on from a checkpoint of an interrupted coalesced session."""
+        self._log = io_manager.attempt_log(root)
+        self._checkpoint_path = io_manager.checkpoint_path(root)
+        checkpoint.restore_rng(self._rng)
+        items = restore_items(
+            checkpoint,
+            root,
+            lambda tabia: {item.key: item for item in self._items(tabia)},
+        )
+        self._queue.empty()
+        self._queue.extend(items)
+        self._play_coalesced(gui)
+
     def _train_coalesced(self, tabias: List[Tabia], gui: ZugGui) -> None:
         self._queue.empty()
         self._fill_queue_coalesced(tabias)
+        self._play_coalesced(gui)
+
+    def _play_coalesced(self, gui: ZugGUI) -> None:
+        writer = None
+        if self._checkpoint_path is not None:
+            writer = CheckpointWriter(self._checkpoint_path)
+        played = 0
         while not self._queue.is_empty():
             clear_screen()
             print(self._report_coalesced())
-            self._queue.play_single(gui)
+            snapshot = self._snapshot()
+            if writer is not None and played % config["checkpoint_interval"] == 0:
+                writer.submit(snapshot)
+            result = self._queue.play_single(gui)
+            played += 1
+            if result == QueueResult.QUIT:
+                # the queue is emptied on quitting, so keep it as it was before
+                if writer is not None:
+                    writer.submit(snapshot)
+                    writer.close()
+                return
+        if writer is not None:
+            writer.discard()
+
+    def _snapshot(self) -> Callable[[], Checkpoint]:
+        # copying the queue is all that happens here; the checkpoint itself is
+        # built on the writer's thread
+        items = self._queue.items()
+        rng_state = self._rng.getstate()
+        mode = self._options.mode.value
+        return lambda: Checkpoint.from_queue(mode, items, rng_state)
 
     def _train(
         self,
@@ -144,12 +253,23 @@ class Trainer(abc.ABC):
         return result
 
     @abc.abstractmethod
-    def _fill_queue(self, tabia: Tabia) -> None:
+    def _items(self, tabia: Tabia) -> List[QueueItem]:
         pass
 
-    @abc.abstractmethod
-    def _fill_queue_coalesced(self, tabia: Tabia) -> None:
-        pass
+    def _fill_queue(self, tabia: Tabia) -> None:
+        items = self._items(tabia)
+        if self._options.randomise is True:
+            self._rng.shuffle(items)
+        self._queue.extend(items)
+
+    def _coalesced_items(self, tabias: List[Tabia]) -> List[QueueItem]:
+        return [item for tabia in tabias for item in self._items(tabia)]
+
+    def _fill_queue_coalesced(self, tabias: List[Tabia]) -> None:
+        items = self._coalesced_items(tabias)
+        if self._options.randomise is True:
+            self._rng.shuffle(items)
+        self._queue.extend(items)
 
     def _report(self, tabia) -> str:
         name = tabia.name
@@ -162,39 +282,36 @@ class Trainer(abc.ABC):
 
 
 class LineTrainer(Trainer):
-    def _fill_queue(self, tabia: Tabia) -> None:
-        lines = [Line(line) for line in tabia.lines()]
-        if self._options.randomise is True:
-            random.shuffle(lines)
-        self._queue.extend(lines)
-
-    def _fill_queue_coalesced(self, tabias: List[Tabia]) -> None:
-        lines = [Line(line) for tabia in tabias for line in tabia.lines()]
-        if self._options.randomise is True:
-            random.shuffle(lines)
-        self._queue.extend(lines)
+    def _items(self, tabia: Tabia) -> List[Line]:
+        attempts = _problem_attempts(self._log, tabia)
+        return [Line(line, tabia, attempts) for line in tabia.lines()]
 
 
 class ProblemTrainer(Trainer):
-    def _fill_queue(self, tabia: Tabia) -> None:
-        problems = [Problem(solution) for solution in tabia.solutions()]
-        if self._options.randomise is True:
-            random.shuffle(problems)
-        self._queue.extend(problems)
+    def _items(self, tabia: Tabia) -> List[Problem]:
+        attempts = _problem_attempts(self._log, tabia)
+        return [Problem(solution, tabia, attempts) for solution in tabia.solutions()]
 
-    def _fill_queue_coalesced(self, tabias: List[Tabia]) -> None:
-        problems = [
-            Problem(solution) for tabia in tabias for solution in tabia.solutions()
-        ]
-        if self._options.randomise is True:
-            random.shuffle(problems)
-        self._queue.extend(problems)
+    def _coalesced_items(self, tabias: List[Tabia]) -> List[Problem]:
+        items = super()._coalesced_items(tabias)
+        if not config["dedupe_transpositions"]:
+            return items
+        # a position reached in several places is asked once, unless its
+        # solutions disagree
+        redundant = analyse(tabias).redundant()
+        return [item for item in items if (id(item.tabia), item.key) not in redundant]
 
 
 class TabiaTrainer:
-    def __init__(self, options: TrainingOptions):
+    def __init__(
+        self,
+        options: TrainingOptions,
+        rng: Optional[random.Random] = None,
+    ):
         self._options = options
-        self._queue = Queue(insertion_index=3, insertion_radius=1)
+        self._rng = rng or default_rng()
+        self._queue = Queue(insertion_index=3, insertion_radius=1, rng=self._rng)
+        self._log: Optional[AttemptLog] = None
 
     def train(
         self,
@@ -203,8 +320,10 @@ class TabiaTrainer:
         io_manager: IOManager,
     ) -> None:
 
+        self._log = _attempt_log(tabias, io_manager)
         if self._options.randomise:
-            random.shuffle(tabias)
+            self._rng.shuffle(tabias)
+        due_date_index = self._due_date_index(tabias)
 
         for index, tabia in enumerate(tabias):
             result = TrainingResult.SUCCESS
@@ -223,25 +342,44 @@ class TabiaTrainer:
                 if self._queue.play_single(gui) == QueueResult.FAILURE:
                     result = TrainingResult.FAILURE
 
-            self._record_attempt(tabia, result)
+            self._record_attempt(tabia, result, due_date_index)
             io_manager.write_meta(tabia)
 
-    def _record_attempt(self, tabia: Tabia, result: TrainingResult) -> None:
+    def _due_date_index(self, tabias: List[Tabia]) -> Optional[DueDateIndex]:
+        # the load on a day is that of the whole collection, not just the tabias
+        # being trained
+        if not config["load_balancing"] or not tabias:
+            return None
+        return DueDateIndex.from_metadata(
+            (tabia.metadata for tabia in tabias[0].root.tabias()),
+            config["daily_review_target"],
+        )
+
+    def _record_attempt(
+        self,
+        tabia: Tabia,
+        result: TrainingResult,
+        index: Optional[DueDateIndex] = None,
+    ) -> None:
         if result == TrainingResult.SUCCESS:
-            tabia.record_attempt(TabiaResult.SUCCESS)
+            tabia.record_attempt(TabiaResult.SUCCESS, self._rng, index, self._log)
         elif result == TrainingResult.FAILURE:
-            tabia.record_attempt(TabiaResult.FAILURE)
+            tabia.record_attempt(TabiaResult.FAILURE, self._rng, index, self._log)
 
     def _fill_queue_lines(self, tabia: Tabia) -> None:
-        lines = [Line(line) for line in tabia.lines()]
+        attempts = _problem_attempts(self._log, tabia)
+        lines = [Line(line, tabia, attempts) for line in tabia.lines()]
         if self._options.randomise is True:
-            random.shuffle(lines)
+            self._rng.shuffle(lines)
         self._queue.extend(lines)
 
     def _fill_queue_problems(self, tabia: Tabia) -> None:
-        problems = [Problem(solution) for solution in tabia.solutions()]
+        attempts = _problem_attempts(self._log, tabia)
+        problems = [
+            Problem(solution, tabia, attempts) for solution in tabia.solutions()
+        ]
         if self._options.randomise is True:
-            random.shuffle(problems)
+            self._rng.shuffle(problems)
         self._queue.extend(problems)
 
     def _report_lines(self, tabia: Tabia, index: int, total: int) -> None:
@@ -260,13 +398,63 @@ class TabiaTrainer:
         return f"{tabia.name} ({index}/{total}): {size} problems remaining"
 
 
+class DueProblemTrainer:
+    """
+    Presents exactly the problems that are due, across all of the given tabias,
+    and records each result in the problem's own schedule.
+    """
+
+    def __init__(
+        self,
+        options: TrainingOptions,
+        rng: Optional[random.Random] = None,
+    ):
+        self._options = options
+        self._rng = rng or default_rng()
+        self._queue = Queue(insertion_index=3, insertion_radius=1, rng=self._rng)
+
+    def train(
+        self,
+        tabias: List[Tabia],
+        gui: ZugGUI,
+        io_manager: IOManager,
+    ) -> None:
+        log = _attempt_log(tabias, io_manager)
+        problems = [
+            ScheduledProblem(
+                due.solution,
+                due.tabia,
+                due.node_id,
+                self._rng,
+                _problem_attempts(log, due.tabia),
+            )
+            for due in due_problems(tabias, config["learning_limit"])
+        ]
+        self._queue.empty()
+        self._queue.extend(problems)
+        while not self._queue.is_empty():
+            clear_screen()
+            print(self._report())
+            self._queue.play_single(gui)
+
+        trained = {id(problem.tabia): problem.tabia for problem in problems}
+        for tabia in trained.values():
+            io_manager.write_problems(tabia)
+
+    def _report(self) -> str:
+        size = self._queue.size()
+        return f"Due problems: {size} remaining"
+
+
 class TrainingSession(Scene):
-    def __init__(self, spec: TrainingSpec, gui: ZugGUI):
+    def __init__(self, spec: TrainingSpec, get_gui: Callable[[], ZugGUI]):
+        # the GUI is requested only when the session starts, so that pygame is
+        # never loaded by callers that don't train
         self._spec = spec
-        self._gui = gui
+        self._get_gui = get_gui
 
     def go(self, io_manager: IOManager) -> Optional[SceneResult]:
-        train(self._spec, self._gui, io_manager)
+        train(self._spec, self._get_gui(), io_manager)
         return None
 
     def kill(self, io_manager: IOManager) -> None:
@@ -0,0 +1,207 @@
+"""
+Transpositions across a repertoire.
+
+The same position is often reached by different move orders, within a tabia or
+in different tabias, and is then trained as a separate problem each time. The
+analysis finds the problems whose positions coincide, and flags those whose
+solutions disagree.
+
+Positions are identified by their Polyglot Zobrist key. ZobristBoard updates the
+key as each move is made and unmade, from the squares the move changes, so a
+tabia is keyed in a single traversal without hashing any board from scratch.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+from typing import Dict, Iterable, Iterator, List, Set, Tuple, TYPE_CHECKING
+
+import chess
+import chess.pgn
+import chess.polyglot
+
+if TYPE_CHECKING:
+    from zugzwang.group import Tabia
+
+_RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+_HASHER = chess.polyglot.ZobristHasher(_RANDOM)
+_TURN = _RANDOM[780]
+
+
+def _piece_masks(board: chess.BaseBoard) -> Tuple[int, ...]:
+    # in the order of the Polyglot piece keys: black pawns, white pawns, black
+    # knights and so on
+    black, white = board.occupied_co
+    return (
+        board.pawns & black,
+        board.pawns & white,
+        board.knights & black,
+        board.knights & white,
+        board.bishops & black,
+        board.bishops & white,
+        board.rooks & black,
+        board.rooks & white,
+        board.queens & black,
+        board.queens & white,
+        board.kings & black,
+        board.kings & white,
+    )
+
+
+def _state_key(board: chess.Board) -> int:
+    return _HASHER.hash_castling(board) ^ _HASHER.hash_ep_square(board)
+
+
+def push_keyed(board: chess.Board, key: int, move: chess.Move) -> int:
+    """Push move on board, whose Zobrist key is key, and return the new key."""
+    before = _piece_masks(board)
+    key ^= _state_key(board) ^ _TURN
+    board.push(move)
+    key ^= _state_key(board)
+    # a move changes at most four squares, castling included, so only the
+    # differences between the masks are hashed
+    for index, (old, new) in enumerate(zip(before, _piece_masks(board))):
+        for square in chess.scan_forward(old ^ new):
+            key ^= _RANDOM[64 * index + square]
+    return key
+
+
+class ZobristBoard:
+    """A board whose Zobrist key is kept up to date as moves are pushed."""
+
+    def __init__(self, board: chess.Board):
+        self._board = board.copy(stack=False)
+        self._keys = [chess.polyglot.zobrist_hash(self._board)]
+
+    @property
+    def board(self) -> chess.Board:
+        return self._board
+
+    @property
+    def key(self) -> int:
+        return self._keys[-1]
+
+    def push(self, move: chess.Move) -> None:
+        self._keys.append(push_keyed(self._board, self._keys[-1], move))
+
+    def pop(self) -> chess.Move:
+        self._keys.pop()
+        return self._board.pop()
+
+
+def keyed_boards(
+    game: chess.pgn.Game,
+) -> Iterator[Tuple[chess.pgn.GameNode, ZobristBoard]]:
+    """
+    Every node of game in preorder, with a board at its position; the board is
+    the same throughout, so it is only valid until the next node.
+    """
+    board = ZobristBoard(game.board())
+    stack: List[Tuple[chess.pgn.GameNode, bool]] = [(game, True)]
+    while stack:
+        node, entering = stack.pop()
+        if not entering:
+            board.pop()
+            continue
+        if node.parent is not None:
+            board.push(node.move)
+            stack.append((node, False))
+        yield node, board
+        stack.extend((child, True) for child in reversed(node.variations))
+
+
+def keyed_nodes(game: chess.pgn.Game) -> Iterator[Tuple[chess.pgn.GameNode, int]]:
+    """Every node of game in preorder, with the Zobrist key of its position."""
+    for node, board in keyed_boards(game):
+        yield node, board.key
+
+
+@dataclasses.dataclass
+class Occurrence:
+    tabia: Tabia
+    # the node id of the problem's solution, as in the tabia's problem store
+    node_id: str
+    move: chess.Move
+
+
+@dataclasses.dataclass
+class Transposition:
+    key: int
+    # without move counters, which differ between the occurrences
+    epd: str
+    # in the order the tabias were analysed, then by preorder within each
+    occurrences: List[Occurrence]
+
+    @property
+    def moves(self) -> Set[chess.Move]:
+        return {occurrence.move for occurrence in self.occurrences}
+
+    @property
+    def is_conflict(self) -> bool:
+        """Whether the occurrences disagree on the solution."""
+        return len(self.moves) > 1
+
+    @property
+    def is_across(self) -> bool:
+        """Whether the position is reached in more than one tabia."""
+        return len({id(occurrence.tabia) for occurrence in self.occurrences}) > 1
+
+
+@dataclasses.dataclass
+class RepertoireAnalysis:
+    transpositions: List[Transposition]
+
+    @property
+    def conflicts(self) -> List[Transposition]:
+        return [
+            transposition
+            for transposition in self.transpositions
+            if transposition.is_conflict
+        ]
+
+    def redundant(self) -> Set[Tuple[int, str]]:
+        """
+        The problems, as the id of their tabia and their node id, that repeat an
+        earlier occurrence of their position with the same solution. Positions
+        with conflicting solutions are left to be asked in every occurrence.
+        """
+        redundant = set()
+        for transposition in self.transpositions:
+            if transposition.is_conflict:
+                continue
+            seen: Set[chess.Move] = set()
+            for occurrence in transposition.occurrences:
+                if occurrence.move in seen:
+                    redundant.add((id(occurrence.tabia), occurrence.node_id))
+                seen.add(occurrence.move)
+        return redundant
+
+
+def analyse(tabias: Iterable[Tabia]) -> RepertoireAnalysis:
+    """Find the problems of the tabias whose positions transpose."""
+    occurrences: Dict[int, List[Occurrence]] = {}
+    epds: Dict[int, str] = {}
+    for tabia in tabias:
+        # the problems' positions are those of their solutions' parents
+        problems = {
+            solution.parent: (node_id, solution.move)
+            for node_id, solution in tabia.identified_solutions()
+        }
+        for node, key in keyed_nodes(tabia.game):
+            if not problems:
+                break
+            if (problem := problems.pop(node, None)) is None:
+                continue
+            found = occurrences.setdefault(key, [])
+            if len(found) == 1:
+                # the EPD is only wanted for positions that transpose
+                epds[key] = node.board().epd()
+            found.append(Occurrence(tabia, *problem))
+
+    return RepertoireAnalysis(
+        [
+            Transposition(key, epds[key], found)
+            for key, found in occurrences.items()
+            if len(found) > 1
+        ]
+    )
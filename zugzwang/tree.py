@@ -0,0 +1,267 @@
+"""
+Compact move trees.
+
+A CompactTree holds a game tree as parallel arrays, one entry per node: the move
+leading to it as a uint16, its NAGs as a uint8 bitmask, and int32 indices of its
+parent, first child and next sibling. Trees are read straight from PGN with a
+visitor, so no chess.pgn.GameNode is ever made. Comments are not kept.
+
+CompactNode is a two-slot view onto one node, with the parts of the GameNode
+interface that ZugChessTools, Problem, Line and the tabia loaders use.
+"""
+
+from __future__ import annotations
+
+import array
+from typing import Dict, Iterable, List, Optional, Set, TextIO
+
+import chess
+import chess.pgn
+
+# NAGs 1 to 7 map to bits 0 to 6; any other NAG sets the top bit
+_NAG_BITS = 7
+OTHER_NAG = 1 << _NAG_BITS
+
+
+def nag_mask(nags: Iterable[int]) -> int:
+    mask = 0
+    for nag in nags:
+        mask |= 1 << (nag - 1) if 1 <= nag <= _NAG_BITS else OTHER_NAG
+    return mask
+
+
+def nags_from_mask(mask: int) -> Set[int]:
+    # the top bit can't say which NAG it stood for, so it comes back as NAG 0,
+    # which keeps the set non-empty and distinct from any single known NAG
+    nags = {bit + 1 for bit in range(_NAG_BITS) if mask & (1 << bit)}
+    if mask & OTHER_NAG:
+        nags.add(0)
+    return nags
+
+
+def encode_move(move: chess.Move) -> int:
+    # from square, to square and promotion piece type less one, in 15 bits
+    promotion = move.promotion - 1 if move.promotion else 0
+    return move.from_square | move.to_square << 6 | promotion << 12
+
+
+def decode_move(code: int) -> chess.Move:
+    promotion = code >> 12
+    return chess.Move(
+        code & 0x3F,
+        code >> 6 & 0x3F,
+        promotion + 1 if promotion else None,
+    )
+
+
+class CompactTree:
+    # the root's entry has no move; index -1 stands for no node
+    NONE = -1
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        fen: str = chess.STARTING_FEN,
+    ):
+        # without headers, the tree has the Seven Tag Roster, as a Game has
+        self.headers = (
+            chess.pgn.Headers(headers) if headers is not None else chess.pgn.Headers()
+        )
+        self.fen = fen
+        # errors met while reading the tree, as on a Game
+        self.errors: List[Exception] = []
+        self.moves = array.array("H", [0])
+        self.nags = array.array("B", [0])
+        self.parents = array.array("i", [self.NONE])
+        self.first_children = array.array("i", [self.NONE])
+        self.next_siblings = array.array("i", [self.NONE])
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    @property
+    def root(self) -> CompactNode:
+        return CompactNode(self, 0)
+
+    @property
+    def nbytes(self) -> int:
+        """The bytes held by the node arrays."""
+        arrays = (
+            self.moves,
+            self.nags,
+            self.parents,
+            self.first_children,
+            self.next_siblings,
+        )
+        return sum(len(array_) * array_.itemsize for array_ in arrays)
+
+    def add(self, parent: int, move: chess.Move, nags: Iterable[int] = ()) -> int:
+        """Add a node as the last child of parent, returning its index."""
+        index = len(self.moves)
+        self.moves.append(encode_move(move))
+        self.nags.append(nag_mask(nags))
+        self.parents.append(parent)
+        self.first_children.append(self.NONE)
+        self.next_siblings.append(self.NONE)
+
+        if (child := self.first_children[parent]) == self.NONE:
+            self.first_children[parent] = index
+        else:
+            while (sibling := self.next_siblings[child]) != self.NONE:
+                child = sibling
+            self.next_siblings[child] = index
+        return index
+
+    def children(self, index: int) -> List[int]:
+        children = []
+        child = self.first_children[index]
+        while child != self.NONE:
+            children.append(child)
+            child = self.next_siblings[child]
+        return children
+
+    def board(self, index: int) -> chess.Board:
+        moves = []
+        while index != 0:
+            moves.append(decode_move(self.moves[index]))
+            index = self.parents[index]
+        board = chess.Board(self.fen)
+        for move in reversed(moves):
+            board.push(move)
+        return board
+
+    @classmethod
+    def read(cls, fp: TextIO) -> Optional[CompactTree]:
+        """The next game in fp, or None at the end of the file."""
+        return chess.pgn.read_game(fp, Visitor=CompactTreeBuilder)
+
+    @classmethod
+    def from_game(cls, game: chess.pgn.Game) -> CompactTree:
+        tree = cls(dict(game.headers), game.board().fen())
+        stack = [(game, 0)]
+        while stack:
+            node, index = stack.pop()
+            for child in node.variations:
+                stack.append((child, tree.add(index, child.move, child.nags)))
+        return tree
+
+
+class CompactTreeBuilder(chess.pgn.BaseVisitor):
+    """A visitor building a CompactTree, in the manner of chess.pgn.GameBuilder."""
+
+    def begin_game(self) -> None:
+        self._tree = CompactTree()
+        self._fen: Optional[str] = None
+        self._stack = [0]
+
+    def visit_header(self, tagname: str, tagvalue: str) -> None:
+        self._tree.headers[tagname] = tagvalue
+
+    def visit_board(self, board: chess.Board) -> None:
+        # the first board visited is the starting position
+        if self._fen is None:
+            self._fen = self._tree.fen = board.fen()
+
+    def visit_move(self, board: chess.Board, move: chess.Move) -> None:
+        self._stack[-1] = self._tree.add(self._stack[-1], move)
+
+    def visit_nag(self, nag: int) -> None:
+        index = self._stack[-1]
+        self._tree.nags[index] |= nag_mask([nag])
+
+    def begin_variation(self) -> None:
+        self._stack.append(self._tree.parents[self._stack[-1]])
+
+    def end_variation(self) -> None:
+        self._stack.pop()
+
+    def handle_error(self, error: Exception) -> None:
+        # recorded and logged as GameBuilder does, so one bad game doesn't stop
+        # a collection loading
+        chess.pgn.LOGGER.error("%s while parsing %r", error, self._tree)
+        self._tree.errors.append(error)
+
+    def result(self) -> CompactTree:
+        return self._tree
+
+
+class CompactNode:
+    """A view onto one node of a CompactTree, standing in for a GameNode."""
+
+    __slots__ = ("_tree", "_index")
+
+    def __init__(self, tree: CompactTree, index: int):
+        self._tree = tree
+        self._index = index
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, CompactNode)
+            and self._tree is other._tree
+            and self._index == other._index
+        )
+
+    def __hash__(self) -> int:
+        return hash((id(self._tree), self._index))
+
+    def __repr__(self) -> str:
+        return f"CompactNode({self._index}, {self.move})"
+
+    @property
+    def tree(self) -> CompactTree:
+        return self._tree
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @property
+    def headers(self) -> chess.pgn.Headers:
+        return self._tree.headers
+
+    @property
+    def errors(self) -> List[Exception]:
+        return self._tree.errors
+
+    @property
+    def parent(self) -> Optional[CompactNode]:
+        parent = self._tree.parents[self._index]
+        return CompactNode(self._tree, parent) if parent != CompactTree.NONE else None
+
+    @property
+    def move(self) -> Optional[chess.Move]:
+        if self._index == 0:
+            return None
+        return decode_move(self._tree.moves[self._index])
+
+    @property
+    def nag_mask(self) -> int:
+        return self._tree.nags[self._index]
+
+    @property
+    def nags(self) -> Set[int]:
+        return nags_from_mask(self._tree.nags[self._index])
+
+    @property
+    def variations(self) -> List[CompactNode]:
+        return [
+            CompactNode(self._tree, child) for child in self._tree.children(self._index)
+        ]
+
+    def next(self) -> Optional[CompactNode]:
+        """The main line's continuation, or None at the end of it."""
+        child = self._tree.first_children[self._index]
+        return CompactNode(self._tree, child) if child != CompactTree.NONE else None
+
+    def board(self) -> chess.Board:
+        return self._tree.board(self._index)
+
+    def san(self) -> str:
+        """The move leading to the node, in SAN."""
+        return self._tree.board(self._tree.parents[self._index]).san(self.move)
+
+    def game(self) -> CompactNode:
+        return self._tree.root
+
+    def is_end(self) -> bool:
+        return self._tree.first_children[self._index] == CompactTree.NONE
@@ -0,0 +1,321 @@
+"""
+Verification of solutions by a UCI engine.
+
+Every problem position of a repertoire is evaluated by a pool of engine
+processes, each position within a time budget. Where the engine's best move is
+not the solution, the position after the solution is evaluated too, and the
+solution's loss is the difference of the two evaluations from the player's
+side. Solutions losing more than a threshold are reported.
+
+Evaluations are cached by Zobrist key, beside the engine command and budget
+they were made with, so a re-run only evaluates positions new to the
+repertoire, and a transposition is evaluated once.
+"""
+
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import dataclasses
+import json
+import os
+import pathlib
+from typing import Deque, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+import chess
+import chess.engine
+import chess.pgn
+
+from zugzwang.tools import ZugChessTools
+from zugzwang.transpositions import keyed_boards, push_keyed
+
+if TYPE_CHECKING:
+    from zugzwang.group import Tabia
+
+# the score of mate, less the plies to it
+MATE_SCORE = 100_000
+
+
+class VerifyError(Exception):
+    pass
+
+
+@dataclasses.dataclass
+class VerifyOptions:
+    # seconds of engine time for each position
+    time: Optional[float] = 0.1
+    # plies of search for each position, with or instead of the time
+    depth: Optional[int] = None
+    # centipawns a solution may lose against the engine's best move
+    threshold: int = 100
+    # engine processes; one per CPU by default
+    workers: Optional[int] = None
+
+    @property
+    def limit(self) -> chess.engine.Limit:
+        return chess.engine.Limit(time=self.time, depth=self.depth)
+
+
+@dataclasses.dataclass
+class Evaluation:
+    # centipawns for the side to move
+    score: int
+    best: Optional[chess.Move] = None
+
+
+@dataclasses.dataclass
+class Mistake:
+    tabia: str
+    # the moves from the root to the solution, in SAN
+    moves: str
+    solution: str
+    best: str
+    # centipawns lost by the solution
+    loss: int
+
+    def __str__(self) -> str:
+        return (
+            f"{self.tabia}: {self.moves}: {self.solution} loses {self.loss} "
+            f"against {self.best}"
+        )
+
+
+@dataclasses.dataclass
+class VerifyReport:
+    solutions: int = 0
+    # positions evaluated, and those of them found in the cache
+    positions: int = 0
+    cached: int = 0
+    mistakes: List[Mistake] = dataclasses.field(default_factory=list)
+
+
+class EvaluationCache:
+    """
+    Evaluations keyed by Zobrist key, valid for one engine command and budget;
+    a cache of other settings is started afresh.
+    """
+
+    FILENAME = ".engine.json"
+
+    def __init__(self, root: pathlib.Path, settings: str):
+        self._path = root / self.FILENAME
+        self._settings = settings
+        self._entries: Dict[int, Evaluation] = {}
+        self._dirty = False
+        if self._path.exists():
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: int) -> Optional[Evaluation]:
+        return self._entries.get(key)
+
+    def set(self, key: int, evaluation: Evaluation) -> None:
+        self._entries[key] = evaluation
+        self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        # evaluations are stored as compact lists of score and best move
+        data = {
+            "settings": self._settings,
+            "evaluations": {
+                f"{key:016x}": [
+                    evaluation.score,
+                    evaluation.best.uci() if evaluation.best else None,
+                ]
+                for key, evaluation in sorted(self._entries.items())
+            },
+        }
+        partial = self._path.with_name(self._path.name + ".partial")
+        with open(partial, "w") as fp:
+            json.dump(data, fp, separators=(",", ":"))
+        os.replace(partial, self._path)
+        self._dirty = False
+
+    def _load(self) -> None:
+        try:
+            with open(self._path) as fp:
+                data = json.load(fp)
+            if data["settings"] != self._settings:
+                return
+            self._entries = {
+                int(key, 16): Evaluation(
+                    score, chess.Move.from_uci(best) if best else None
+                )
+                for key, (score, best) in data["evaluations"].items()
+            }
+        except (ValueError, TypeError, KeyError):
+            # a corrupt cache is simply rebuilt
+            self._entries = {}
+
+
+class EnginePool:
+    """UCI engine processes, evaluating positions in parallel."""
+
+    def __init__(self, command: List[str], size: int):
+        self._engines: List[chess.engine.SimpleEngine] = []
+        try:
+            for _ in range(size):
+                self._engines.append(chess.engine.SimpleEngine.popen_uci(command))
+        except (OSError, chess.engine.EngineError) as exc:
+            self.close()
+            raise VerifyError(f"Cannot start {' '.join(command)}: {exc}") from exc
+
+    def __enter__(self) -> EnginePool:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def evaluate(
+        self, boards: Dict[int, chess.Board], limit: chess.engine.Limit
+    ) -> Dict[int, Evaluation]:
+        """The evaluations of the boards, by their keys."""
+        queue: Deque[Tuple[int, chess.Board]] = collections.deque(boards.items())
+        results: Dict[int, Evaluation] = {}
+
+        def work(engine: chess.engine.SimpleEngine) -> None:
+            # each engine takes positions from the shared queue until it is empty
+            while True:
+                try:
+                    key, board = queue.popleft()
+                except IndexError:
+                    return
+                info = engine.analyse(board, limit)
+                results[key] = Evaluation(
+                    info["score"].relative.score(mate_score=MATE_SCORE),
+                    info["pv"][0] if info.get("pv") else None,
+                )
+
+        workers = min(len(self._engines), len(boards))
+        if not workers:
+            return results
+        with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+            try:
+                list(pool.map(work, self._engines[:workers]))
+            except (chess.engine.EngineError, KeyError) as exc:
+                raise VerifyError(f"The engine failed: {exc}") from exc
+        return results
+
+    def close(self) -> None:
+        for engine in self._engines:
+            try:
+                engine.quit()
+            except chess.engine.EngineError:
+                engine.close()
+        self._engines = []
+
+
+def verify(
+    tabias: Iterable[Tabia],
+    command: List[str],
+    options: Optional[VerifyOptions] = None,
+    cache: Optional[EvaluationCache] = None,
+) -> VerifyReport:
+    """Evaluate the solutions of the tabias and report those that lose."""
+    options = options or VerifyOptions()
+    report = VerifyReport()
+    # each problem as its tabia, solution, and the keys of the positions before
+    # and after the solution
+    problems: List[Tuple[Tabia, chess.pgn.ChildNode, int, int]] = []
+    before: Dict[int, chess.Board] = {}
+    after: Dict[int, chess.Board] = {}
+    for tabia in tabias:
+        solutions = ZugChessTools.get_solution_nodes(
+            tabia.game, tabia.metadata.perspective
+        )
+        report.solutions += len(solutions)
+        wanted: Dict[chess.pgn.GameNode, List[chess.pgn.ChildNode]] = {}
+        for solution in solutions:
+            wanted.setdefault(solution.parent, []).append(solution)
+        for node, board in keyed_boards(tabia.game):
+            if not wanted:
+                break
+            for solution in wanted.pop(node, ()):
+                before.setdefault(board.key, board.board.copy(stack=False))
+                child = board.board.copy(stack=False)
+                child_key = push_keyed(child, board.key, solution.move)
+                after.setdefault(child_key, child)
+                problems.append((tabia, solution, board.key, child_key))
+
+    pool: Optional[EnginePool] = None
+    try:
+        evaluations: Dict[int, Evaluation] = {}
+
+        def evaluate(boards: Dict[int, chess.Board]) -> None:
+            nonlocal pool
+            missing = {}
+            for key, board in boards.items():
+                report.positions += 1
+                if (evaluation := _terminal(board)) is not None:
+                    evaluations[key] = evaluation
+                elif cache is not None and (evaluation := cache.get(key)) is not None:
+                    report.cached += 1
+                    evaluations[key] = evaluation
+                else:
+                    missing[key] = board
+            if not missing:
+                return
+            # the engines are only started if there is something to evaluate
+            if pool is None:
+                workers = options.workers or os.cpu_count() or 1
+                pool = EnginePool(command, min(workers, len(missing)))
+            for key, evaluation in pool.evaluate(missing, options.limit).items():
+                evaluations[key] = evaluation
+                if cache is not None:
+                    cache.set(key, evaluation)
+
+        evaluate(before)
+        # the position after a solution is only needed where the engine
+        # prefers another move
+        evaluate(
+            {
+                child_key: after[child_key]
+                for _, solution, key, child_key in problems
+                if evaluations[key].best not in (None, solution.move)
+            }
+        )
+    finally:
+        if pool is not None:
+            pool.close()
+        if cache is not None:
+            cache.save()
+
+    for tabia, solution, key, child_key in problems:
+        best = evaluations[key]
+        if best.best is None or best.best == solution.move:
+            continue
+        # the position after the solution is evaluated for the opponent
+        loss = best.score + evaluations[child_key].score
+        if loss > options.threshold:
+            board = solution.parent.board()
+            report.mistakes.append(
+                Mistake(
+                    "/".join(tabia.path),
+                    _moves(solution),
+                    solution.san(),
+                    board.san(best.best),
+                    loss,
+                )
+            )
+    return report
+
+
+def _terminal(board: chess.Board) -> Optional[Evaluation]:
+    # the game is over, so there is nothing for an engine to search
+    if board.is_checkmate():
+        return Evaluation(-MATE_SCORE)
+    if board.is_game_over():
+        return Evaluation(0)
+    return None
+
+
+def _moves(node: chess.pgn.GameNode) -> str:
+    moves = []
+    while node.parent is not None:
+        moves.append(node.move)
+        node = node.parent
+    return node.board().variation_san(reversed(moves))
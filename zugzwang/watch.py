@@ -0,0 +1,172 @@
+"""
+Watchers reporting changed files in a collection.
+
+A watcher is polled for the paths changed since the last poll, and never blocks.
+On Linux, InotifyWatcher asks the kernel through ctypes; elsewhere, or if inotify
+is unavailable, PollingWatcher compares the collection with its last snapshot.
+Either reports paths only: what changed is decided by looking at the disk, which
+also coalesces bursts of events for the same file.
+"""
+
+from __future__ import annotations
+
+import abc
+import ctypes
+import ctypes.util
+import os
+import pathlib
+import struct
+from typing import Dict, Set, Tuple
+
+
+class WatchError(Exception):
+    pass
+
+
+def is_watched(filename: str) -> bool:
+    return filename.endswith(".pgn") or filename.endswith(".json")
+
+
+class Watcher(abc.ABC):
+    def __init__(self, root: pathlib.Path):
+        self._root = root
+
+    @property
+    def root(self) -> pathlib.Path:
+        return self._root
+
+    @abc.abstractmethod
+    def poll(self) -> Set[pathlib.Path]:
+        """The paths of files and directories changed since the last poll."""
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class PollingWatcher(Watcher):
+    def __init__(self, root: pathlib.Path):
+        super().__init__(root)
+        self._snapshot = self._scan()
+
+    def poll(self) -> Set[pathlib.Path]:
+        snapshot = self._scan()
+        changed = {
+            path
+            for path in snapshot.keys() | self._snapshot.keys()
+            if snapshot.get(path) != self._snapshot.get(path)
+        }
+        self._snapshot = snapshot
+        return changed
+
+    def _scan(self) -> Dict[pathlib.Path, Tuple[int, int]]:
+        # directories are recorded too, so that created and deleted groups show
+        snapshot = {}
+        stack = [self._root]
+        while stack:
+            directory = stack.pop()
+            try:
+                scan = os.scandir(directory)
+            except FileNotFoundError:
+                continue
+            with scan:
+                for entry in scan:
+                    try:
+                        if entry.is_dir():
+                            snapshot[pathlib.Path(entry.path)] = (0, 0)
+                            stack.append(pathlib.Path(entry.path))
+                        elif is_watched(entry.name):
+                            stat = entry.stat()
+                            key = (stat.st_mtime_ns, stat.st_size)
+                            snapshot[pathlib.Path(entry.path)] = key
+                    except FileNotFoundError:
+                        continue
+        return snapshot
+
+
+class InotifyWatcher(Watcher):
+    # from <sys/inotify.h>
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self, root: pathlib.Path):
+        super().__init__(root)
+        library = ctypes.util.find_library("c")
+        if library is None:
+            raise WatchError("No C library")
+        self._libc = ctypes.CDLL(library, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise WatchError("No inotify")
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise WatchError(os.strerror(ctypes.get_errno()))
+        self._directories: Dict[int, pathlib.Path] = {}
+        self._watch_tree(root)
+
+    def poll(self) -> Set[pathlib.Path]:
+        changed: Set[pathlib.Path] = set()
+        while True:
+            try:
+                data = os.read(self._fd, 1 << 16)
+            except BlockingIOError:
+                return changed
+            self._parse(data, changed)
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _parse(self, data: bytes, changed: Set[pathlib.Path]) -> None:
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & self.IN_Q_OVERFLOW:
+                # events were lost, so everything may have changed
+                changed.add(self._root)
+                continue
+            if mask & self.IN_IGNORED:
+                self._directories.pop(wd, None)
+                continue
+            directory = self._directories.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    # files made before the watch was added are found by the
+                    # reload, which scans the new directory
+                    self._watch_tree(path)
+                changed.add(path)
+            elif is_watched(path.name):
+                changed.add(path)
+
+    def _watch_tree(self, root: pathlib.Path) -> None:
+        for directory, _, _ in os.walk(root):
+            wd = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(directory), self.MASK
+            )
+            if wd >= 0:
+                self._directories[wd] = pathlib.Path(directory)
+
+
+def make_watcher(root: pathlib.Path) -> Watcher:
+    try:
+        return InotifyWatcher(root)
+    except (WatchError, OSError, AttributeError):
+        return PollingWatcher(root)
@@ -2,86 +2,74 @@
 Entry point of ZugZwang.
 """
 
-from typing import List, Optional
-import os
+from __future__ import annotations
+
+from typing import List, Optional, TYPE_CHECKING
 import pathlib
 
-from zugzwang.group import Group, Tabia, Item, DefaultIOManager
-from zugzwang.gui import ZugGUI
+from zugzwang.group import ROOT_NAME, Group, Tabia, DefaultIOManager
 from zugzwang.config import config
+from zugzwang.loader import initialise_group
 from zugzwang.scenes import Scene
 from zugzwang.menus import GroupScene, TabiaScene
+from zugzwang.profiles import ProfileIOManager, ProfileStore
+from zugzwang.reload import CollectionReloader
 from zugzwang.training import TrainingSpec, TrainingSession
+from zugzwang.watch import make_watcher
+
+if TYPE_CHECKING:
+    from zugzwang.gui import ZugGUI
+
+_gui: Optional[ZugGUI] = None
+
+
+def get_gui() -> ZugGUI:
+    # importing pygame and opening the window is slow, so put it off until the
+    # first training session, and share the window between sessions
+    global _gui
+    if _gui is None:
+        from zugzwang.gui import ZugGUI
+
+        _gui = ZugGUI()
+    return _gui
 
 
-def is_excluded(filename: str):
-    return "." in filename and not filename.endswith(".pgn")
-
-
-def search_dir(
-    path: pathlib.Path,
-    parent: Group,
-    io_manager: DefaultIOManager,
-) -> List[Item]:
-
-    names: List[str] = [
-        name for name in sorted(os.listdir(path)) if not is_excluded(name)
-    ]
-    items: List[Item] = []
-
-    for name in names:
-        if name.endswith(".pgn"):
-            tabia = Tabia(
-                name=name[:-4],
-                parent=parent,
-                io_manager=io_manager,
-            )
-            items.append(tabia)
-        else:
-            group = initialise_group(
-                name=name,
-                path=path / name,
-                io_manager=io_manager,
-                parent=parent,
-            )
-            items.append(group)
-
-    return items
-
-
-def initialise_group(
-    name: str,
-    path: pathlib.Path,
-    io_manager: DefaultIOManager,
-    parent: Optional[Group] = None,
-) -> Group:
-    group = Group(
-        name=name,
-        parent=parent,
-    )
-    io_manager.register_group(group, path)
-    for item in search_dir(path, group, io_manager):
-        group.add_child(item)
-
-    return group
+def kill_gui() -> None:
+    global _gui
+    if _gui is not None:
+        _gui.kill()
+        _gui = None
 
 
 def quit_scene():
     pass
 
 
-if __name__ == "__main__":
-    data_path = pathlib.Path(config["user_data"])
-    io_manager = DefaultIOManager()
-    user_data = initialise_group("UserData", data_path, io_manager)
+def make_io_manager(
+    data_path: pathlib.Path, profile: Optional[str] = None
+) -> DefaultIOManager:
+    """The manager of the collection, keeping progress in profile if given."""
+    if profile is None:
+        return DefaultIOManager()
+    store = ProfileStore.open(data_path, profile)
+    store.compact()
+    return ProfileIOManager(store)
+
+
+def main(data_path: pathlib.Path, profile: Optional[str] = None) -> None:
+    io_manager = make_io_manager(data_path, profile)
+    user_data = initialise_group(ROOT_NAME, data_path, io_manager)
     user_data.update_stats()
-    gui = ZugGUI()
+    watcher = make_watcher(data_path)
+    reloader = CollectionReloader(user_data, io_manager)
 
     scenes: List[Scene] = []
     scene = GroupScene(user_data)
     scenes.append(scene)
 
     while scenes:
+        # changes on disk are taken in between scenes, never during training
+        reloader.apply(watcher.poll())
         scene = scenes[-1]
         result = scene.go(io_manager)
         if isinstance(result, Group):
@@ -91,10 +79,17 @@ if __name__ == "__main__":
             scene = TabiaScene(result)
             scenes.append(scene)
         if isinstance(result, TrainingSpec):
-            scene = TrainingSession(result, gui)
+            scene = TrainingSession(result, get_gui)
             scenes.append(scene)
         if result is None:
             scene.kill(io_manager)
             scenes.pop()
 
-    gui.kill()
+    watcher.close()
+    kill_gui()
+    if isinstance(io_manager, ProfileIOManager):
+        io_manager.store.close()
+
+
+if __name__ == "__main__":
+    main(pathlib.Path(config["user_data"]), config["profile"])